@@ -1,6 +1,8 @@
 from django.contrib import admin
+from django.db.models import Count
 from django.utils.html import format_html
-from .models import Course, ClassSchedule, Resource, ResourceCategory, ResourceDownload, ClassAttendance
+from .attendance import live_attendance_count
+from .models import CLASS_STATUSES, Course, ClassSchedule, Resource, ResourceCategory, ResourceDownload, ClassAttendance, ResourceText, StoredBlob, AuditEvent
 
 
 @admin.register(Course)
@@ -11,15 +13,28 @@ class CourseAdmin(admin.ModelAdmin):
     list_editable = ['is_active']
     
     def resource_count(self, obj):
-        count = obj.resources.count()
-        return format_html('<strong>{}</strong> resources', count)
-    resource_count.short_description = 'Resources'
+        return format_html('<strong>{}</strong> resources', obj.active_resource_count)
+    resource_count.short_description = 'Active resources'
+    resource_count.admin_order_field = 'active_resource_count'
+
+
+class ClassStatusFilter(admin.SimpleListFilter):
+    title = 'status'
+    parameter_name = 'status'
+    
+    def lookups(self, request, model_admin):
+        return [(status, status.title()) for status in CLASS_STATUSES]
+    
+    def queryset(self, request, queryset):
+        if self.value() in CLASS_STATUSES:
+            return queryset.filter_status(self.value())
+        return queryset
 
 
 @admin.register(ClassSchedule)
 class ClassScheduleAdmin(admin.ModelAdmin):
     list_display = ['title', 'course', 'date', 'start_time', 'lecturer', 'status_badge', 'attendance_count']
-    list_filter = ['date', 'course', 'is_completed']
+    list_filter = [ClassStatusFilter, 'date', 'course', 'is_completed']
     search_fields = ['title', 'lecturer', 'course__code']
     readonly_fields = ['created_by', 'created_at']
     date_hierarchy = 'date'
@@ -43,6 +58,11 @@ class ClassScheduleAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('course').with_status().annotate(
+            stored_attendance=Count('attendance')
+        )
+    
     def save_model(self, request, obj, form, change):
         if not change:  # If creating new
             obj.created_by = request.user
@@ -62,11 +82,13 @@ class ClassScheduleAdmin(admin.ModelAdmin):
             status.upper()
         )
     status_badge.short_description = 'Status'
+    status_badge.admin_order_field = 'status'
     
     def attendance_count(self, obj):
-        count = obj.attendance.count()
+        count = live_attendance_count(obj.id, obj.stored_attendance)
         return format_html('<strong>{}</strong> students', count)
     attendance_count.short_description = 'Attendance'
+    attendance_count.admin_order_field = 'stored_attendance'
 
 
 @admin.register(ResourceCategory)
@@ -75,9 +97,21 @@ class ResourceCategoryAdmin(admin.ModelAdmin):
     list_editable = ['order']
     
     def resource_count(self, obj):
-        count = obj.resources.count()
-        return format_html('<strong>{}</strong>', count)
-    resource_count.short_description = 'Resources'
+        return format_html('<strong>{}</strong>', obj.active_resource_count)
+    resource_count.short_description = 'Active resources'
+    resource_count.admin_order_field = 'active_resource_count'
+
+
+class ResourceTextInline(admin.StackedInline):
+    model = ResourceText
+    extra = 0
+    fields = ['source_name', 'char_count', 'error', 'extracted_at']
+    readonly_fields = ['source_name', 'char_count', 'error', 'extracted_at']
+    can_delete = False
+    verbose_name_plural = 'Extracted Text'
+    
+    def has_add_permission(self, request, obj=None):
+        return False
 
 
 @admin.register(Resource)
@@ -85,9 +119,11 @@ class ResourceAdmin(admin.ModelAdmin):
     list_display = ['title', 'course', 'category', 'file_type', 'file_size_display', 'download_count', 'uploaded_by', 'upload_date', 'is_active']
     list_filter = ['category', 'course__level', 'upload_date', 'is_active']
     search_fields = ['title', 'description', 'course__code', 'course__name']
-    readonly_fields = ['uploaded_by', 'upload_date', 'download_count', 'file_size']
+    readonly_fields = ['uploaded_by', 'upload_date', 'download_count', 'trending_score', 'file_size']
     list_editable = ['is_active']
     date_hierarchy = 'upload_date'
+    list_select_related = ['course', 'category', 'uploaded_by']
+    inlines = [ResourceTextInline]
     
     fieldsets = (
         ('Resource Information', {
@@ -100,7 +136,7 @@ class ResourceAdmin(admin.ModelAdmin):
             'fields': ('is_active',)
         }),
         ('Metadata', {
-            'fields': ('uploaded_by', 'upload_date', 'download_count'),
+            'fields': ('uploaded_by', 'upload_date', 'download_count', 'trending_score'),
             'classes': ('collapse',)
         }),
     )
@@ -156,4 +192,30 @@ class ClassAttendanceAdmin(admin.ModelAdmin):
     date_hierarchy = 'joined_at'
     
     def has_add_permission(self, request):
-        return False
\ No newline at end of file
+        return False
+
+
+@admin.register(AuditEvent)
+class AuditEventAdmin(admin.ModelAdmin):
+    list_display = ['created_at', 'event', 'user', 'ip_address']
+    list_filter = ['event', 'created_at']
+    search_fields = ['user__username', 'ip_address']
+    readonly_fields = ['user', 'event', 'ip_address', 'user_agent', 'detail', 'created_at']
+    date_hierarchy = 'created_at'
+    list_select_related = ['user']  # Nullable, so not joined automatically
+    
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(StoredBlob)
+class StoredBlobAdmin(admin.ModelAdmin):
+    list_display = ['name', 'size', 'ref_count', 'held_until', 'created_at']
+    search_fields = ['name']
+    readonly_fields = ['name', 'size', 'ref_count', 'held_until', 'created_at']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
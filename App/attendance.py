@@ -0,0 +1,72 @@
+"""
+Buffered class attendance.
+
+`join_class` must redirect hundreds of students to the meeting within the
+same minute, so it does not wait for the database: attendance marks go into
+a BufferedWriter and are inserted in batches with
+bulk_create(ignore_conflicts=True), which lets the unique (class, user)
+constraint absorb duplicates instead of a SELECT-then-INSERT per click.
+
+A per-class counter in the shared cache is bumped as students join, so the
+admin shows live attendance that includes rows still waiting in a buffer.
+Counting each student once relies on cache.add() and cache.incr() being
+atomic across workers, which Redis guarantees and FileBasedCache does not
+(it reads, then writes the file). On the file cache with several workers
+the live count may miss or repeat a join; it is only for display, the
+unique constraint still keeps one row per student, and the admin never
+shows less than the database count.
+"""
+from django.core.cache import cache
+from django.utils import timezone
+
+from .buffers import BufferedWriter
+from .models import ClassAttendance
+
+
+# Classes are single-day events; markers outlive the class comfortably
+COUNTER_TTL = 24 * 60 * 60
+
+
+def _write_attendance(items):
+    ClassAttendance.objects.bulk_create(items, ignore_conflicts=True)
+
+
+attendance_buffer = BufferedWriter('attendance', _write_attendance, batch_size=200)
+
+
+def _count_key(class_id):
+    return f'attendance:count:{class_id}'
+
+
+def _seen_key(class_id, user_id):
+    return f'attendance:seen:{class_id}:{user_id}'
+
+
+def _prime_counter(class_id):
+    """Start the live counter from the rows already in the database"""
+    key = _count_key(class_id)
+    if cache.get(key) is None:
+        count = ClassAttendance.objects.filter(class_schedule_id=class_id).count()
+        cache.add(key, count, COUNTER_TTL)
+
+
+def record_attendance(class_id, user_id):
+    """Queue an attendance mark; repeat joins by the same student are not recounted"""
+    _prime_counter(class_id)
+    if not cache.add(_seen_key(class_id, user_id), True, COUNTER_TTL):
+        return  # Already queued or stored
+    try:
+        cache.incr(_count_key(class_id))
+    except ValueError:
+        pass  # Counter expired in between; it is re-primed from the database
+    attendance_buffer.add(ClassAttendance(
+        class_schedule_id=class_id,
+        user_id=user_id,
+        joined_at=timezone.now()
+    ))
+
+
+def live_attendance_count(class_id, stored_count):
+    """Attendance including buffered marks; `stored_count` is the database count"""
+    count = cache.get(_count_key(class_id))
+    return stored_count if count is None else max(count, stored_count)
@@ -0,0 +1,146 @@
+"""
+In-process write buffers for high-volume, low-value inserts.
+
+A BufferedWriter collects items in memory and hands them to its flush
+function in batches: from a background thread every `interval` seconds, as
+soon as `batch_size` items are waiting, and once more when the worker exits
+(atexit, plus gunicorn's worker_exit hook calling flush_all()). When
+`max_pending` items pile up, add() flushes in the caller, slowing producers
+down to the speed of the database. If the flush function keeps failing,
+items are retried until `max_pending` is reached; past that the oldest are
+dropped so a database outage cannot grow the worker without bound. A batch
+rejected for its data (`row_errors`, e.g. an IntegrityError) is split in
+halves until the items that fail on their own are found; only those are
+dropped, so one bad row cannot hold the rest of the buffer back.
+
+Items are lost if a worker is killed outright, so buffers are only for data
+where that is acceptable (attendance marks, audit events).
+"""
+import atexit
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.db import DataError, IntegrityError, close_old_connections
+
+from .writes import serialized_writes
+
+
+logger = logging.getLogger(__name__)
+
+_writers = []
+
+
+class BufferedWriter:
+    """Batch items for `flush_func(items)`; safe to share between threads"""
+
+    def __init__(self, name, flush_func, batch_size=200, interval=None, max_pending=10000, atomic=True,
+                 row_errors=(DataError, IntegrityError, ValueError)):
+        self.name = name
+        self.atomic = atomic
+        self.row_errors = row_errors
+        self.flush_func = flush_func
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_pending = max_pending
+        self.dropped = 0
+        self._items = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._pid = None
+        _writers.append(self)
+
+    def add(self, item):
+        """Queue an item (written immediately when WRITE_BUFFER_EAGER is set)"""
+        if settings.WRITE_BUFFER_EAGER:
+            self.flush_func([item])
+            return
+        with self._lock:
+            self._items.append(item)
+            pending = len(self._items)
+        self._ensure_thread()
+        if pending >= self.max_pending:
+            # Back-pressure: the background thread is not keeping up
+            self.flush()
+        elif pending >= self.batch_size:
+            self._wake.set()
+
+    def pending(self):
+        with self._lock:
+            return list(self._items)
+
+    def flush(self):
+        """Write everything queued so far; returns the number of items written"""
+        with self._flush_lock:
+            with self._lock:
+                items, self._items = self._items, []
+            written = 0
+            batches = [items] if items else []
+            while batches:
+                batch = batches.pop(0)
+                try:
+                    self._write(batch)
+                except self.row_errors:
+                    if len(batch) > 1:
+                        # Bisect to find the items that cannot be written
+                        middle = len(batch) // 2
+                        batches[:0] = [batch[:middle], batch[middle:]]
+                        continue
+                    self.dropped += 1
+                    logger.exception("Dropped an item the %s buffer cannot write", self.name)
+                except Exception:
+                    unwritten = [item for pending in [batch] + batches for item in pending]
+                    logger.exception("Flushing %d item(s) from the %s buffer failed", len(unwritten), self.name)
+                    self._requeue(unwritten)
+                    break
+                else:
+                    written += len(batch)
+            return written
+
+    def _write(self, items):
+        if self.atomic:
+            with serialized_writes():
+                self.flush_func(items)
+        else:
+            self.flush_func(items)
+
+    def _requeue(self, items):
+        with self._lock:
+            self._items = items + self._items
+            overflow = len(self._items) - self.max_pending
+            if overflow > 0:
+                del self._items[:overflow]
+                self.dropped += overflow
+                logger.error("Dropped %d item(s) from the %s buffer", overflow, self.name)
+
+    def _ensure_thread(self):
+        # A forked worker inherits the list but not the parent's thread
+        if self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name=f'buffer-{self.name}', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval or settings.WRITE_BUFFER_FLUSH_INTERVAL)
+            self._wake.clear()
+            try:
+                self.flush()
+            finally:
+                close_old_connections()
+
+
+def flush_all():
+    """Flush every buffer in this process (worker shutdown)"""
+    for writer in _writers:
+        writer.flush()
+
+
+atexit.register(flush_all)
@@ -0,0 +1,50 @@
+"""
+Helpers for bulk loads that bypass Model.save(): seed_scale and
+transfer_database write millions of rows with bulk_create and must neither
+stamp auto_now fields with the current time nor run the model receivers.
+"""
+from contextlib import contextmanager
+
+from django.db.models import signals
+
+
+MODEL_SIGNALS = (
+    signals.pre_init, signals.post_init,
+    signals.pre_save, signals.post_save,
+    signals.pre_delete, signals.post_delete,
+    signals.m2m_changed,
+)
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """Let bulk_create keep generated values for auto_now / auto_now_add fields"""
+    saved = []
+    for model in models:
+        for field in model._meta.concrete_fields:
+            if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+                saved.append((field, field.auto_now, field.auto_now_add))
+                field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+@contextmanager
+def signals_muted(*model_signals):
+    """Disconnect every receiver of the model signals (all by default) inside the block"""
+    saved = []
+    for signal in model_signals or MODEL_SIGNALS:
+        with signal.lock:
+            saved.append((signal, signal.receivers))
+            signal.receivers = []
+            signal.sender_receivers_cache.clear()
+    try:
+        yield
+    finally:
+        for signal, receivers in saved:
+            with signal.lock:
+                signal.receivers = receivers
+                signal.sender_receivers_cache.clear()
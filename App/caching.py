@@ -0,0 +1,103 @@
+"""
+Sectioned cache for the e-learning home page.
+
+Each section of `elearning_home` is cached on its own with its own TTL and
+dropped by the ClassSchedule / Resource / Course / ResourceCategory signals
+in models.py, so a new upload only rebuilds the resource sections and a
+rescheduled class only the class sections. Keys carry the date, so the
+"today" sections roll over at midnight by themselves.
+
+The member dashboard (App/dashboard.py) is cached per user the same way:
+receivers drop one user's entry when their payments, votes or downloads
+change, and changes that concern everyone (elections, payment types) move
+a shared generation so every entry is rebuilt on its next read.
+
+The cache must be shared by all workers (see CACHES in settings) or an
+invalidation in one process leaves the others serving stale sections.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from Project import metrics
+
+
+# Seconds each section may be served from cache before it is rebuilt anyway
+HOME_SECTION_TTLS = {
+    'today_classes': 5 * 60,
+    'upcoming_classes': 10 * 60,
+    'recent_resources': 30 * 60,
+    'popular_resources': 60 * 60,
+    'categories': 6 * 60 * 60,
+    'courses': 6 * 60 * 60,
+}
+
+# Seconds a member's dashboard may be served from cache
+DASHBOARD_TTL = 2 * 60
+DASHBOARD_GENERATION_KEY = 'dashboard:generation'
+
+CLASS_SECTIONS = ('today_classes', 'upcoming_classes')
+RESOURCE_SECTIONS = ('recent_resources', 'popular_resources', 'categories', 'courses')
+
+# Resource fields (and attnames) shown in the resource sections; saves that
+# only touch other fields (counters, scores) leave the sections cached
+RESOURCE_SECTION_FIELDS = frozenset({
+    'title', 'description', 'course', 'course_id', 'category', 'category_id', 'file', 'file_size', 'is_active',
+})
+
+
+def section_key(name, day=None):
+    day = day or timezone.now().date()
+    return f'elearning_home:{name}:{day.isoformat()}'
+
+
+def cached_section(name, build):
+    """Cached value of a home page section, built with `build()` on a miss"""
+    key = section_key(name)
+    value = cache.get(key)
+    metrics.cache_lookups.inc(area='home_section', result='miss' if value is None else 'hit')
+    if value is None:
+        value = list(build())
+        cache.add(key, value, HOME_SECTION_TTLS[name])
+    return value
+
+
+def invalidate_sections(*names, using='default'):
+    """Drop sections once the current transaction commits"""
+    keys = [section_key(name) for name in names]
+    transaction.on_commit(lambda: cache.delete_many(keys), using=using)
+
+
+def dashboard_key(user_id):
+    return f'dashboard:{user_id}'
+
+
+def cached_dashboard(user_id, build):
+    """A member's cached dashboard data, built with `build()` on a miss"""
+    key = dashboard_key(user_id)
+    # One round trip for the entry and the generation it must match
+    found = cache.get_many([key, DASHBOARD_GENERATION_KEY])
+    generation = found.get(DASHBOARD_GENERATION_KEY, 0)
+    entry = found.get(key)
+    hit = entry is not None and entry[0] == generation
+    metrics.cache_lookups.inc(area='dashboard', result='hit' if hit else 'miss')
+    if hit:
+        return entry[1]
+    value = build()
+    cache.set(key, (generation, value), DASHBOARD_TTL)
+    return value
+
+
+def invalidate_dashboard(user_id, using='default'):
+    """Drop one member's dashboard once the current transaction commits"""
+    key = dashboard_key(user_id)
+    transaction.on_commit(lambda: cache.delete(key), using=using)
+
+
+def invalidate_dashboards(using='default'):
+    """Make every member's cached dashboard stale once the current transaction commits"""
+    transaction.on_commit(
+        lambda: cache.set(DASHBOARD_GENERATION_KEY, time.time_ns(), None), using=using
+    )
@@ -0,0 +1,69 @@
+"""
+Data for the member dashboard.
+
+member_dashboard() answers everything the dashboard shows in three queries:
+dues status per active payment type, active elections with whether the
+member has voted, and their recent downloads. The result is cached per
+member (App/caching.py) and dropped by the Payment, Vote, ResourceDownload,
+PaymentType and Election receivers in models.py. Today's classes are the
+same for everyone and come from the e-learning home's cached section.
+"""
+from django.db.models import Exists, Max, OuterRef, Subquery
+from django.utils import timezone
+
+from payments.models import Payment, PaymentType
+from Voting.models import Election, Vote
+from .caching import cached_dashboard, cached_section
+from .models import ClassSchedule, ResourceDownload
+
+
+RECENT_DOWNLOADS = 5
+
+
+def dues_status(user):
+    """Active payment types, each annotated with `paid` and `paid_at` for this member"""
+    paid = Payment.objects.filter(user=user, payment_type=OuterRef('pk'), status='success')
+    return list(PaymentType.objects.filter(is_active=True).annotate(
+        paid=Exists(paid),
+        paid_at=Subquery(
+            paid.order_by().values('payment_type').annotate(last=Max('transaction_date')).values('last')
+        ),
+    ))
+
+
+def active_elections(user):
+    """Elections open for voting now, each annotated with `has_voted`"""
+    now = timezone.now()
+    return list(Election.objects.filter(
+        status='active', start_date__lte=now, end_date__gte=now
+    ).annotate(
+        has_voted=Exists(Vote.objects.filter(voter=user, candidate__position__election=OuterRef('pk')))
+    ).order_by('end_date'))
+
+
+def recent_downloads(user):
+    return list(
+        ResourceDownload.objects.filter(user=user)
+        .select_related('resource__course')
+        .order_by('-downloaded_at', '-id')[:RECENT_DOWNLOADS]
+    )
+
+
+def member_dashboard(user):
+    """Everything the dashboard shows for `user` (cached per member)"""
+    data = cached_dashboard(user.pk, lambda: {
+        'dues': dues_status(user),
+        'elections': active_elections(user),
+        'recent_downloads': recent_downloads(user),
+    })
+    today_classes = cached_section('today_classes', lambda: ClassSchedule.objects.filter_status(
+        'today', today=timezone.now().date()
+    ).select_related('course'))
+
+    dues = data['dues']
+    return {
+        **data,
+        'dues_paid': all(payment_type.paid for payment_type in dues),
+        'dues_outstanding': sum(payment_type.amount for payment_type in dues if not payment_type.paid),
+        'today_classes': today_classes,
+    }
@@ -0,0 +1,273 @@
+"""
+Plain-text extraction from resource files (PDF, DOCX, PPTX, TXT).
+
+Extraction runs outside the request cycle in a process pool: for each new or
+replaced upload as a background task (extract_resource, queued by a Resource
+receiver in models.py), and for anything missed by `manage.py
+extract_resource_text`; each worker is capped in address space and each file in
+wall-clock time so one malformed upload cannot stall or exhaust the server.
+Pool processes are spawned, never forked: a web worker runs threads, and a
+fork would inherit locks held by them (database, logging) and put the whole
+Django process under the memory cap. Background tasks share one pool per
+process, started on first use, so uploads do not pay an interpreter start.
+PDF support needs the optional `pypdf` package.
+"""
+import multiprocessing
+import os
+import re
+import signal
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from xml.etree import ElementTree
+
+try:
+    import resource as _rlimit  # Unix only
+except ImportError:
+    _rlimit = None
+
+try:
+    from pypdf import PdfReader
+except ImportError:
+    PdfReader = None
+
+
+# Stored text is capped; the first pages carry nearly all useful search terms
+MAX_TEXT_CHARS = 200_000
+
+# Background extraction pool (extract_resource)
+BACKGROUND_WORKERS = 1
+BACKGROUND_MAX_MEMORY_MB = 512
+
+WORKER_CRASHED = 'Extraction worker crashed'
+
+WORD_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+DRAWING_NS = '{http://schemas.openxmlformats.org/drawingml/2006/main}'
+
+
+class ExtractionError(Exception):
+    """A file's text could not be extracted"""
+
+
+class ExtractionTimeout(ExtractionError):
+    """Extraction took longer than the per-file limit"""
+
+
+def _clean(text):
+    text = re.sub(r'[ \t\r\f\v]+', ' ', text)
+    text = re.sub(r'\n\s*\n+', '\n', text)
+    return text.strip()[:MAX_TEXT_CHARS]
+
+
+def _xml_text(data, text_tag, paragraph_tag):
+    parts = []
+    for element in ElementTree.fromstring(data).iter():
+        if element.tag == text_tag and element.text:
+            parts.append(element.text)
+        elif element.tag == paragraph_tag:
+            parts.append('\n')
+    return ''.join(parts)
+
+
+def extract_txt(path):
+    with open(path, 'rb') as f:
+        data = f.read(MAX_TEXT_CHARS * 4)
+    return data.decode('utf-8', errors='replace')
+
+
+def extract_docx(path):
+    with zipfile.ZipFile(path) as archive:
+        return _xml_text(archive.read('word/document.xml'), f'{WORD_NS}t', f'{WORD_NS}p')
+
+
+def extract_pptx(path):
+    def slide_number(name):
+        return int(re.search(r'(\d+)\.xml$', name).group(1))
+
+    with zipfile.ZipFile(path) as archive:
+        slides = sorted(
+            (name for name in archive.namelist() if re.match(r'ppt/slides/slide\d+\.xml$', name)),
+            key=slide_number
+        )
+        return '\n'.join(
+            _xml_text(archive.read(name), f'{DRAWING_NS}t', f'{DRAWING_NS}p')
+            for name in slides
+        )
+
+
+def extract_pdf(path):
+    if PdfReader is None:
+        raise ExtractionError("PDF extraction needs the 'pypdf' package")
+    parts = []
+    size = 0
+    for page in PdfReader(path).pages:
+        text = page.extract_text() or ''
+        parts.append(text)
+        size += len(text)
+        if size >= MAX_TEXT_CHARS:
+            break
+    return '\n'.join(parts)
+
+
+EXTRACTORS = {
+    'txt': extract_txt,
+    'docx': extract_docx,
+    'pptx': extract_pptx,
+    'pdf': extract_pdf,
+}
+
+
+def can_extract(filename):
+    """Check if a file type has an extractor"""
+    return filename.rsplit('.', 1)[-1].lower() in EXTRACTORS
+
+
+def extract_text(path):
+    """Cleaned plain text of a file; raises ExtractionError on failure"""
+    extension = path.rsplit('.', 1)[-1].lower()
+    extractor = EXTRACTORS.get(extension)
+    if extractor is None:
+        raise ExtractionError(f"No text extractor for .{extension} files")
+    try:
+        return _clean(extractor(path))
+    except ExtractionError:
+        raise
+    except MemoryError:
+        raise ExtractionError("Memory limit exceeded")
+    except (zipfile.BadZipFile, KeyError, ElementTree.ParseError) as e:
+        raise ExtractionError(f"Unreadable .{extension} file: {e}")
+    except Exception as e:
+        raise ExtractionError(f"{type(e).__name__}: {e}")
+
+
+def _init_worker(max_memory_mb):
+    """Cap the worker's address space so a bad file raises MemoryError"""
+    if _rlimit is not None and max_memory_mb:
+        limit = max_memory_mb * 1024 * 1024
+        _rlimit.setrlimit(_rlimit.RLIMIT_AS, (limit, limit))
+
+
+def _on_alarm(signum, frame):
+    raise ExtractionTimeout("Time limit exceeded")
+
+
+def _extract_in_worker(path, timeout):
+    """Runs in a pool process; returns (text, error)"""
+    use_alarm = hasattr(signal, 'SIGALRM') and timeout
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _on_alarm)
+        signal.alarm(timeout)
+    try:
+        return extract_text(path), ''
+    except ExtractionError as e:
+        return '', str(e)[:255]
+    finally:
+        if use_alarm:
+            signal.alarm(0)
+
+
+_spawn = multiprocessing.get_context('spawn')
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def new_pool(workers, max_memory_mb):
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=_spawn,
+        initializer=_init_worker,
+        initargs=(max_memory_mb,)
+    )
+
+
+def get_pool():
+    """This process's pool for background extraction, started on first use"""
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = new_pool(BACKGROUND_WORKERS, BACKGROUND_MAX_MEMORY_MB)
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def _discard_pool(pool):
+    """Forget a broken pool; the next task starts a new one"""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False)
+
+
+def extract_many(jobs, workers=2, timeout=60, max_memory_mb=512, pool=None):
+    """
+    Extract text for (key, path) jobs in a process pool (a new one, or `pool`).
+    Yields (key, text, error) as files finish. A worker that dies outright
+    fails its remaining jobs instead of aborting the whole run.
+    """
+    jobs = list(jobs)
+    if not jobs:
+        return
+    if pool is None:
+        with new_pool(workers, max_memory_mb) as pool:
+            yield from _run_jobs(pool, jobs, timeout)
+    else:
+        yield from _run_jobs(pool, jobs, timeout)
+
+
+def _run_jobs(pool, jobs, timeout):
+    futures = {
+        pool.submit(_extract_in_worker, path, timeout): key
+        for key, path in jobs
+    }
+    for future in as_completed(futures):
+        key = futures[future]
+        try:
+            text, error = future.result()
+        except BrokenProcessPool:
+            text, error = '', WORKER_CRASHED
+        yield key, text, error
+
+
+def local_path(fieldfile):
+    """Filesystem path of a stored file, or None if it is not on local disk"""
+    try:
+        path = fieldfile.path
+    except NotImplementedError:
+        return None
+    return path if os.path.exists(path) else None
+
+
+def save_text(resource, text, error):
+    """Store a resource's extracted text (or the error) against its current file"""
+    from .models import ResourceText
+    resource_text = (
+        ResourceText.objects.filter(resource=resource).first() or
+        ResourceText(resource=resource)
+    )
+    resource_text.source_name = resource.file.name
+    resource_text.error = error
+    resource_text.set_text(text)
+    resource_text.save()
+
+
+def extract_resource(resource_id, timeout=60):
+    """Background task: extract the text of a newly uploaded or replaced file"""
+    from .models import Resource, ResourceText
+    resource = Resource.objects.filter(pk=resource_id, is_active=True).exclude(file='').first()
+    if resource is None or ResourceText.objects.filter(resource=resource, source_name=resource.file.name).exists():
+        return  # Gone, or already extracted from this file
+    path = local_path(resource.file)
+    if path is None:
+        return  # Left to extract_resource_text on a host that has the file
+    pool = get_pool()
+    try:
+        for _, text, error in extract_many([(resource.pk, path)], timeout=timeout, pool=pool):
+            if error == WORKER_CRASHED:
+                _discard_pool(pool)
+            save_text(resource, text, error)
+    except BrokenProcessPool:
+        _discard_pool(pool)  # Broken by an earlier task; this file is retried by the command
+        raise
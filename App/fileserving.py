@@ -0,0 +1,252 @@
+"""
+Serving stored files (resources, media) with ETag, Range and proxy offload.
+
+FILE_SERVE_MODE picks who moves the bytes:
+    'django'    - stream from the worker (FileResponse / 206 partial content)
+    'x-accel'   - nginx, via X-Accel-Redirect to FILE_ACCEL_REDIRECT_PREFIX
+    'x-sendfile' - Apache mod_xsendfile / lighttpd, via X-Sendfile
+The proxy modes fall back to Django when the storage has no local path.
+
+Public images under MEDIA_PUBLIC_PREFIXES are answered by serve_media() from
+MediaFilesMiddleware, ahead of sessions, auth and the URL resolver. Names
+carrying a content hash (storage.HashedMediaStorage) never change meaning,
+so they are sent as immutable for a year; older unhashed names get a short
+max-age. Browsers that accept WebP get the precomputed WebP variant.
+"""
+import hashlib
+import mimetypes
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, HttpResponse, HttpResponseNotFound, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import content_disposition_header
+
+from .storage import blob_digest, content_digest, is_blob_name, media_storage, webp_name
+
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+STREAM_CHUNK_SIZE = 64 * 1024
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def file_etag(fieldfile, size=None):
+    """
+    Strong ETag for a stored file. Content-addressed and hashed names carry
+    the digest of their bytes, which is used as is. Any other name may be
+    overwritten in place, so its tag also covers the modification time.
+    """
+    name = fieldfile.name
+    if is_blob_name(name):
+        return f'"{blob_digest(name)}"'
+    if content_digest(name):
+        return f'"{content_digest(name)}"'
+    if size is None:
+        size = fieldfile.size
+    try:
+        modified = fieldfile.storage.get_modified_time(name).timestamp()
+    except (NotImplementedError, OSError):
+        modified = ''
+    digest = hashlib.md5(f'{name}:{size}:{modified}'.encode(), usedforsecurity=False).hexdigest()
+    return f'"{digest}"'
+
+
+def parse_range(header, size):
+    """
+    Parse a single `bytes=` range.
+    Returns (start, end) inclusive, None to serve the whole file, or False
+    if the range cannot be satisfied. Only one range per request is served:
+    a multi-range request is answered 416, like an unsatisfiable one.
+    """
+    header = header.strip() if header else ''
+    if header.startswith('bytes=') and ',' in header:
+        return False
+    match = RANGE_RE.match(header)
+    if not match:
+        return None  # Absent or not a byte range: send everything
+
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the final N bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, min(end, size - 1)
+
+
+def requested_range(request, etag, size):
+    """Range to honour for this request, taking If-Range into account"""
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range and if_range.strip() != etag:
+        return None  # File changed since the partial copy was fetched
+    return parse_range(request.META.get('HTTP_RANGE', ''), size)
+
+
+def is_resumed_transfer(request):
+    """True when the client is continuing a download it already started"""
+    match = RANGE_RE.match(request.META.get('HTTP_RANGE', '').strip())
+    return bool(match and (match.group(1) or '0') != '0')
+
+
+def _range_iterator(file, start, length):
+    try:
+        file.seek(start)
+        remaining = length
+        while remaining > 0:
+            data = file.read(min(STREAM_CHUNK_SIZE, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+    finally:
+        file.close()
+
+
+def _local_path(fieldfile):
+    try:
+        return fieldfile.path
+    except NotImplementedError:
+        return None
+
+
+def _offload_response(fieldfile, mode):
+    """Empty response telling the front proxy to send the file itself"""
+    if mode == 'x-accel':
+        response = HttpResponse()
+        prefix = settings.FILE_ACCEL_REDIRECT_PREFIX.rstrip('/')
+        response['X-Accel-Redirect'] = f'{prefix}/{quote(fieldfile.name)}'
+        return response
+
+    path = _local_path(fieldfile)
+    if mode == 'x-sendfile' and path:
+        response = HttpResponse()
+        response['X-Sendfile'] = path
+        return response
+    return None
+
+
+def serve_file(request, fieldfile, filename=None, as_attachment=True, size=None,
+               etag=None, cache_control=None, content_encoding=None):
+    """
+    Response for a stored file supporting If-None-Match, If-Range and single
+    byte ranges. Raises FileNotFoundError if Django has to read a missing file.
+    """
+    filename = filename or fieldfile.name.split('/')[-1]
+    etag = etag or file_etag(fieldfile, size)
+
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        if cache_control:
+            not_modified['Cache-Control'] = cache_control
+        return not_modified
+
+    content_type, _ = mimetypes.guess_type(filename)
+    content_type = content_type or 'application/octet-stream'
+
+    response = _offload_response(fieldfile, getattr(settings, 'FILE_SERVE_MODE', 'django'))
+    if response is not None:
+        # The proxy does Range/Content-Length; we only describe the file
+        response['Content-Type'] = content_type
+    else:
+        size = fieldfile.size if size is None else size
+        byte_range = requested_range(request, etag, size)
+
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+        file = fieldfile.open('rb')
+        if byte_range:
+            start, end = byte_range
+            length = end - start + 1
+            response = StreamingHttpResponse(
+                _range_iterator(file, start, length),
+                status=206,
+                content_type=content_type
+            )
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+            response['Content-Length'] = str(length)
+        else:
+            response = FileResponse(file, content_type=content_type)
+            response['Content-Length'] = str(size)
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    if content_encoding:
+        response['Content-Encoding'] = content_encoding
+        response['Vary'] = 'Accept-Encoding'
+    if cache_control:
+        response['Cache-Control'] = cache_control
+    disposition = content_disposition_header(as_attachment, filename)
+    if disposition:
+        response['Content-Disposition'] = disposition
+    return response
+
+
+class StoredFile:
+    """The part of a FieldFile serve_file() needs, for a bare storage name"""
+
+    def __init__(self, storage, name):
+        self.storage = storage
+        self.name = name
+
+    @property
+    def size(self):
+        return self.storage.size(self.name)
+
+    @property
+    def path(self):
+        return self.storage.path(self.name)
+
+    def open(self, mode='rb'):
+        return self.storage.open(self.name, mode)
+
+
+def is_public_media(name):
+    return name.startswith(tuple(settings.MEDIA_PUBLIC_PREFIXES))
+
+
+def serve_media(request, name):
+    """Response for a public media file, with long caching for hashed names"""
+    name = posixpath.normpath(name).lstrip('/')
+    try:
+        if not is_public_media(name) or not media_storage.exists(name):
+            return HttpResponseNotFound()
+    except SuspiciousFileOperation:
+        return HttpResponseNotFound()
+
+    digest = content_digest(name)
+    filename = name.rsplit('/', 1)[-1]
+    etag = f'"{digest}"' if digest else None
+    cache_control = IMMUTABLE_CACHE_CONTROL if digest else f'public, max-age={settings.MEDIA_MAX_AGE}'
+
+    accepts_webp = 'image/webp' in request.META.get('HTTP_ACCEPT', '')
+    if digest and accepts_webp and media_storage.exists(webp_name(name)):
+        name, filename, etag = webp_name(name), filename + '.webp', f'"{digest}-webp"'
+
+    response = serve_file(
+        request,
+        StoredFile(media_storage, name),
+        filename=filename,
+        as_attachment=False,
+        etag=etag,
+        cache_control=cache_control
+    )
+    if digest:
+        # Caches must keep the JPEG/PNG and WebP answers apart
+        patch_vary_headers(response, ('Accept',))
+    return response
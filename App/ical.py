@@ -0,0 +1,161 @@
+"""
+iCalendar (.ics) subscription feeds for class schedules.
+
+Calendar apps poll a feed every few minutes, so each feed is rendered once,
+cached with its ETag and generation time, and answered with a 304 while
+unchanged. The ClassSchedule and Course signals in models.py drop the feed
+of the course that changed and the (few) level feeds; other course feeds
+stay cached. The body holds nothing time-dependent, so an expired feed that
+is rebuilt unchanged keeps its ETag.
+
+Calendar apps cannot log in, so feed URLs carry a signed token naming the
+student they were issued to and their UserProfile.calendar_secret
+(feed_token / user_for_token). Feed links end up in third-party calendar
+services, so reset_feed_token replaces the secret to revoke them, and the
+feed leaves meeting passwords out: students read those on the class page.
+"""
+import hashlib
+import secrets
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.contrib.auth.models import User
+from django.core import signing
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from Project import metrics
+
+
+# Feeds are rebuilt on change; the TTL only moves the window of past classes
+FEED_TTL = 24 * 60 * 60
+PAST_DAYS = 30
+TOKEN_SALT = 'App.ical.feed'
+
+LEVELS = ('100', '200', '300', '400', '500')
+
+
+def feed_token(user):
+    """The student's feed token, creating their calendar secret on first use"""
+    profile = user.user_profile
+    if not profile.calendar_secret:
+        profile.calendar_secret = secrets.token_hex(16)
+        profile.save(update_fields=['calendar_secret'])
+    return signing.Signer(salt=TOKEN_SALT).sign(f'{user.pk}:{profile.calendar_secret}')
+
+
+def reset_feed_token(user):
+    """Revoke every feed link issued to `user`; feed_token then issues a new one"""
+    profile = user.user_profile
+    profile.calendar_secret = secrets.token_hex(16)
+    profile.save(update_fields=['calendar_secret'])
+
+
+def user_for_token(token):
+    """Active user a feed token was issued to, or None once it was reset"""
+    try:
+        pk, secret = signing.Signer(salt=TOKEN_SALT).unsign(token).split(':', 1)
+    except (signing.BadSignature, ValueError):
+        return None
+    if not secret:
+        return None
+    return User.objects.filter(pk=pk, is_active=True, user_profile__calendar_secret=secret).first()
+
+
+def _escape(text):
+    return (
+        text.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+    )
+
+
+def _fold(line):
+    """Split content lines longer than 75 octets (RFC 5545, 3.1)"""
+    data = line.encode('utf-8')
+    if len(data) <= 75:
+        return line
+    parts = []
+    while data:
+        limit = 75 if not parts else 74
+        cut = min(limit, len(data))
+        while cut < len(data) and (data[cut] & 0xC0) == 0x80:
+            cut -= 1  # Never split a UTF-8 sequence
+        parts.append(data[:cut].decode('utf-8'))
+        data = data[cut:]
+    return '\r\n '.join(parts)
+
+
+def _utc(date, time):
+    return _stamp(timezone.make_aware(datetime.combine(date, time)))
+
+
+def _stamp(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _event(cls):
+    description = [cls.description, f"Lecturer: {cls.lecturer}", f"Join: {cls.meeting_link}"]
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:class-{cls.pk}@nacos',
+        f'DTSTAMP:{_stamp(cls.created_at)}',
+        f'DTSTART:{_utc(cls.date, cls.start_time)}',
+        f'DTEND:{_utc(cls.date, cls.end_time)}',
+        f'SUMMARY:{_escape(f"{cls.course.code} - {cls.title}")}',
+        f'DESCRIPTION:{_escape(chr(10).join(part for part in description if part))}',
+        f'LOCATION:{_escape(cls.meeting_link)}',
+        f'URL:{cls.meeting_link}',
+        'END:VEVENT',
+    ]
+    return lines
+
+
+def render_calendar(name, classes):
+    """iCalendar document for a list of classes"""
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//NACOS//Class Schedule//EN',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{_escape(name)}',
+        'REFRESH-INTERVAL;VALUE=DURATION:PT1H',
+    ]
+    for cls in classes:
+        lines.extend(_event(cls))
+    lines.append('END:VCALENDAR')
+    return '\r\n'.join(_fold(line) for line in lines) + '\r\n'
+
+
+def feed_key(kind, value):
+    return f'ical:{kind}:{value}'
+
+
+def get_feed(kind, value, build):
+    """
+    Cached feed as {'body', 'etag', 'last_modified'}; `build()` returns
+    (calendar name, classes) on a miss.
+    """
+    key = feed_key(kind, value)
+    feed = cache.get(key)
+    metrics.cache_lookups.inc(area='calendar_feed', result='miss' if feed is None else 'hit')
+    if feed is None:
+        body = render_calendar(*build())
+        feed = {
+            'body': body,
+            'etag': '"%s"' % hashlib.md5(body.encode('utf-8')).hexdigest(),
+            'last_modified': timezone.now().replace(microsecond=0),
+        }
+        cache.set(key, feed, FEED_TTL)
+    return feed
+
+
+def feed_start_date():
+    return timezone.now().date() - timedelta(days=PAST_DAYS)
+
+
+def invalidate_feeds(course_ids=(), levels=(), using='default'):
+    """Drop course and level feeds once the current transaction commits"""
+    keys = [feed_key('course', pk) for pk in course_ids]
+    keys += [feed_key('level', level) for level in levels]
+    transaction.on_commit(lambda: cache.delete_many(keys), using=using)
@@ -0,0 +1,118 @@
+"""
+Profile picture processing.
+
+A new upload is stored as-is by the request; process_profile_picture() then
+runs in the background (App/tasks.py) to fit the picture into 100KB and cut a
+small square avatar for list views. The JPEG quality that fits is found by
+binary search, so a picture costs a handful of encodes instead of up to 16.
+
+Every image saved to the hashed media storage also gets a WebP copy
+(make_webp_variant), served instead of the original to browsers that accept it.
+"""
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+
+PICTURE_MAX_SIZE = (400, 400)
+PICTURE_MAX_BYTES = 100 * 1024
+AVATAR_SIZE = (96, 96)
+AVATAR_QUALITY = 80
+WEBP_QUALITY = 80
+MIN_QUALITY = 20
+MAX_QUALITY = 95
+
+
+def encode_jpeg(img, quality):
+    output = BytesIO()
+    img.save(output, format='JPEG', quality=quality, optimize=True)
+    return output.getvalue()
+
+
+def compress_jpeg(img, max_bytes, min_quality=MIN_QUALITY, max_quality=MAX_QUALITY):
+    """
+    Highest-quality JPEG encoding of `img` that fits in `max_bytes`
+    (size shrinks with quality). Falls back to `min_quality` if nothing fits.
+    """
+    best = None
+    low, high = min_quality, max_quality
+    while low <= high:
+        quality = (low + high) // 2
+        data = encode_jpeg(img, quality)
+        if len(data) <= max_bytes:
+            best = data
+            low = quality + 1
+        else:
+            high = quality - 1
+    return best if best is not None else encode_jpeg(img, min_quality)
+
+
+def make_webp_variant(name):
+    """Write the WebP copy of a stored image, unless it would not be smaller"""
+    from .storage import media_storage, webp_name
+
+    if not media_storage.exists(name):
+        return  # Replaced and deleted since it was saved
+    with media_storage.open(name, 'rb') as file:
+        img = ImageOps.exif_transpose(Image.open(file))
+        if img.mode not in ('RGB', 'RGBA'):
+            img = img.convert('RGBA' if 'transparency' in img.info else 'RGB')
+        output = BytesIO()
+        img.save(output, format='WEBP', quality=WEBP_QUALITY, method=4)
+
+    variant = webp_name(name)
+    if output.tell() < media_storage.size(name) and not media_storage.exists(variant):
+        media_storage.save_variant(variant, ContentFile(output.getvalue()))
+
+
+def _open_rgb(fieldfile):
+    fieldfile.open('rb')
+    try:
+        img = Image.open(fieldfile)
+        img = ImageOps.exif_transpose(img)
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+        img.load()
+    finally:
+        fieldfile.close()
+    return img
+
+
+def process_profile_picture(profile_id, picture_name):
+    """Compress a newly uploaded picture and create its avatar"""
+    from .models import UserProfile
+
+    profile = UserProfile.objects.filter(pk=profile_id, profile_picture=picture_name).first()
+    if profile is None:
+        return  # Replaced or removed since the upload
+
+    img = _open_rgb(profile.profile_picture)
+    img.thumbnail(PICTURE_MAX_SIZE, Image.Resampling.LANCZOS)
+    avatar = ImageOps.fit(img, AVATAR_SIZE, Image.Resampling.LANCZOS)
+
+    stem = os.path.splitext(os.path.basename(picture_name))[0]
+    storage = profile.profile_picture.storage
+    new_picture = storage.save(
+        f'profile_pictures/{stem}.jpg',
+        ContentFile(compress_jpeg(img, PICTURE_MAX_BYTES))
+    )
+    new_avatar = storage.save(
+        f'profile_pictures/avatars/{stem}.jpg',
+        ContentFile(encode_jpeg(avatar, AVATAR_QUALITY))
+    )
+
+    # Only swap in the results if no newer upload happened meanwhile
+    old_avatar = profile.profile_avatar.name
+    updated = UserProfile.objects.filter(pk=profile_id, profile_picture=picture_name).update(
+        profile_picture=new_picture,
+        profile_avatar=new_avatar
+    )
+    if updated:
+        storage.delete(picture_name)
+        if old_avatar:
+            storage.delete(old_avatar)
+    else:
+        storage.delete(new_picture)
+        storage.delete(new_avatar)
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q
+
+from App import extraction
+from App.models import Resource
+
+
+class Command(BaseCommand):
+    help = "Extract searchable text from new or changed resource files"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help="Extraction processes")
+        parser.add_argument('--timeout', type=int, default=60, help="Seconds allowed per file")
+        parser.add_argument('--max-memory', type=int, default=512, help="Memory cap per worker in MB")
+        parser.add_argument('--limit', type=int, default=500, help="Files processed in one run")
+        parser.add_argument('--force', action='store_true', help="Re-extract files that did not change")
+
+    def handle(self, *args, **options):
+        resources = Resource.objects.filter(is_active=True).exclude(file='')
+        if not options['force']:
+            # Only files never extracted or replaced since the last extraction
+            resources = resources.filter(
+                Q(extracted_text__isnull=True) |
+                ~Q(extracted_text__source_name=F('file'))
+            )
+
+        jobs = []
+        skipped = 0
+        for resource in resources.order_by('pk')[:options['limit']]:
+            path = extraction.local_path(resource.file)
+            if path and extraction.can_extract(resource.file.name):
+                jobs.append((resource, path))
+            else:
+                # Record the attempt so the file is not retried until it changes
+                error = 'File missing or not on local storage' if not path else 'Unsupported file type'
+                extraction.save_text(resource, '', error)
+                skipped += 1
+
+        extracted = failed = 0
+        for resource, text, error in extraction.extract_many(
+            jobs,
+            workers=options['workers'],
+            timeout=options['timeout'],
+            max_memory_mb=options['max_memory']
+        ):
+            extraction.save_text(resource, text, error)
+            if error:
+                failed += 1
+                self.stderr.write(f"{resource.file.name}: {error}")
+            else:
+                extracted += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Extracted {extracted} file(s), {failed} failed, {skipped} skipped"
+        ))
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from App.images import make_webp_variant
+from App.models import UserProfile
+from App.storage import content_digest, media_storage
+from Voting.models import Candidate
+
+
+MEDIA_FIELDS = (
+    (UserProfile, 'profile_picture'),
+    (UserProfile, 'profile_avatar'),
+    (Candidate, 'profile_image'),
+    (Candidate, 'campaign_poster'),
+)
+
+
+class Command(BaseCommand):
+    help = "Give images uploaded before hashed media storage a content-hashed name and a WebP variant"
+
+    def handle(self, *args, **options):
+        renamed = missing = 0
+        for model, field in MEDIA_FIELDS:
+            rows = model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+            for pk, name in rows.values_list('pk', field).iterator():
+                if content_digest(name):
+                    make_webp_variant(name)  # Idempotent
+                    continue
+                if not media_storage.exists(name):
+                    missing += 1
+                    continue
+
+                with media_storage.open(name, 'rb') as file:
+                    new_name = media_storage.save(name, file)
+                # Conditional update: skip rows changed since they were read
+                if model.objects.filter(pk=pk, **{field: name}).update(**{field: new_name}):
+                    media_storage.delete(name)
+                    renamed += 1
+                else:
+                    media_storage.delete(new_name)
+
+        self.stdout.write(self.style.SUCCESS(f"Renamed {renamed} file(s), {missing} missing"))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from App import search
+from App.models import Resource
+
+
+class Command(BaseCommand):
+    help = "Rebuild the resource library full-text search index"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help="Database whose index should be rebuilt"
+        )
+
+    def handle(self, *args, **options):
+        using = options['database']
+        if not search.has_index(using):
+            raise CommandError(
+                f"Database '{using}' has no search index. Run migrate first "
+                f"(only SQLite and PostgreSQL are supported)."
+            )
+
+        count = search.rebuild_index(Resource.objects.using(using).filter(is_active=True), using)
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} resource(s)"))
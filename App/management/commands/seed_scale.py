@@ -0,0 +1,309 @@
+import math
+import random
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from App import search
+from App.bulk import explicit_timestamps
+from App.caching import CLASS_SECTIONS, RESOURCE_SECTIONS, invalidate_sections
+from App.models import (
+    Course, Resource, ResourceCategory, ResourceDownload, StoredBlob, UserPreferences, UserProfile
+)
+from App.storage import resource_storage
+from payments.models import Payment, PaymentHistory, PaymentType
+from Voting.models import Candidate, Election, Position, Vote, VoterProfile, VotingSession
+
+
+# Everything generated is recognisable, so --clear removes exactly this data
+USERNAME_PREFIX = 'seed'
+TITLE_PREFIX = '[seed] '
+COURSE_PREFIX = 'SEED'
+
+LEVELS = ['100', '200', '300', '400', '500']
+PAYMENT_STATUSES = ['success', 'pending', 'failed', 'abandoned']
+PAYMENT_STATUS_WEIGHTS = [70, 10, 15, 5]
+CATEGORIES = ['Lecture notes', 'Past questions', 'Slides', 'Assignments', 'Textbooks', 'Lab manuals']
+BLOB_POOL_SIZE = 50  # Distinct files shared by all resources (content-addressed storage)
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a large, reproducible data set for benchmarking: users with profiles, "
+        "elections with votes, payments with history, resources and downloads"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50_000)
+        parser.add_argument('--elections', type=int, default=5)
+        parser.add_argument('--votes', type=int, default=500_000)
+        parser.add_argument('--payments', type=int, default=200_000)
+        parser.add_argument('--resources', type=int, default=10_000)
+        parser.add_argument('--downloads', type=int, default=1_000_000)
+        parser.add_argument('--scale', type=float, default=1.0, help="Multiply every volume (e.g. 0.01 for a quick run)")
+        parser.add_argument('--seed', type=int, default=42, help="Same seed and volumes give the same data")
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--clear', action='store_true', help="Delete previously seeded data first")
+
+    def handle(self, *args, **options):
+        scale = options['scale']
+        self.volumes = {
+            name: max(int(options[name] * scale), 1)
+            for name in ('users', 'votes', 'payments', 'resources', 'downloads')
+        }
+        self.volumes['elections'] = options['elections']
+        self.batch_size = options['batch_size']
+        self.rng = random.Random(options['seed'])
+        self.now = timezone.now()
+
+        seeded_users = User.objects.filter(username__startswith=USERNAME_PREFIX)
+        if options['clear']:
+            self.step("Clearing previous seed", self.clear)
+        elif seeded_users.exists():
+            raise CommandError("Seeded data already exists; rerun with --clear to replace it")
+
+        with explicit_timestamps(User, Payment, PaymentHistory, Vote, VotingSession, Resource, ResourceDownload):
+            user_ids = self.step("Users", self.create_users)
+            paid = self.step("Payments", self.create_payments, user_ids)
+            self.step("Profiles", self.create_profiles, user_ids, paid)
+            self.step("Elections and votes", self.create_elections, user_ids)
+            resource_ids = self.step("Resources", self.create_resources)
+            self.step("Downloads", self.create_downloads, user_ids, resource_ids)
+        # bulk_create sends no signals: rebuild what the receivers would have kept up to date
+        self.step("Counters, search index and trending scores", self.refresh_derived_data)
+
+        self.stdout.write(self.style.SUCCESS(
+            "Seeded " + ", ".join(f"{count} {name}" for name, count in self.volumes.items())
+        ))
+
+    def step(self, label, func, *args):
+        start = time.perf_counter()
+        with transaction.atomic():
+            result = func(*args)
+        self.stdout.write(f"{label}: {time.perf_counter() - start:.1f}s")
+        return result
+
+    def bulk(self, model, rows):
+        """bulk_create an iterable of instances in batches; returns the created pks"""
+        pks = []
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                pks += [obj.pk for obj in model.objects.bulk_create(batch)]
+                batch = []
+        pks += [obj.pk for obj in model.objects.bulk_create(batch)]
+        return pks
+
+    def moment(self, days_back, recent_bias=1.0):
+        """A time up to `days_back` days ago; recent_bias > 1 skews towards now"""
+        return self.now - timedelta(days=days_back * self.rng.random() ** recent_bias)
+
+    def clear(self):
+        Resource.objects.filter(course__code__startswith=COURSE_PREFIX).delete()
+        Course.objects.filter(code__startswith=COURSE_PREFIX).delete()
+        ResourceCategory.objects.filter(name__startswith=TITLE_PREFIX).delete()
+        Election.objects.filter(title__startswith=TITLE_PREFIX).delete()
+        PaymentType.objects.filter(name__startswith=TITLE_PREFIX).delete()
+        User.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+
+    def create_users(self):
+        password = make_password('seed-password')  # Hashed once: PBKDF2 per user would dominate
+        return self.bulk(User, (
+            User(
+                username=f'{USERNAME_PREFIX}{i:07}',
+                email=f'{USERNAME_PREFIX}{i:07}@example.com',
+                password=password,
+                first_name=f'Student{i}',
+                date_joined=self.moment(4 * 365)
+            )
+            for i in range(self.volumes['users'])
+        ))
+
+    def create_payments(self, user_ids):
+        """Payments with history; returns the users holding a successful payment"""
+        types = PaymentType.objects.bulk_create([
+            PaymentType(name=f'{TITLE_PREFIX}{name}', description=name, amount=Decimal(amount))
+            for name, amount in (('Departmental dues', 2000), ('Lab fee', 1500), ('Dinner ticket', 5000))
+        ])
+        paid = set()
+        payments = []
+        for _ in range(self.volumes['payments']):
+            payment_type = self.rng.choice(types)
+            status = self.rng.choices(PAYMENT_STATUSES, PAYMENT_STATUS_WEIGHTS)[0]
+            index = self.rng.randrange(len(user_ids))
+            user_id = user_ids[index]
+            created = self.moment(365, recent_bias=1.5)
+            if status == 'success':
+                paid.add(user_id)
+            payments.append(Payment(
+                user_id=user_id,
+                payment_type=payment_type,
+                reference=str(uuid.UUID(int=self.rng.getrandbits(128))),
+                amount=payment_type.amount,
+                status=status,
+                email=f'{USERNAME_PREFIX}{index:07}@example.com',
+                transaction_date=created if status == 'success' else None,
+                gateway_response={'status': status} if status in ('success', 'failed') else None,
+                created_at=created,
+                updated_at=created
+            ))
+        payment_ids = self.bulk(Payment, payments)
+
+        history = []
+        for payment_id, payment in zip(payment_ids, payments):
+            history.append(PaymentHistory(payment_id=payment_id, status='pending', note='Initialized', created_at=payment.created_at))
+            if payment.status != 'pending':
+                history.append(PaymentHistory(
+                    payment_id=payment_id, status=payment.status,
+                    created_at=payment.created_at + timedelta(minutes=self.rng.randint(1, 30))
+                ))
+        self.bulk(PaymentHistory, history)
+        return paid
+
+    def create_profiles(self, user_ids, paid):
+        """What the User post_save receiver and voter registration would create"""
+        levels = {user_id: self.rng.choice(LEVELS) for user_id in user_ids}
+        self.bulk(UserProfile, (
+            UserProfile(user_id=user_id, level=levels[user_id], registration_number=f'NACOS/{user_id:07}')
+            for user_id in user_ids
+        ))
+        self.bulk(UserPreferences, (
+            UserPreferences(user_id=user_id, dark_mode=self.rng.random() < 0.3)
+            for user_id in user_ids
+        ))
+        self.bulk(VoterProfile, (
+            VoterProfile(
+                user_id=user_id,
+                registration_number=f'{USERNAME_PREFIX.upper()}/{user_id:07}',
+                level=levels[user_id],
+                has_paid_dues=user_id in paid,
+                is_verified=self.rng.random() < 0.9
+            )
+            for user_id in user_ids
+        ))
+
+    def create_elections(self, user_ids):
+        count = self.volumes['elections']
+        votes_per_election = self.volumes['votes'] // count
+        for index in range(count):
+            # Oldest first; the last one is running now
+            if index == count - 1:
+                start, end = self.now - timedelta(days=1), self.now + timedelta(days=1)
+            else:
+                end = self.now - timedelta(days=90 * (count - 1 - index))
+                start = end - timedelta(days=2)
+            election = Election.objects.create(
+                title=f'{TITLE_PREFIX}Election {index + 1}',
+                description='Generated by seed_scale',
+                start_date=start,
+                end_date=end,
+                status='active' if end > self.now else 'closed',
+                results_published=end < self.now
+            )
+
+            ballot = []
+            for order, (name, _) in enumerate(Position.POSITION_CHOICES):
+                position = Position.objects.create(election=election, name=name, order=order)
+                candidates = Candidate.objects.bulk_create([
+                    Candidate(position=position, name=f'Candidate {order}-{i}', registration_number=f'C{index}-{order}-{i}', manifesto='-')
+                    for i in range(self.rng.randint(2, 5))
+                ])
+                # Uneven popularity, so results are not a uniform split
+                weights = [self.rng.random() ** 2 + 0.05 for _ in candidates]
+                ballot.append(([candidate.pk for candidate in candidates], weights))
+
+            turnout = min(math.ceil(votes_per_election / len(ballot)), len(user_ids))
+            voters = self.rng.sample(user_ids, turnout)
+            voting_end = min(end, self.now)
+
+            def votes():
+                for voter_id in voters:
+                    cast = start + (voting_end - start) * self.rng.random()
+                    for candidate_ids, weights in ballot:
+                        yield Vote(voter_id=voter_id, candidate_id=self.rng.choices(candidate_ids, weights)[0], timestamp=cast)
+
+            self.bulk(Vote, votes())
+            self.bulk(VotingSession, (
+                VotingSession(voter_id=voter_id, election=election, is_completed=True, started_at=start, completed_at=start)
+                for voter_id in voters
+            ))
+
+    def create_resources(self):
+        courses = Course.objects.bulk_create([
+            Course(code=f'{COURSE_PREFIX}{level}{i}', name=f'Course {level}-{i}', level=level)
+            for level in LEVELS for i in range(8)
+        ])
+        categories = ResourceCategory.objects.bulk_create([
+            ResourceCategory(name=f'{TITLE_PREFIX}{name}', order=order) for order, name in enumerate(CATEGORIES)
+        ])
+        blobs = []
+        for i in range(BLOB_POOL_SIZE):
+            content = f'%PDF-1.4 seed document {i}\n'.encode() * self.rng.randint(10, 2000)
+            blobs.append((resource_storage.save(f'seed{i}.pdf', ContentFile(content)), len(content)))
+
+        def resources():
+            for i in range(self.volumes['resources']):
+                name, size = self.rng.choice(blobs)
+                yield Resource(
+                    title=f'Resource {i}',
+                    description=f'Generated resource {i}',
+                    course=self.rng.choice(courses),
+                    category=self.rng.choice(categories),
+                    file=name,
+                    file_size=size,
+                    upload_date=self.moment(730),
+                    is_active=self.rng.random() < 0.95
+                )
+
+        return self.bulk(Resource, resources())
+
+    def create_downloads(self, user_ids, resource_ids):
+        # Zipf-like popularity: a few resources get most downloads
+        cum_weights = list(accumulate(1 / rank for rank in range(1, len(resource_ids) + 1)))
+        popular = resource_ids[:]
+        self.rng.shuffle(popular)
+
+        self.bulk(ResourceDownload, (
+            ResourceDownload(
+                resource_id=self.rng.choices(popular, cum_weights=cum_weights)[0],
+                user_id=self.rng.choice(user_ids),
+                downloaded_at=self.moment(90, recent_bias=2),
+                ip_address=f'10.{self.rng.randint(0, 255)}.{self.rng.randint(0, 255)}.{self.rng.randint(1, 254)}'
+            )
+            for _ in range(self.volumes['downloads'])
+        ))
+
+    def refresh_derived_data(self):
+        seeded = Resource.objects.filter(course__code__startswith=COURSE_PREFIX)
+        downloads = ResourceDownload.objects.filter(resource=OuterRef('pk')).order_by().values('resource')
+        Resource.objects.filter(pk__in=seeded.values('pk')).update(
+            download_count=Coalesce(Subquery(downloads.annotate(total=Count('id')).values('total')), 0)
+        )
+
+        for model in (Course, ResourceCategory):
+            counted = model.objects.annotate(
+                active=Count('resources', filter=Q(resources__is_active=True))
+            ).values_list('pk', 'active')
+            for pk, active in counted:
+                model.objects.filter(pk=pk).update(active_resource_count=active)
+
+        for name in seeded.order_by().values_list('file', flat=True).distinct():
+            blob, _ = StoredBlob.objects.get_or_create(name=name, defaults={'size': resource_storage.size(name)})
+            StoredBlob.objects.filter(pk=blob.pk).update(ref_count=Resource.objects.filter(file=name).count())
+
+        search.rebuild_index(Resource.objects.filter(is_active=True))
+        call_command('update_trending_resources', full=True, stdout=self.stdout)
+        invalidate_sections(*CLASS_SECTIONS, *RESOURCE_SECTIONS)
@@ -0,0 +1,261 @@
+import hashlib
+import json
+import os
+import tempfile
+from datetime import datetime, timezone as dt_timezone
+from graphlib import CycleError, TopologicalSorter
+
+import dj_database_url
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.migrations.recorder import MigrationRecorder
+from django.db.models import FileField
+
+from App import search
+from App.bulk import explicit_timestamps, signals_muted
+from App.models import Resource
+
+
+SOURCE = 'transfer_source'
+
+# Created by `migrate` (post_migrate) on the target with ids of its own; they
+# are replaced by the source rows so every foreign key to them stays valid
+RECREATED_BY_MIGRATE = ('contenttypes.ContentType', 'auth.Permission')
+
+
+def add_database(alias, url):
+    """Register a connection for a database URL that is not in settings.DATABASES"""
+    config = dj_database_url.parse(url)
+    connections.settings[alias] = connections.configure_settings({DEFAULT_DB_ALIAS: {}, alias: config})[alias]
+
+
+def database_id(alias):
+    config = connections[alias].settings_dict
+    return f"{config['ENGINE']}:{config['HOST']}:{config['PORT']}:{config['NAME']}"
+
+
+def dependency_order(models):
+    """Models sorted so every table comes after the tables its foreign keys point to"""
+    graph = TopologicalSorter()
+    for model in sorted(models, key=lambda model: model._meta.label):
+        graph.add(model, *(
+            field.related_model for field in model._meta.concrete_fields
+            if field.is_relation and field.related_model in models and field.related_model is not model
+        ))
+    try:
+        return list(graph.static_order())
+    except CycleError as e:
+        raise CommandError(f"Foreign keys form a cycle: {e.args[1]}")
+
+
+def _normalize(value):
+    """JSON-able form of a column value that is the same whichever backend returned it"""
+    if isinstance(value, memoryview):
+        value = bytes(value)
+    if isinstance(value, bytes):
+        return value.hex()
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return value.astimezone(dt_timezone.utc).isoformat()
+    return str(value)
+
+
+def row_hash(row):
+    data = json.dumps(row, sort_keys=True, default=_normalize)
+    return int.from_bytes(hashlib.sha256(data.encode()).digest()[:8], 'big')
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy every table from another database (by default the local db.sqlite3) into a migrated, "
+        "empty target database in primary-key chunks. Stop the site first. Progress is saved after "
+        "every chunk, so an interrupted run continues where it stopped when started again"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--source', default=f"sqlite:///{settings.BASE_DIR / 'db.sqlite3'}",
+            help="Database URL to copy from"
+        )
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help="Database to copy into (run migrate on it first)"
+        )
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument(
+            '--state', default=str(settings.BASE_DIR / 'transfer_state.json'),
+            help="Progress file; delete it (and recreate the target) to start over"
+        )
+        parser.add_argument('--verify-only', action='store_true', help="Only compare row counts and checksums")
+
+    def handle(self, *args, **options):
+        add_database(SOURCE, options['source'])
+        self.target = options['database']
+        self.chunk_size = options['chunk_size']
+        self.verbosity = options['verbosity']
+        self.state_path = options['state']
+        if database_id(SOURCE) == database_id(self.target):
+            raise CommandError("Source and target are the same database.")
+        self.check_migrations()
+
+        models = dependency_order({
+            model for model in apps.get_models(include_auto_created=True)
+            if model._meta.managed and not model._meta.proxy
+        })
+        source_tables = set(connections[SOURCE].introspection.table_names())
+        missing = [model._meta.label for model in models if model._meta.db_table not in source_tables]
+        if missing:
+            raise CommandError(f"Tables missing from the source: {', '.join(missing)}")
+
+        if not options['verify_only']:
+            self.load_state()
+            if not self.state['models']:
+                self.prepare_target(models)
+            # bulk_create sends no save signals; muting the rest also skips the
+            # post_init receivers, and no save() means no image re-processing
+            with signals_muted(), explicit_timestamps(*models):
+                for model in models:
+                    self.copy_model(model)
+            self.reset_sequences(models)
+            count = search.rebuild_index(Resource.objects.using(self.target).filter(is_active=True), self.target)
+            self.stdout.write(f"Indexed {count} resource(s) for search")
+
+        if not self.verify(models):
+            raise CommandError("Source and target differ; see the mismatches above.")
+        done = 'Verified' if options['verify_only'] else 'Transferred and verified'
+        self.stdout.write(self.style.SUCCESS(f"{done} {len(models)} table(s)"))
+
+    def check_migrations(self):
+        """Source and target must be at exactly the same migrations"""
+        applied = {
+            alias: set(MigrationRecorder(connections[alias]).applied_migrations())
+            for alias in (SOURCE, self.target)
+        }
+        if applied[SOURCE] != applied[self.target]:
+            differences = sorted(
+                f"{app}.{name} ({'source' if (app, name) in applied[SOURCE] else 'target'} only)"
+                for app, name in applied[SOURCE] ^ applied[self.target]
+            )
+            raise CommandError(
+                "Source and target are at different migrations; run migrate on both first: "
+                + ', '.join(differences)
+            )
+
+    def load_state(self):
+        self.state = {'source': database_id(SOURCE), 'target': database_id(self.target), 'models': {}}
+        if not os.path.exists(self.state_path):
+            return
+        with open(self.state_path) as file:
+            state = json.load(file)
+        if (state['source'], state['target']) != (self.state['source'], self.state['target']):
+            raise CommandError(
+                f"{self.state_path} belongs to a transfer between other databases; "
+                f"delete it to start a new transfer."
+            )
+        self.state = state
+        self.stdout.write(f"Resuming from {self.state_path}")
+
+    def save_state(self):
+        directory = os.path.dirname(os.path.abspath(self.state_path))
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as file:
+            json.dump(self.state, file, indent=1)
+        os.replace(tmp, self.state_path)
+
+    def prepare_target(self, models):
+        """Fresh transfer: the target may only hold the rows migrate created"""
+        not_empty = [
+            model._meta.label for model in models
+            if model._meta.label not in RECREATED_BY_MIGRATE and model._base_manager.using(self.target).exists()
+        ]
+        if not_empty:
+            raise CommandError(f"The target already has data in: {', '.join(not_empty)}")
+        for model in reversed(models):
+            if model._meta.label in RECREATED_BY_MIGRATE:
+                # Raw delete: nothing else references them yet, no cascade collection needed
+                model._base_manager.using(self.target).all()._raw_delete(self.target)
+
+    def copy_model(self, model):
+        label = model._meta.label
+        progress = self.state['models'].setdefault(label, {'last_pk': None, 'rows': 0, 'done': False})
+        if progress['done']:
+            self.stdout.write(f"{label}: done earlier ({progress['rows']} row(s))")
+            return
+
+        attnames = [field.attname for field in model._meta.concrete_fields]
+        pk_index = attnames.index(model._meta.pk.attname)
+        # FieldFile turns NULL into '' on save; those columns are put back afterwards
+        null_files = [
+            attnames.index(field.attname) for field in model._meta.concrete_fields
+            if isinstance(field, FileField) and field.null
+        ]
+        rows = model._base_manager.using(SOURCE).order_by('pk').values_list(*attnames)
+        target = model._base_manager.using(self.target)
+        while True:
+            chunk = rows if progress['last_pk'] is None else rows.filter(pk__gt=progress['last_pk'])
+            chunk = list(chunk[:self.chunk_size])
+            if not chunk:
+                break
+            pks = [row[pk_index] for row in chunk]
+            with transaction.atomic(using=self.target):
+                # Rows of a chunk committed just before an interruption are already there
+                existing = set(target.filter(pk__in=pks).values_list('pk', flat=True))
+                target.bulk_create(
+                    [model(**dict(zip(attnames, row))) for row in chunk if row[pk_index] not in existing],
+                    batch_size=1000,
+                )
+                for index in null_files:
+                    nulls = [row[pk_index] for row in chunk if row[index] is None]
+                    if nulls:
+                        target.filter(pk__in=nulls).update(**{attnames[index]: None})
+            last_pk = pks[-1]
+            progress['last_pk'] = last_pk if isinstance(last_pk, int) else str(last_pk)
+            progress['rows'] += len(chunk)
+            self.save_state()
+            if self.verbosity > 1:
+                self.stdout.write(f"{label}: {progress['rows']} row(s)")
+
+        progress['done'] = True
+        self.save_state()
+        self.stdout.write(f"{label}: {progress['rows']} row(s)")
+
+    def reset_sequences(self, models):
+        """Point auto-increment sequences past the copied ids (PostgreSQL; no-op on SQLite)"""
+        connection = connections[self.target]
+        statements = connection.ops.sequence_reset_sql(no_style(), models)
+        if statements:
+            with transaction.atomic(using=self.target), connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
+
+    def table_summary(self, model, using):
+        """(row count, order-independent checksum) of a table, read in pk chunks"""
+        attnames = [field.attname for field in model._meta.concrete_fields]
+        rows = model._base_manager.using(using).order_by('pk').values_list('pk', *attnames)
+        count = checksum = 0
+        last_pk = None
+        while True:
+            chunk = list((rows if last_pk is None else rows.filter(pk__gt=last_pk))[:self.chunk_size])
+            if not chunk:
+                return count, checksum
+            for row in chunk:
+                checksum = (checksum + row_hash(row[1:])) % 2 ** 64
+            count += len(chunk)
+            last_pk = chunk[-1][0]
+
+    def verify(self, models):
+        matching = True
+        for model in models:
+            source = self.table_summary(model, SOURCE)
+            target = self.table_summary(model, self.target)
+            if source != target:
+                matching = False
+                self.stdout.write(self.style.ERROR(
+                    f"{model._meta.label}: source {source[0]} row(s) / {source[1]:016x}, "
+                    f"target {target[0]} row(s) / {target[1]:016x}"
+                ))
+            elif self.verbosity > 1:
+                self.stdout.write(f"{model._meta.label}: {source[0]} row(s) match")
+        return matching
@@ -0,0 +1,81 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from App.caching import invalidate_sections
+from App.models import Resource, ResourceDownload, ResourceDownloadDaily
+
+
+class Command(BaseCommand):
+    help = "Roll up daily resource downloads and recompute trending scores"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--window', type=int, default=14, help="Days of downloads that count towards the score")
+        parser.add_argument('--half-life', type=float, default=3.0, help="Days after which a download counts half")
+        parser.add_argument(
+            '--rollup-days', type=int, default=2,
+            help="Recent days re-aggregated from ResourceDownload (older days are final)"
+        )
+        parser.add_argument('--full', action='store_true', help="Re-aggregate the whole window")
+
+    def handle(self, *args, **options):
+        today = timezone.now().date()
+        window_start = today - timedelta(days=options['window'] - 1)
+        rollup_days = options['window'] if options['full'] else options['rollup_days']
+        rollup_start = today - timedelta(days=rollup_days - 1)
+
+        rows = self.rollup(rollup_start)
+        scored = self.update_scores(window_start, today, options['half_life'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rolled up {rows} resource-day(s) since {rollup_start}; {scored} resource(s) trending"
+        ))
+
+    def rollup(self, start):
+        """Upsert per-day download counts from `start` (inclusive) to now"""
+        start_time = timezone.make_aware(timezone.datetime.combine(start, timezone.datetime.min.time()))
+        counts = (
+            ResourceDownload.objects
+            .filter(downloaded_at__gte=start_time)
+            .annotate(day=TruncDate('downloaded_at'))
+            .values('resource_id', 'day')
+            .annotate(downloads=Count('id'))
+        )
+        rows = [
+            ResourceDownloadDaily(resource_id=row['resource_id'], day=row['day'], downloads=row['downloads'])
+            for row in counts
+        ]
+        ResourceDownloadDaily.objects.bulk_create(
+            rows,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['resource', 'day'],
+            update_fields=['downloads']
+        )
+        return len(rows)
+
+    def update_scores(self, window_start, today, half_life):
+        """Score = sum of daily downloads, each halved every `half_life` days of age"""
+        scores = defaultdict(float)
+        daily = ResourceDownloadDaily.objects.filter(day__gte=window_start).values_list('resource_id', 'day', 'downloads')
+        for resource_id, day, downloads in daily.iterator():
+            age = (today - day).days
+            scores[resource_id] += downloads * 0.5 ** (age / half_life)
+
+        with transaction.atomic():
+            # Resources that dropped out of the window stop trending
+            Resource.objects.filter(trending_score__gt=0).exclude(id__in=list(scores)).update(trending_score=0)
+
+            resources = [
+                Resource(id=resource_id, trending_score=round(score, 4))
+                for resource_id, score in scores.items()
+            ]
+            Resource.objects.bulk_update(resources, ['trending_score'], batch_size=500)
+            # bulk_update sends no signals
+            invalidate_sections('popular_resources')
+        return len(resources)
@@ -0,0 +1,36 @@
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+
+CACHED_ENGINES = (
+    'django.contrib.sessions.backends.cached_db',
+    'django.contrib.sessions.backends.cache',
+)
+
+
+class Command(BaseCommand):
+    help = "Copy live database sessions into the session cache (after switching SESSION_ENGINE)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if settings.SESSION_ENGINE not in CACHED_ENGINES:
+            raise CommandError(f"SESSION_ENGINE {settings.SESSION_ENGINE} does not use the cache")
+        SessionStore = import_module(settings.SESSION_ENGINE).SessionStore
+
+        warmed = 0
+        live = Session.objects.filter(expire_date__gt=timezone.now())
+        for session in live.iterator(chunk_size=options['batch_size']):
+            store = SessionStore(session_key=session.session_key)
+            data = store.decode(session.session_data)
+            if not data:
+                continue  # Undecodable (e.g. signed with an old SECRET_KEY)
+            store._cache.set(store.cache_key, data, store.get_expiry_age(expiry=session.expire_date))
+            warmed += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Warmed {warmed} session(s)"))
@@ -1,15 +1,176 @@
+"""
+MongoDB archival sink for high-volume, append-only data.
 
-from pymongo.mongo_client import MongoClient
-from pymongo.server_api import ServerApi
+Audit events and payment gateway payloads are copied here for long-term
+storage. Nothing connects at import time: the client is created on first
+use, shared by the whole process (pymongo pools its connections) and
+recreated in a forked gunicorn worker, since pymongo clients are not
+fork-safe. Documents are queued per collection and written with
+insert_many() in batches by a BufferedWriter.
 
-uri = "mongodb+srv://datapwapurity01_db_user:<FpzTxV0GigwLkM5P>@cluster0.lsdkivf.mongodb.net/?retryWrites=true&w=majority&appName=Cluster0"
+insert_many() gives each document its _id in place, so a batch that failed
+part-way is retried with the same ids: the documents that did get written
+come back as duplicate-key errors, which count as written.
 
-# Create a new client and connect to the server
-client = MongoClient(uri, server_api=ServerApi('1'))
+Settings:
+    MONGODB_URI       'mongodb+srv://...' (Atlas), 'memory://' for the
+                      in-process stand-in used by tests, or empty to disable
+    MONGODB_DATABASE  database name
+"""
+import copy
+import itertools
+import os
+import threading
+
+from django.conf import settings
+from django.db import transaction
+
+from .buffers import BufferedWriter
 
-# Send a ping to confirm a successful connection
 try:
-    client.admin.command('ping')
-    print("Pinged your deployment. You successfully connected to MongoDB!")
-except Exception as e:
-    print(e)
\ No newline at end of file
+    from pymongo import MongoClient
+    from pymongo.errors import BulkWriteError
+    from pymongo.server_api import ServerApi
+except ImportError:
+    MongoClient = None
+
+    class BulkWriteError(Exception):
+        """Stand-in for pymongo's, raised by the in-memory collection"""
+
+        def __init__(self, results):
+            super().__init__("batch op errors occurred")
+            self.details = results
+
+
+MEMORY_URI = 'memory://'
+DUPLICATE_KEY = 11000
+
+_client = None
+_client_pid = None
+_lock = threading.Lock()
+_sinks = {}
+
+
+class InMemoryCollection:
+    """The part of a pymongo Collection the archive uses, kept in a list"""
+
+    def __init__(self):
+        self.documents = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def insert_many(self, documents, ordered=True):
+        errors = []
+        with self._lock:
+            stored = {document['_id'] for document in self.documents}
+            for index, document in enumerate(documents):
+                # Like pymongo, the caller's document gets its _id
+                document.setdefault('_id', next(self._ids))
+                if document['_id'] in stored:
+                    errors.append({'index': index, 'code': DUPLICATE_KEY, 'errmsg': 'duplicate key error'})
+                    if ordered:
+                        break
+                    continue
+                stored.add(document['_id'])
+                self.documents.append(copy.deepcopy(document))
+        if errors:
+            raise BulkWriteError({'writeErrors': errors, 'writeConcernErrors': []})
+
+    def find(self, filter=None):
+        filter = filter or {}
+        with self._lock:
+            return [
+                copy.deepcopy(document) for document in self.documents
+                if all(document.get(key) == value for key, value in filter.items())
+            ]
+
+    def count_documents(self, filter):
+        return len(self.find(filter))
+
+
+class InMemoryDatabase:
+    """Stand-in for a pymongo Database (tests, local development)"""
+
+    def __init__(self):
+        self.collections = {}
+
+    def __getitem__(self, name):
+        return self.collections.setdefault(name, InMemoryCollection())
+
+    def clear(self):
+        self.collections.clear()
+
+
+memory_database = InMemoryDatabase()
+
+
+def get_client():
+    """Process-wide MongoClient, created on first use and after a fork"""
+    global _client, _client_pid
+    if MongoClient is None:
+        raise RuntimeError("MongoDB archiving needs the 'pymongo' package")
+    with _lock:
+        if _client is None or _client_pid != os.getpid():
+            _client = MongoClient(
+                settings.MONGODB_URI,
+                server_api=ServerApi('1'),
+                maxPoolSize=settings.MONGODB_MAX_POOL_SIZE,
+                serverSelectionTimeoutMS=5000,
+                connect=False
+            )
+            _client_pid = os.getpid()
+        return _client
+
+
+def get_database():
+    """Archive database, or None when archiving is disabled"""
+    uri = settings.MONGODB_URI
+    if not uri:
+        return None
+    if uri == MEMORY_URI:
+        return memory_database
+    return get_client()[settings.MONGODB_DATABASE]
+
+
+def _only_duplicates(error):
+    """True if every document insert_many() rejected was already in the collection"""
+    details = error.details
+    return not details.get('writeConcernErrors') and all(
+        write_error.get('code') == DUPLICATE_KEY for write_error in details.get('writeErrors', [])
+    )
+
+
+def _sink(collection):
+    def write(documents):
+        database = get_database()
+        if database is None:
+            return
+        try:
+            database[collection].insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            # A retried batch: part of it was written by the failed attempt
+            if not _only_duplicates(e):
+                raise
+
+    # insert_many needs no SQL transaction
+    return BufferedWriter(
+        f'archive:{collection}', write, batch_size=500, atomic=False, row_errors=(BulkWriteError,)
+    )
+
+
+def archive(collection, documents):
+    """Queue documents for insert_many() into `collection` once the transaction commits"""
+    if not settings.MONGODB_URI:
+        return
+    with _lock:
+        sink = _sinks.get(collection)
+        if sink is None:
+            sink = _sinks[collection] = _sink(collection)
+
+    # Copies: insert_many() adds _id to the documents it is given
+    documents = [dict(document) for document in documents]
+
+    def queue():
+        for document in documents:
+            sink.add(document)
+    transaction.on_commit(queue)
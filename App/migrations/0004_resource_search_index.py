@@ -0,0 +1,71 @@
+import re
+
+from django.db import migrations
+
+
+SEARCH_TABLE = 'app_resource_search'
+
+
+def course_code_terms(code):
+    return f"{code} {re.sub(r'(?<=[A-Za-z])(?=[0-9])', ' ', code)}"
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    Resource = apps.get_model('App', 'Resource')
+
+    if connection.vendor == 'sqlite':
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5("
+            f"title, description, course_code, course_name, "
+            f"tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3 4')"
+        )
+        insert = (
+            f"INSERT INTO {SEARCH_TABLE} (rowid, title, description, course_code, course_name) "
+            f"VALUES (%s, %s, %s, %s, %s)"
+        )
+    elif connection.vendor == 'postgresql':
+        schema_editor.execute(
+            f"CREATE TABLE {SEARCH_TABLE} ("
+            f"resource_id bigint PRIMARY KEY REFERENCES {schema_editor.quote_name(Resource._meta.db_table)} (id) "
+            f"ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+            f"document tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            f"CREATE INDEX {SEARCH_TABLE}_document_idx ON {SEARCH_TABLE} USING GIN (document)"
+        )
+        insert = (
+            f"INSERT INTO {SEARCH_TABLE} (resource_id, document) VALUES (%s, "
+            f"setweight(to_tsvector('simple', %s), 'A') || "
+            f"setweight(to_tsvector('simple', %s), 'C') || "
+            f"setweight(to_tsvector('simple', %s), 'A') || "
+            f"setweight(to_tsvector('simple', %s), 'B'))"
+        )
+    else:
+        return  # Search falls back to icontains
+
+    with connection.cursor() as cursor:
+        for resource in Resource.objects.using(connection.alias).filter(is_active=True).select_related('course').iterator():
+            cursor.execute(insert, [
+                resource.pk,
+                resource.title,
+                resource.description,
+                course_code_terms(resource.course.code),
+                resource.course.name,
+            ])
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App', '0003_course_resourcecategory_classschedule_resource_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
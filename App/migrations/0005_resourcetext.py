@@ -0,0 +1,30 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App', '0004_resource_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResourceText',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_name', models.CharField(help_text='File name the text was extracted from', max_length=255)),
+                ('content', models.BinaryField(blank=True, help_text='zlib-compressed UTF-8 text')),
+                ('char_count', models.IntegerField(default=0)),
+                ('error', models.CharField(blank=True, max_length=255)),
+                ('extracted_at', models.DateTimeField(auto_now=True)),
+                ('resource', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='extracted_text', to='App.resource')),
+            ],
+            options={
+                'verbose_name': 'Resource Text',
+                'verbose_name_plural': 'Resource Texts',
+            },
+        ),
+    ]
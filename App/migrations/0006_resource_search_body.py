@@ -0,0 +1,73 @@
+import re
+import zlib
+
+from django.db import migrations
+
+
+SEARCH_TABLE = 'app_resource_search'
+
+
+def course_code_terms(code):
+    return f"{code} {re.sub(r'(?<=[A-Za-z])(?=[0-9])', ' ', code)}"
+
+
+def populate(apps, schema_editor, with_body):
+    Resource = apps.get_model('App', 'Resource')
+    ResourceText = apps.get_model('App', 'ResourceText')
+    db = schema_editor.connection.alias
+    bodies = {}
+    if with_body:
+        for text in ResourceText.objects.using(db).exclude(content=b'').iterator():
+            bodies[text.resource_id] = zlib.decompress(bytes(text.content)).decode('utf-8')
+
+    columns = 'rowid, title, description, course_code, course_name'
+    if with_body:
+        columns += ', body'
+    placeholders = ', '.join(['%s'] * len(columns.split(', ')))
+
+    with schema_editor.connection.cursor() as cursor:
+        for resource in Resource.objects.using(db).filter(is_active=True).select_related('course').iterator():
+            values = [
+                resource.pk,
+                resource.title,
+                resource.description,
+                course_code_terms(resource.course.code),
+                resource.course.name,
+            ]
+            if with_body:
+                values.append(bodies.get(resource.pk, ''))
+            cursor.execute(f"INSERT INTO {SEARCH_TABLE} ({columns}) VALUES ({placeholders})", values)
+
+
+def recreate_table(apps, schema_editor, with_body):
+    # FTS5 tables cannot be altered; PostgreSQL keeps a single tsvector column
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    columns = 'title, description, course_code, course_name'
+    if with_body:
+        columns += ', body'
+    schema_editor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5({columns}, "
+        f"tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3 4')"
+    )
+    populate(apps, schema_editor, with_body)
+
+
+def add_body_column(apps, schema_editor):
+    recreate_table(apps, schema_editor, with_body=True)
+
+
+def remove_body_column(apps, schema_editor):
+    recreate_table(apps, schema_editor, with_body=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App', '0005_resourcetext'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_body_column, remove_body_column),
+    ]
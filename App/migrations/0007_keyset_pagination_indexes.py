@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App', '0006_resource_search_body'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='resource',
+            index=models.Index(fields=['upload_date', 'id'], name='App_resourc_upload__eacfe8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resourcedownload',
+            index=models.Index(fields=['user', 'downloaded_at', 'id'], name='App_resourc_user_id_71bc9c_idx'),
+        ),
+    ]
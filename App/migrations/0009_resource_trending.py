@@ -0,0 +1,49 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App', '0008_content_addressed_resources'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResourceDownloadDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('downloads', models.IntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-day'],
+            },
+        ),
+        migrations.AddField(
+            model_name='resource',
+            name='trending_score',
+            field=models.FloatField(default=0, help_text='Time-decayed recent downloads (update_trending_resources)'),
+        ),
+        migrations.AddIndex(
+            model_name='resource',
+            index=models.Index(fields=['is_active', 'trending_score'], name='App_resourc_is_acti_c2762e_idx'),
+        ),
+        migrations.AddField(
+            model_name='resourcedownloaddaily',
+            name='resource',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_downloads', to='App.resource'),
+        ),
+        migrations.AddIndex(
+            model_name='resourcedownloaddaily',
+            index=models.Index(fields=['day'], name='App_resourc_day_e49af6_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='resourcedownloaddaily',
+            unique_together={('resource', 'day')},
+        ),
+    ]
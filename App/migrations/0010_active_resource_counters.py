@@ -0,0 +1,36 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:22
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def count_active_resources(apps, schema_editor):
+    db = schema_editor.connection.alias
+    for model_name in ('Course', 'ResourceCategory'):
+        model = apps.get_model('App', model_name)
+        counted = model.objects.using(db).annotate(
+            active=Count('resources', filter=Q(resources__is_active=True))
+        ).values_list('pk', 'active')
+        for pk, active in counted:
+            model.objects.using(db).filter(pk=pk).update(active_resource_count=active)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App', '0009_resource_trending'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='active_resource_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='resourcecategory',
+            name='active_resource_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_active_resources, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:23
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App', '0010_active_resource_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='classschedule',
+            index=models.Index(fields=['date', 'is_completed'], name='classschedule_date_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='classschedule',
+            index=models.Index(fields=['course', 'date'], name='classschedule_course_date_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:25
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App', '0011_class_schedule_status_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='classattendance',
+            name='joined_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
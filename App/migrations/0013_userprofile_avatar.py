@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App', '0012_attendance_joined_at_default'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='profile_avatar',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='profile_pictures/avatars/'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:37
+
+import App.storage
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App', '0014_audit_events'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='userprofile',
+            name='profile_avatar',
+            field=models.ImageField(blank=True, editable=False, null=True, storage=App.storage.get_media_storage, upload_to='profile_pictures/avatars/'),
+        ),
+        migrations.AlterField(
+            model_name='userprofile',
+            name='profile_picture',
+            field=models.ImageField(blank=True, help_text='Upload image (max 100KB, jpg/png only)', null=True, storage=App.storage.get_media_storage, upload_to='profile_pictures/', validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png'])]),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 10:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App', '0015_hashed_media_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storedblob',
+            name='held_until',
+            field=models.DateTimeField(blank=True, help_text='Stored by an upload; kept until then even without references', null=True),
+        ),
+    ]
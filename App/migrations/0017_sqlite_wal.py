@@ -0,0 +1,26 @@
+from django.db import migrations
+
+
+def enable_wal(apps, schema_editor):
+    # WAL is a property of the database file: set once here instead of on
+    # every connection, so opening the database never writes to it
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('PRAGMA journal_mode=WAL')
+
+
+def disable_wal(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('PRAGMA journal_mode=DELETE')
+
+
+class Migration(migrations.Migration):
+    # The journal mode cannot change inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('App', '0016_stored_blob_hold'),
+    ]
+
+    operations = [
+        migrations.RunPython(enable_wal, disable_wal),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-19 10:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App', '0017_sqlite_wal'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='resourcedownload',
+            index=models.Index(fields=['downloaded_at', 'resource'], name='resourcedownload_time_idx'),
+        ),
+    ]
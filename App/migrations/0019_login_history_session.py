@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 10:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App', '0018_resource_download_time_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='loginhistory',
+            name='session_hash',
+            field=models.CharField(blank=True, editable=False, help_text='SHA-256 of the session key, so a logout closes only its own session', max_length=64),
+        ),
+    ]
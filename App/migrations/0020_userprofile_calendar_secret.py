@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 10:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App', '0019_login_history_session'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='calendar_secret',
+            field=models.CharField(blank=True, editable=False, max_length=32),
+        ),
+    ]
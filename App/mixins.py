@@ -0,0 +1,84 @@
+"""
+Model mixins shared by the App, Voting and payments apps.
+"""
+import copy
+import logging
+from collections import Counter
+
+
+logger = logging.getLogger(__name__)
+
+# Writes avoided per model ('app_label.ModelName') in this process
+skipped_writes = Counter()
+
+
+class DirtyFieldsMixin:
+    """
+    Only write the columns that changed since the row was loaded.
+
+    save() on a loaded instance compares every concrete field with the
+    snapshot taken in from_db(): with no changes the UPDATE (and the
+    pre/post_save signals) are skipped entirely, otherwise it becomes
+    save(update_fields=[changed fields + auto_now fields]). Inserts and
+    explicit update_fields saves behave as usual.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._take_snapshot()
+        return instance
+
+    def _take_snapshot(self, field_names=None):
+        """Record current values as saved (all fields, or just `field_names`)"""
+        if field_names is None or not hasattr(self, '_loaded_values'):
+            self._loaded_values = {}
+        for field in self._meta.concrete_fields:
+            if field_names is not None and field.name not in field_names and field.attname not in field_names:
+                continue
+            if field.attname in self.__dict__:
+                # Deep copies so in-place edits of JSON values still show up as changes
+                self._loaded_values[field.attname] = copy.deepcopy(self.__dict__[field.attname])
+
+    def get_dirty_fields(self):
+        """Names of fields whose value differs from the loaded row"""
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None:
+            return [field.name for field in self._meta.concrete_fields if not field.primary_key]
+        dirty = []
+        for field in self._meta.concrete_fields:
+            if field.primary_key or field.attname not in self.__dict__:
+                continue
+            if field.attname not in loaded or self.__dict__[field.attname] != loaded[field.attname]:
+                dirty.append(field.name)
+        return dirty
+
+    def save(self, *args, **kwargs):
+        if (
+            self._state.adding or args or
+            kwargs.get('update_fields') is not None or
+            kwargs.get('force_insert') or
+            not hasattr(self, '_loaded_values')
+        ):
+            super().save(*args, **kwargs)
+            update_fields = kwargs.get('update_fields')
+            self._take_snapshot(None if update_fields is None else set(update_fields))
+            return
+
+        dirty = self.get_dirty_fields()
+        if not dirty:
+            skipped_writes[self._meta.label] += 1
+            logger.debug("Skipped unchanged save of %s %s", self._meta.label, self.pk)
+            return
+
+        auto_now = [
+            field.name for field in self._meta.concrete_fields
+            if getattr(field, 'auto_now', False) and field.name not in dirty
+        ]
+        kwargs['update_fields'] = dirty + auto_now
+        super().save(*args, **kwargs)
+        self._take_snapshot(set(kwargs['update_fields']))
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        self._take_snapshot(None if fields is None else set(fields))
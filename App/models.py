@@ -1,9 +1,12 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
+from .mixins import DirtyFieldsMixin
+from .storage import get_media_storage
 
 
 
-class Profile(models.Model):
+class Profile(DirtyFieldsMixin, models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE,related_name='profile')
     level = models.CharField(max_length=100, blank=True)
     department = models.CharField(max_length=100, default="Computer Science")
@@ -17,10 +20,6 @@ class Profile(models.Model):
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import FileExtensionValidator
-from PIL import Image
-from io import BytesIO
-from django.core.files.uploadedfile import InMemoryUploadedFile
-import sys
 
 
 class UserProfile(models.Model):
@@ -45,18 +44,26 @@ class UserProfile(models.Model):
     
     # Profile Picture
     profile_picture = models.ImageField(
+        storage=get_media_storage,
         upload_to='profile_pictures/',
         blank=True,
         null=True,
         validators=[FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png'])],
         help_text="Upload image (max 100KB, jpg/png only)"
     )
+    # 96x96 variant made by App/images.py
+    profile_avatar = models.ImageField(
+        storage=get_media_storage, upload_to='profile_pictures/avatars/', blank=True, null=True, editable=False
+    )
     
     # Social Links
     twitter = models.URLField(max_length=200, blank=True)
     linkedin = models.URLField(max_length=200, blank=True)
     github = models.URLField(max_length=200, blank=True)
     
+    # Part of the calendar feed token; replacing it revokes issued feed links (App/ical.py)
+    calendar_secret = models.CharField(max_length=32, blank=True, editable=False)
+    
     # Metadata
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -65,54 +72,33 @@ class UserProfile(models.Model):
         return f"{self.user.username}'s Profile"
     
     def save(self, *args, **kwargs):
-        """Compress and resize profile picture before saving"""
-        if self.profile_picture:
-            # Open the image
-            img = Image.open(self.profile_picture)
-            
-            # Convert to RGB if necessary (for PNG with transparency)
-            if img.mode in ('RGBA', 'LA', 'P'):
-                img = img.convert('RGB')
-            
-            # Resize image to max 400x400 while maintaining aspect ratio
-            max_size = (400, 400)
-            img.thumbnail(max_size, Image.Resampling.LANCZOS)
-            
-            # Save to BytesIO object
-            output = BytesIO()
-            
-            # Start with quality 95 and reduce until under 100KB
-            quality = 95
-            while True:
-                output.seek(0)
-                output.truncate()
-                img.save(output, format='JPEG', quality=quality, optimize=True)
-                
-                # Check file size
-                size = output.tell()
-                if size <= 100 * 1024 or quality <= 20:  # 100KB or minimum quality
-                    break
-                quality -= 5
-            
-            # Create new InMemoryUploadedFile
-            output.seek(0)
-            self.profile_picture = InMemoryUploadedFile(
-                output, 'ImageField',
-                f"{self.profile_picture.name.split('.')[0]}.jpg",
-                'image/jpeg',
-                sys.getsizeof(output), None
-            )
-        
+        """Save, then compress the picture in the background if a new one was set"""
+        picture_changed = self.profile_picture.name != self._loaded_picture_name
+        if picture_changed and not self.profile_picture:
+            self.profile_avatar = None
         super().save(*args, **kwargs)
+        
+        if picture_changed:
+            self._loaded_picture_name = self.profile_picture.name
+            if self.profile_picture:
+                from .images import process_profile_picture
+                from .tasks import run_in_background
+                run_in_background(process_profile_picture, self.pk, self.profile_picture.name)
     
     def get_profile_picture_url(self):
         """Get profile picture URL or default"""
         if self.profile_picture:
             return self.profile_picture.url
         return '/static/images/default-avatar.png'  # Add a default avatar
+    
+    def get_avatar_url(self):
+        """Small square picture for lists; the full picture until it is processed"""
+        if self.profile_avatar:
+            return self.profile_avatar.url
+        return self.get_profile_picture_url()
 
 
-class UserPreferences(models.Model):
+class UserPreferences(DirtyFieldsMixin, models.Model):
     """User preferences and settings"""
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='preferences')
     
@@ -142,9 +128,13 @@ class LoginHistory(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='login_history')
     ip_address = models.GenericIPAddressField()
     user_agent = models.CharField(max_length=255, blank=True)
-    login_time = models.DateTimeField(auto_now_add=True)
+    login_time = models.DateTimeField(default=timezone.now)
     logout_time = models.DateTimeField(null=True, blank=True)
     is_active = models.BooleanField(default=True)
+    session_hash = models.CharField(
+        max_length=64, blank=True, editable=False,
+        help_text='SHA-256 of the session key, so a logout closes only its own session'
+    )
     
     class Meta:
         ordering = ['-login_time']
@@ -154,8 +144,37 @@ class LoginHistory(models.Model):
         return f"{self.user.username} - {self.login_time}"
 
 
+class AuditEvent(models.Model):
+    """Security and activity trail, written in batches by App/audit.py"""
+    EVENT_CHOICES = [
+        ('login', 'Login'),
+        ('logout', 'Logout'),
+        ('payment', 'Payment'),
+        ('vote', 'Vote'),
+        ('download', 'Download'),
+    ]
+    
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='audit_events')
+    event = models.CharField(max_length=20, choices=EVENT_CHOICES)
+    ip_address = models.GenericIPAddressField(null=True, blank=True)
+    user_agent = models.CharField(max_length=255, blank=True)
+    detail = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'created_at']),
+            models.Index(fields=['event', 'created_at']),
+        ]
+    
+    def __str__(self):
+        username = self.user.username if self.user_id else 'anonymous'
+        return f"{username} - {self.event} - {self.created_at}"
+
+
 # Signal to create profile and preferences automatically
-from django.db.models.signals import post_save
+from django.db.models.signals import post_init, post_save
 from django.dispatch import receiver
 
 @receiver(post_save, sender=User)
@@ -165,6 +184,12 @@ def create_user_profile(sender, instance, created, **kwargs):
         UserProfile.objects.get_or_create(user=instance)
         UserPreferences.objects.get_or_create(user=instance)
 
+@receiver(post_init, sender=UserProfile)
+def remember_profile_picture(sender, instance, **kwargs):
+    """Remember the stored picture so only a new one gets processed"""
+    value = instance.__dict__.get('profile_picture')
+    instance._loaded_picture_name = getattr(value, 'name', value)
+
 @receiver(post_save, sender=User)
 def save_user_profile(sender, instance, **kwargs):
     """Save profile when user is saved"""
@@ -178,7 +203,15 @@ def save_user_profile(sender, instance, **kwargs):
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import FileExtensionValidator
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
 from django.utils import timezone
+from datetime import timedelta
+from .storage import get_resource_storage, is_blob_name, resource_storage
+import os
+import uuid
+import zlib
 
 
 class Course(models.Model):
@@ -194,6 +227,7 @@ class Course(models.Model):
     ])
     description = models.TextField(blank=True)
     is_active = models.BooleanField(default=True)
+    active_resource_count = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
@@ -203,6 +237,40 @@ class Course(models.Model):
         return f"{self.code} - {self.name}"
 
 
+CLASS_STATUSES = ('completed', 'today', 'upcoming', 'past')
+
+
+class ClassScheduleQuerySet(models.QuerySet):
+    """Class status computed by the database instead of per row in Python"""
+    
+    @staticmethod
+    def status_conditions(today=None):
+        """Status -> condition on the indexed (date, is_completed) columns"""
+        today = today or timezone.now().date()
+        return {
+            'completed': Q(is_completed=True),
+            'today': Q(is_completed=False, date=today),
+            'upcoming': Q(is_completed=False, date__gt=today),
+            'past': Q(is_completed=False, date__lt=today),
+        }
+    
+    def with_status(self, today=None):
+        """Annotate each class with `status` (same values as get_status())"""
+        conditions = self.status_conditions(today)
+        return self.annotate(status=Case(
+            *[When(conditions[name], then=Value(name)) for name in CLASS_STATUSES],
+            output_field=models.CharField()
+        ))
+    
+    def filter_status(self, *statuses, today=None):
+        """Classes in any of the given statuses, as a filter that can use the indexes"""
+        conditions = self.status_conditions(today)
+        condition = Q()
+        for name in statuses:
+            condition |= conditions[name]
+        return self.filter(condition) if statuses else self.none()
+
+
 class ClassSchedule(models.Model):
     """Scheduled classes with Zoom links"""
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='classes')
@@ -224,10 +292,16 @@ class ClassSchedule(models.Model):
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
+    objects = ClassScheduleQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-date', '-start_time']
         verbose_name = "Class Schedule"
         verbose_name_plural = "Class Schedules"
+        indexes = [
+            models.Index(fields=['date', 'is_completed'], name='classschedule_date_status_idx'),
+            models.Index(fields=['course', 'date'], name='classschedule_course_date_idx'),
+        ]
     
     def __str__(self):
         return f"{self.course.code} - {self.title} ({self.date})"
@@ -245,12 +319,15 @@ class ClassSchedule(models.Model):
         return self.date == timezone.now().date()
     
     def get_status(self):
-        """Get class status"""
+        """Get class status (prefer ClassSchedule.objects.with_status() for lists)"""
+        annotated = self.__dict__.get('status')
+        if annotated:
+            return annotated
         if self.is_completed:
             return 'completed'
         elif self.is_today():
             return 'today'
-        elif self.is_upcoming():
+        elif self.date > timezone.now().date():
             return 'upcoming'
         else:
             return 'past'
@@ -262,6 +339,7 @@ class ResourceCategory(models.Model):
     description = models.TextField(blank=True)
     icon = models.CharField(max_length=50, default='📄', help_text="Emoji icon")
     order = models.IntegerField(default=0, help_text="Display order")
+    active_resource_count = models.PositiveIntegerField(default=0, editable=False)
     
     class Meta:
         ordering = ['order', 'name']
@@ -280,9 +358,10 @@ class Resource(models.Model):
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='resources')
     category = models.ForeignKey(ResourceCategory, on_delete=models.SET_NULL, null=True, related_name='resources')
     
-    # File
+    # File (content-addressed: identical uploads share one stored blob)
     file = models.FileField(
         upload_to='resources/%Y/%m/',
+        storage=get_resource_storage,
         validators=[FileExtensionValidator(allowed_extensions=['pdf', 'doc', 'docx', 'ppt', 'pptx', 'txt', 'zip'])],
         help_text="Allowed: PDF, DOC, DOCX, PPT, PPTX, TXT, ZIP"
     )
@@ -292,10 +371,15 @@ class Resource(models.Model):
     uploaded_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
     upload_date = models.DateTimeField(auto_now_add=True)
     download_count = models.IntegerField(default=0)
+    trending_score = models.FloatField(default=0, help_text="Time-decayed recent downloads (update_trending_resources)")
     is_active = models.BooleanField(default=True)
     
     class Meta:
         ordering = ['-upload_date']
+        indexes = [
+            models.Index(fields=['upload_date', 'id']),
+            models.Index(fields=['is_active', 'trending_score']),
+        ]
     
     def __str__(self):
         return f"{self.title} ({self.course.code})"
@@ -309,9 +393,124 @@ class Resource(models.Model):
         return round(self.file_size / (1024 * 1024), 2)
     
     def increment_downloads(self):
-        """Increment download count"""
+        """Increment download count (an UPDATE: no save signals, no lost increments)"""
+        Resource.objects.filter(pk=self.pk).update(download_count=F('download_count') + 1)
         self.download_count += 1
-        self.save(update_fields=['download_count'])
+
+
+# How long a just-stored blob is kept for the resource about to point at it
+BLOB_HOLD = timedelta(hours=1)
+
+
+class StoredBlob(models.Model):
+    """A content-addressed resource file and how many resources use it"""
+    name = models.CharField(max_length=255, unique=True)
+    size = models.BigIntegerField(default=0)
+    ref_count = models.IntegerField(default=0)
+    held_until = models.DateTimeField(
+        null=True, blank=True, help_text="Stored by an upload; kept until then even without references"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} references)"
+    
+    @classmethod
+    def hold(cls, name, size=0, using='default'):
+        """Keep a just-stored (or deduplicated) blob for BLOB_HOLD, referenced or not"""
+        until = timezone.now() + BLOB_HOLD
+        with transaction.atomic(using=using):
+            # UPDATE first: it waits for a concurrent delete_unused() and then finds no row
+            if not cls.objects.using(using).filter(name=name).update(held_until=until):
+                cls.objects.using(using).get_or_create(name=name, defaults={'size': size, 'held_until': until})
+    
+    @classmethod
+    def acquire(cls, name, size=0, using='default'):
+        """Record one more resource pointing at a blob"""
+        if not is_blob_name(name):
+            return  # Files stored before content addressing are not shared
+        blob, created = cls.objects.using(using).get_or_create(name=name, defaults={'size': size})
+        cls.objects.using(using).filter(pk=blob.pk).update(ref_count=F('ref_count') + 1)
+    
+    @classmethod
+    def release(cls, name, using='default'):
+        """Drop one reference; unreferenced blobs are deleted once this commits"""
+        if not is_blob_name(name):
+            return
+        cls.objects.using(using).filter(name=name, ref_count__gt=0).update(ref_count=F('ref_count') - 1)
+        transaction.on_commit(lambda: cls.delete_unused(using=using), using=using)
+    
+    @classmethod
+    def delete_unused(cls, using='default', limit=100):
+        """Delete blobs (rows and files) with no references and no hold; returns the count"""
+        unused = cls.objects.using(using).filter(ref_count=0).filter(
+            Q(held_until__isnull=True) | Q(held_until__lt=timezone.now())
+        )
+        deleted = 0
+        for name in list(unused.values_list('name', flat=True)[:limit]):
+            with transaction.atomic(using=using):
+                # The conditional DELETE re-checks under the row (SQLite: write) lock,
+                # and hold() for the same content waits until the file is gone too
+                if unused.filter(name=name).delete()[0]:
+                    resource_storage.delete(name)
+                    deleted += 1
+        return deleted
+
+
+class ChunkedUpload(models.Model):
+    """A resumable resource upload received in chunks"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='chunked_uploads')
+    filename = models.CharField(max_length=255)
+    total_size = models.BigIntegerField()
+    received = models.BigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.total_size} bytes)"
+    
+    def get_part_path(self):
+        """Where received chunks are appended"""
+        return os.path.join(settings.CHUNKED_UPLOAD_DIR, f"{self.id}.part")
+    
+    def is_complete(self):
+        return self.received >= self.total_size
+
+
+class ResourceText(models.Model):
+    """Plain text extracted from a resource file, used by search"""
+    resource = models.OneToOneField(Resource, on_delete=models.CASCADE, related_name='extracted_text')
+    source_name = models.CharField(max_length=255, help_text="File name the text was extracted from")
+    content = models.BinaryField(blank=True, help_text="zlib-compressed UTF-8 text")
+    char_count = models.IntegerField(default=0)
+    error = models.CharField(max_length=255, blank=True)
+    extracted_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = "Resource Text"
+        verbose_name_plural = "Resource Texts"
+    
+    def __str__(self):
+        return f"Text of {self.resource.title}"
+    
+    def get_text(self):
+        """Decompressed text"""
+        if not self.content:
+            return ''
+        return zlib.decompress(bytes(self.content)).decode('utf-8')
+    
+    def set_text(self, text):
+        """Compress and store text"""
+        self.content = zlib.compress(text.encode('utf-8'), 6) if text else b''
+        self.char_count = len(text)
+    
+    def is_stale(self):
+        """Check if the resource file changed since extraction"""
+        return self.source_name != self.resource.file.name
 
 
 class ResourceDownload(models.Model):
@@ -323,16 +522,38 @@ class ResourceDownload(models.Model):
     
     class Meta:
         ordering = ['-downloaded_at']
+        indexes = [
+            models.Index(fields=['user', 'downloaded_at', 'id']),
+            models.Index(fields=['downloaded_at', 'resource'], name='resourcedownload_time_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} downloaded {self.resource.title}"
 
 
+class ResourceDownloadDaily(models.Model):
+    """Downloads per resource per day, rolled up from ResourceDownload"""
+    resource = models.ForeignKey(Resource, on_delete=models.CASCADE, related_name='daily_downloads')
+    day = models.DateField()
+    downloads = models.IntegerField(default=0)
+    
+    class Meta:
+        unique_together = ['resource', 'day']
+        ordering = ['-day']
+        indexes = [
+            models.Index(fields=['day']),
+        ]
+    
+    def __str__(self):
+        return f"{self.resource.title} - {self.day}: {self.downloads}"
+
+
 class ClassAttendance(models.Model):
     """Track who joined classes (optional)"""
     class_schedule = models.ForeignKey(ClassSchedule, on_delete=models.CASCADE, related_name='attendance')
     user = models.ForeignKey(User, on_delete=models.CASCADE)
-    joined_at = models.DateTimeField(auto_now_add=True)
+    # Set when the student clicks join, not when the buffered row is written
+    joined_at = models.DateTimeField(default=timezone.now)
     
     class Meta:
         unique_together = ['class_schedule', 'user']
@@ -343,11 +564,193 @@ class ClassAttendance(models.Model):
 
 
 # Signal to set file size automatically
-from django.db.models.signals import pre_save
+from django.db.models.signals import pre_save, post_delete, post_init
 from django.dispatch import receiver
 
 @receiver(pre_save, sender=Resource)
 def set_file_size(sender, instance, **kwargs):
     """Automatically set file size before saving"""
     if instance.file and hasattr(instance.file, 'size'):
-        instance.file_size = instance.file.size
\ No newline at end of file
+        instance.file_size = instance.file.size
+
+
+# Signals to reference-count content-addressed resource files
+@receiver(post_init, sender=Resource)
+def remember_resource_file(sender, instance, **kwargs):
+    """Remember the stored file name so a replaced file can be released"""
+    value = instance.__dict__.get('file')
+    instance._loaded_file_name = getattr(value, 'name', value)
+    # ... and where the resource was counted, for the active resource counters
+    instance._counted_in = _counted_in(instance)
+
+@receiver(post_save, sender=Resource)
+def count_resource_file(sender, instance, created, raw=False, using='default', **kwargs):
+    """Move the resource's blob reference when its file is set or replaced"""
+    if raw:
+        return
+    old_name = None if created else instance._loaded_file_name
+    new_name = instance.file.name
+    if old_name != new_name:
+        if new_name:
+            StoredBlob.acquire(new_name, instance.file_size, using)
+        if old_name:
+            StoredBlob.release(old_name, using)
+    instance._loaded_file_name = new_name
+
+@receiver(post_delete, sender=Resource)
+def release_resource_file(sender, instance, using='default', **kwargs):
+    """Deleting a resource only removes its file if no other resource shares it"""
+    if instance.file.name:
+        StoredBlob.release(instance.file.name, using)
+
+
+# Signals to keep the resource search index in sync
+from . import extraction, search
+from .tasks import run_in_background
+
+@receiver(post_save, sender=Resource)
+def index_resource(sender, instance, raw=False, using='default', update_fields=None, **kwargs):
+    """Add or refresh a resource in the search index"""
+    if raw or (update_fields is not None and not search.INDEXED_FIELDS & update_fields):
+        return  # e.g. counter or trending score saves: the document is unchanged
+    search.index_resources([instance], using)
+
+@receiver(post_save, sender=Resource)
+def queue_text_extraction(sender, instance, raw=False, update_fields=None, **kwargs):
+    """New or replaced files get their text extracted once the save commits"""
+    if raw or (update_fields is not None and 'file' not in update_fields):
+        return
+    if instance.is_active and instance.file.name and extraction.can_extract(instance.file.name):
+        run_in_background(extraction.extract_resource, instance.pk)
+
+@receiver(post_delete, sender=Resource)
+def unindex_resource(sender, instance, using='default', **kwargs):
+    """Remove a deleted resource from the search index"""
+    search.remove_resources([instance.pk], using)
+
+@receiver(post_save, sender=Course)
+def index_course_resources(sender, instance, created, raw=False, using='default', **kwargs):
+    """Course code/name are part of every resource document"""
+    if not raw and not created:
+        search.index_resources(instance.resources.select_related('course', 'extracted_text'), using)
+
+@receiver(post_save, sender=ResourceText)
+def index_resource_text(sender, instance, raw=False, using='default', **kwargs):
+    """Extracted file text is part of the resource document"""
+    if not raw:
+        search.index_resources([instance.resource], using)
+
+
+# Signals to maintain active resource counters and the home page cache
+from .caching import CLASS_SECTIONS, RESOURCE_SECTION_FIELDS, RESOURCE_SECTIONS, invalidate_sections
+
+def _counted_in(resource):
+    """(course_id, category_id) an active resource is counted under, else None"""
+    data = resource.__dict__
+    if not data.get('is_active'):
+        return None
+    return data.get('course_id'), data.get('category_id')
+
+def _adjust_resource_counters(counted_in, delta, using):
+    course_id, category_id = counted_in
+    Course.objects.using(using).filter(pk=course_id).update(
+        active_resource_count=F('active_resource_count') + delta
+    )
+    ResourceCategory.objects.using(using).filter(pk=category_id).update(
+        active_resource_count=F('active_resource_count') + delta
+    )
+
+@receiver(post_save, sender=Resource)
+def count_active_resource(sender, instance, created, raw=False, using='default', update_fields=None, **kwargs):
+    """Move the resource between course/category counters when it changes"""
+    if raw:
+        return
+    old = None if created else instance._counted_in
+    new = _counted_in(instance)
+    if old != new:
+        if old:
+            _adjust_resource_counters(old, -1, using)
+        if new:
+            _adjust_resource_counters(new, 1, using)
+        instance._counted_in = new
+    if old != new or update_fields is None or RESOURCE_SECTION_FIELDS & update_fields:
+        invalidate_sections(*RESOURCE_SECTIONS, using=using)
+
+@receiver(post_delete, sender=Resource)
+def uncount_active_resource(sender, instance, using='default', **kwargs):
+    if instance._counted_in:
+        _adjust_resource_counters(instance._counted_in, -1, using)
+    invalidate_sections(*RESOURCE_SECTIONS, using=using)
+
+@receiver(post_save, sender=ClassSchedule)
+@receiver(post_delete, sender=ClassSchedule)
+def invalidate_class_sections(sender, using='default', **kwargs):
+    invalidate_sections(*CLASS_SECTIONS, using=using)
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def invalidate_course_sections(sender, using='default', **kwargs):
+    """Course code and name show up in every section"""
+    invalidate_sections(*CLASS_SECTIONS, *RESOURCE_SECTIONS, using=using)
+
+@receiver(post_save, sender=ResourceCategory)
+@receiver(post_delete, sender=ResourceCategory)
+def invalidate_category_sections(sender, using='default', **kwargs):
+    invalidate_sections(*RESOURCE_SECTIONS, using=using)
+
+
+# Signals to regenerate the iCalendar feeds of changed courses
+from . import ical
+
+@receiver(post_init, sender=ClassSchedule)
+def remember_class_course(sender, instance, **kwargs):
+    instance._loaded_course_id = instance.__dict__.get('course_id')
+
+@receiver(post_save, sender=ClassSchedule)
+@receiver(post_delete, sender=ClassSchedule)
+def invalidate_class_feeds(sender, instance, using='default', **kwargs):
+    """A class moved to another course leaves both courses' feeds"""
+    course_ids = {instance.course_id, instance._loaded_course_id} - {None}
+    ical.invalidate_feeds(course_ids, ical.LEVELS, using=using)
+    instance._loaded_course_id = instance.course_id
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def invalidate_course_feeds(sender, instance, using='default', **kwargs):
+    ical.invalidate_feeds([instance.pk], ical.LEVELS, using=using)
+
+
+# Signals to drop cached member dashboards (App/dashboard.py); payments and
+# Voting import App, so their models are named lazily
+from .caching import invalidate_dashboard, invalidate_dashboards
+
+@receiver(post_save, sender='payments.Payment')
+@receiver(post_delete, sender='payments.Payment')
+@receiver(post_save, sender='Voting.Vote')
+@receiver(post_delete, sender='Voting.Vote')
+@receiver(post_save, sender=ResourceDownload)
+@receiver(post_delete, sender=ResourceDownload)
+def invalidate_member_dashboard(sender, instance, using='default', **kwargs):
+    user_id = getattr(instance, 'user_id', None) or getattr(instance, 'voter_id', None)
+    invalidate_dashboard(user_id, using=using)
+
+@receiver(post_save, sender='payments.PaymentType')
+@receiver(post_delete, sender='payments.PaymentType')
+@receiver(post_save, sender='Voting.Election')
+@receiver(post_delete, sender='Voting.Election')
+def invalidate_member_dashboards(sender, using='default', **kwargs):
+    invalidate_dashboards(using=using)
+
+
+# Signals to record logins and logouts in the audit trail
+from django.contrib.auth.signals import user_logged_in, user_logged_out
+from . import audit
+
+@receiver(user_logged_in)
+def audit_login(sender, request, user, **kwargs):
+    audit.log_event('login', user, request)
+
+@receiver(user_logged_out)
+def audit_logout(sender, request, user, **kwargs):
+    if user is not None:
+        audit.log_event('logout', user, request)
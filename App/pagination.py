@@ -0,0 +1,121 @@
+"""
+Keyset (cursor) pagination for the e-learning listings.
+
+Instead of OFFSET/COUNT, each page remembers the sort key of its last row and
+the next page asks for rows strictly after it, so every page costs the same
+index range scan however deep the student scrolls. The ordering must end in
+a unique column (the primary key) to break ties.
+"""
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class KeysetPage:
+    """One page of results plus the link to the next one"""
+
+    def __init__(self, items, has_next=False, next_cursor=None, next_url=None):
+        self.items = items
+        self.has_next = has_next
+        self.next_cursor = next_cursor
+        self.next_url = next_url
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __bool__(self):
+        return bool(self.items)
+
+
+class KeysetPaginator:
+    """Paginate a queryset over an ordering such as ('-upload_date', '-id')"""
+
+    def __init__(self, queryset, ordering, per_page=DEFAULT_PAGE_SIZE):
+        self.queryset = queryset.order_by(*ordering)
+        self.ordering = [
+            (name.lstrip('-'), name.startswith('-')) for name in ordering
+        ]
+        self.per_page = per_page
+
+    def _fields(self):
+        model = self.queryset.model
+        return [model._meta.get_field(name) for name, _ in self.ordering]
+
+    def encode_cursor(self, obj):
+        values = [
+            field.value_to_string(obj) for field in self._fields()
+        ]
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """Sort key values from a cursor, or None if it is not valid"""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            raw = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            fields = self._fields()
+            if not isinstance(raw, list) or len(raw) != len(fields):
+                return None
+            return [field.to_python(value) for field, value in zip(fields, raw)]
+        except (ValueError, TypeError, ValidationError):
+            return None
+
+    def _after(self, values):
+        """Rows sorting strictly after the given key"""
+        condition = Q()
+        equal = {}
+        for (name, descending), value in zip(self.ordering, values):
+            lookup = f'{name}__lt' if descending else f'{name}__gt'
+            condition |= Q(**equal, **{lookup: value})
+            equal[name] = value
+        return condition
+
+    def page(self, cursor=None):
+        queryset = self.queryset
+        values = self.decode_cursor(cursor) if cursor else None
+        if values is not None:
+            queryset = queryset.filter(self._after(values))
+
+        # One extra row tells us whether there is a next page without COUNT(*)
+        rows = list(queryset[:self.per_page + 1])
+        has_next = len(rows) > self.per_page
+        items = rows[:self.per_page]
+        next_cursor = self.encode_cursor(items[-1]) if has_next else None
+        return KeysetPage(items, has_next, next_cursor)
+
+
+def page_url(request, cursor):
+    """Current URL (filters included) pointing at another cursor"""
+    params = request.GET.copy()
+    params.pop('fragment', None)
+    params['cursor'] = cursor
+    return f'{request.path}?{params.urlencode()}'
+
+
+def paginate(request, queryset, ordering, per_page=DEFAULT_PAGE_SIZE):
+    """Page of `queryset` selected by the request's `cursor` parameter"""
+    try:
+        per_page = min(int(request.GET.get('per_page', per_page)), MAX_PAGE_SIZE)
+    except ValueError:
+        pass
+    paginator = KeysetPaginator(queryset, ordering, max(per_page, 1))
+    page = paginator.page(request.GET.get('cursor'))
+    if page.has_next:
+        page.next_url = page_url(request, page.next_cursor)
+    return page
+
+
+def wants_fragment(request):
+    """Infinite-scroll requests only need the next batch of rows"""
+    return (
+        request.GET.get('fragment') == '1' or
+        request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+    )
@@ -0,0 +1,194 @@
+"""
+Full-text search index for the resource library.
+
+SQLite:     FTS5 virtual table `app_resource_search` (rowid = resource id)
+PostgreSQL: table `app_resource_search` with a tsvector column and GIN index
+
+The index only holds active resources (title, description, course and the
+text extracted from the file) and is kept in sync by the Resource, Course
+and ResourceText signals in models.py. `manage.py rebuild_search_index` rebuilds
+it from scratch. On other databases search_resource_ids() returns None and
+callers fall back to icontains filters.
+"""
+import re
+
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import connections, router, transaction
+from django.db.utils import DatabaseError
+
+
+SEARCH_TABLE = 'app_resource_search'
+SEARCH_RESULT_LIMIT = 100
+
+# Resource fields (and attnames) that change its document or whether it is indexed
+INDEXED_FIELDS = frozenset({
+    'title', 'description', 'course', 'course_id', 'category', 'category_id', 'is_active', 'file',
+})
+
+# Column weights for bm25 (title, description, course_code, course_name, body)
+SQLITE_WEIGHTS = (10.0, 2.0, 8.0, 5.0, 1.0)
+
+_index_ready = set()
+
+
+def course_code_terms(code):
+    """'CSC201' -> 'CSC201 CSC 201' so both spellings match"""
+    return f"{code} {re.sub(r'(?<=[A-Za-z])(?=[0-9])', ' ', code)}"
+
+
+def query_terms(query):
+    """Lower-cased word tokens of a search box query"""
+    return re.findall(r'\w+', query.lower())[:10]
+
+
+def has_index(using='default'):
+    """Check whether this database has a search index table"""
+    if using in _index_ready:
+        return True
+
+    connection = connections[using]
+    if connection.vendor not in ('sqlite', 'postgresql'):
+        return False
+    with connection.cursor() as cursor:
+        tables = connection.introspection.table_names(cursor)
+    if SEARCH_TABLE in tables:
+        _index_ready.add(using)
+        return True
+    return False
+
+
+def _body(resource):
+    try:
+        return resource.extracted_text.get_text()
+    except ObjectDoesNotExist:
+        return ''
+
+
+def _document(resource):
+    course = resource.course
+    return (
+        resource.title,
+        resource.description,
+        course_code_terms(course.code),
+        course.name,
+        _body(resource),
+    )
+
+
+def _write(cursor, vendor, resource):
+    title, description, course_code, course_name, body = _document(resource)
+    if vendor == 'sqlite':
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [resource.pk])
+        cursor.execute(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, title, description, course_code, course_name, body) "
+            f"VALUES (%s, %s, %s, %s, %s, %s)",
+            [resource.pk, title, description, course_code, course_name, body]
+        )
+    else:
+        cursor.execute(
+            f"INSERT INTO {SEARCH_TABLE} (resource_id, document) VALUES (%s, "
+            f"setweight(to_tsvector('simple', %s), 'A') || "
+            f"setweight(to_tsvector('simple', %s), 'A') || "
+            f"setweight(to_tsvector('simple', %s), 'B') || "
+            f"setweight(to_tsvector('simple', %s), 'C') || "
+            f"setweight(to_tsvector('simple', %s), 'D')) "
+            f"ON CONFLICT (resource_id) DO UPDATE SET document = EXCLUDED.document",
+            [resource.pk, title, course_code, course_name, description, body]
+        )
+
+
+def _delete(cursor, vendor, resource_ids):
+    if not resource_ids:
+        return
+    column = 'rowid' if vendor == 'sqlite' else 'resource_id'
+    placeholders = ', '.join(['%s'] * len(resource_ids))
+    cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE {column} IN ({placeholders})", list(resource_ids))
+
+
+def index_resources(resources, using='default'):
+    """Add or refresh resources in the index (inactive ones are removed)"""
+    if not has_index(using):
+        return
+    connection = connections[using]
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        inactive = []
+        for resource in resources:
+            if resource.is_active:
+                _write(cursor, connection.vendor, resource)
+            else:
+                inactive.append(resource.pk)
+        _delete(cursor, connection.vendor, inactive)
+
+
+def remove_resources(resource_ids, using='default'):
+    """Drop resources from the index"""
+    if not has_index(using):
+        return
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        _delete(cursor, connection.vendor, list(resource_ids))
+
+
+def rebuild_index(resources, using='default', batch_size=500):
+    """Empty the index and re-add every resource in `resources`; returns the count"""
+    if not has_index(using):
+        return 0
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+
+    count = 0
+    batch = []
+    for resource in resources.select_related('course', 'extracted_text').iterator(chunk_size=batch_size):
+        batch.append(resource)
+        if len(batch) >= batch_size:
+            index_resources(batch, using)
+            count += len(batch)
+            batch = []
+    index_resources(batch, using)
+    return count + len(batch)
+
+
+def search_resource_ids(query, within=None, limit=SEARCH_RESULT_LIMIT):
+    """
+    Ids of resources matching `query`, best match first.
+    Every term is prefix matched, so 'CSC2' finds CSC201, CSC205, ...
+    With `within` (a Resource queryset) only its rows are considered, before
+    the limit, so filters never empty a search that has matches.
+    Returns None when the database has no search index.
+    """
+    using = within.db if within is not None else 'default'
+    if not has_index(using):
+        return None
+
+    terms = query_terms(query)
+    if not terms:
+        return []
+
+    connection = connections[using]
+    column = 'rowid' if connection.vendor == 'sqlite' else 'resource_id'
+    restrict, restrict_params = '', []
+    if within is not None:
+        subquery, restrict_params = within.order_by().values('pk').query.sql_with_params()
+        restrict = f" AND {column} IN ({subquery})"
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                match = ' '.join(f'"{term}"*' for term in terms)
+                weights = ', '.join(str(weight) for weight in SQLITE_WEIGHTS)
+                cursor.execute(
+                    f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s{restrict} "
+                    f"ORDER BY bm25({SEARCH_TABLE}, {weights}) LIMIT %s",
+                    [match, *restrict_params, limit]
+                )
+            else:
+                tsquery = ' & '.join(f'{term}:*' for term in terms)
+                cursor.execute(
+                    f"SELECT resource_id FROM {SEARCH_TABLE} "
+                    f"WHERE document @@ to_tsquery('simple', %s){restrict} "
+                    f"ORDER BY ts_rank(document, to_tsquery('simple', %s)) DESC LIMIT %s",
+                    [tsquery, *restrict_params, tsquery, limit]
+                )
+            return [row[0] for row in cursor.fetchall()]
+    except DatabaseError:
+        return None
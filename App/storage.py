@@ -0,0 +1,177 @@
+"""
+Content-addressed storage for resource files.
+
+Every file is stored once as resources/cas/<aa>/<bb>/<sha256>.<ext>, so the
+same past-question ZIP uploaded by several admins shares one blob on disk.
+StoredBlob rows (models.py) count the resources pointing at each blob;
+once none is left the file is deleted. Saving a blob also holds its row for
+a while, so a blob about to be attached to a new resource is not deleted by
+a concurrent release, and a blob whose resource was never created is
+cleaned up when the hold runs out.
+
+The SHA-256 is computed while the upload streams in (HashingUploadHandler
+mixins, see FILE_UPLOAD_HANDLERS) and only re-read from disk when a file
+arrives some other way.
+"""
+import hashlib
+import os
+import re
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+
+
+CAS_PREFIX = 'resources/cas'
+
+
+def blob_name(digest, extension):
+    """Storage name of the blob holding content with this digest"""
+    return f'{CAS_PREFIX}/{digest[:2]}/{digest[2:4]}/{digest}{extension.lower()}'
+
+
+def is_blob_name(name):
+    return bool(name) and name.startswith(CAS_PREFIX + '/')
+
+
+def blob_digest(name):
+    """SHA-256 a blob name was derived from"""
+    return name.rsplit('/', 1)[-1].split('.', 1)[0]
+
+
+def file_sha256(content):
+    """SHA-256 of a file, reusing the digest taken during upload if present"""
+    digest = getattr(content, 'sha256', None)
+    if digest:
+        return digest
+    sha = hashlib.sha256()
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    for chunk in content.chunks():
+        sha.update(chunk)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return sha.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that names files after their content"""
+
+    def __init__(self, **kwargs):
+        # Identical bytes under an identical name: a concurrent duplicate
+        # upload may safely overwrite instead of getting a suffixed copy
+        kwargs.setdefault('allow_overwrite', True)
+        super().__init__(**kwargs)
+
+    def save(self, name, content, max_length=None):
+        if content is None:
+            raise ValueError("File content must be provided")
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+
+        from .models import StoredBlob
+        extension = os.path.splitext(name)[1]
+        name = blob_name(file_sha256(content), extension)
+        # Hold before checking for the file, so it cannot be deleted in between
+        StoredBlob.hold(name, content.size)
+        if self.exists(name):
+            return name  # Deduplicated: the blob is already stored
+        return super().save(name, content, max_length)
+
+
+def get_resource_storage():
+    return resource_storage
+
+
+resource_storage = ContentAddressedStorage()
+
+
+# <stem>.<12 hex digits>.<ext>, or <stem>.<12 hex digits>_<7 chars>.<ext>
+# when the name was taken (Storage.get_available_name adds the suffix)
+HASHED_NAME_RE = re.compile(r'\.(?P<digest>[0-9a-f]{12})(?:_[a-zA-Z0-9]{7})?\.\w+$')
+HASH_LENGTH = 12
+COLLISION_SUFFIX_LENGTH = 8
+WEBP_SUFFIX = '.webp'
+
+
+def content_digest(name):
+    """Content hash embedded in a hashed media name, or None"""
+    match = HASHED_NAME_RE.search(name or '')
+    return match.group('digest') if match else None
+
+
+def webp_name(name):
+    """Storage name of the WebP variant kept next to a hashed image"""
+    return name + WEBP_SUFFIX
+
+
+class HashedMediaStorage(FileSystemStorage):
+    """
+    FileSystemStorage for public images (candidate photos, posters, profile
+    pictures) that puts the first 12 hex digits of the content's SHA-256 in
+    the name: candidates/profiles/ada.3f2c9e01b7d4.jpg. A name therefore
+    always means the same bytes and can be cached forever (fileserving.py).
+    A WebP variant is written next to each image in the background.
+    """
+
+    def save(self, name, content, max_length=None):
+        if content is None:
+            raise ValueError("File content must be provided")
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+
+        root, extension = os.path.splitext(name)
+        if content_digest(name):
+            root = root[:root.rindex('.')]  # Re-saving a hashed file (e.g. compressed)
+        if max_length:
+            # Trim the stem, never the digest, leaving room for a collision suffix
+            root = root[:max_length - len(extension) - HASH_LENGTH - 1 - COLLISION_SUFFIX_LENGTH]
+        name = f'{root}.{file_sha256(content)[:HASH_LENGTH]}{extension.lower()}'
+        name = super().save(name, content, max_length)
+
+        from .images import make_webp_variant
+        from .tasks import run_in_background
+        run_in_background(make_webp_variant, name)
+        return name
+
+    def save_variant(self, name, content):
+        """Store a file derived from a hashed image (its WebP copy) under `name` as is"""
+        return super().save(name, content)
+
+    def delete(self, name):
+        super().delete(name)
+        if name and content_digest(name):
+            super().delete(webp_name(name))
+
+
+def get_media_storage():
+    return media_storage
+
+
+media_storage = HashedMediaStorage()
+
+
+class HashingUploadMixin:
+    """Upload handler mixin that hashes file data as it is received"""
+
+    def new_file(self, *args, **kwargs):
+        self.sha256 = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        self.sha256.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        if file is not None:
+            file.sha256 = self.sha256.hexdigest()
+        return file
+
+
+class HashingMemoryFileUploadHandler(HashingUploadMixin, MemoryFileUploadHandler):
+    pass
+
+
+class HashingTemporaryFileUploadHandler(HashingUploadMixin, TemporaryFileUploadHandler):
+    pass
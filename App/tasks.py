@@ -0,0 +1,53 @@
+"""
+Background worker for slow work that must not hold up a request.
+
+run_in_background() hands a function to a small per-process thread pool once
+the current transaction commits, so the task always sees the rows the
+request wrote. Tasks are best-effort: they die with the worker, so anything
+they produce must be reproducible (e.g. image variants regenerated by the
+next upload). With BACKGROUND_TASKS_EAGER they run inline instead.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_pid = None
+_lock = threading.Lock()
+
+
+def _get_executor():
+    """Per-process pool; a forked worker starts its own"""
+    global _executor, _executor_pid
+    with _lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.BACKGROUND_TASK_WORKERS,
+                thread_name_prefix='background'
+            )
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def _run(func, args, kwargs):
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        logger.exception("Background task %s failed", func.__name__)
+    finally:
+        close_old_connections()
+
+
+def run_in_background(func, *args, **kwargs):
+    """Run `func(*args, **kwargs)` off the request after the transaction commits"""
+    if settings.BACKGROUND_TASKS_EAGER:
+        transaction.on_commit(lambda: func(*args, **kwargs))
+    else:
+        transaction.on_commit(lambda: _get_executor().submit(_run, func, args, kwargs))
@@ -1,3 +1,1651 @@
-from django.test import TestCase
+import base64
+import contextlib
+import copy
+import hashlib
+import importlib
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import time, timedelta
+from time import monotonic, sleep
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, OperationalError, connection, connections, transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate
+from django.db.models.signals import post_save, pre_save
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.template import TemplateDoesNotExist
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from payments.models import Payment, PaymentHistory, PaymentType
+from Project import metrics
+from Project.middleware import STICKY_COOKIE, PrimaryStickinessMiddleware
+from Project.querycount import QueryRecorder, query_shape
+from Project.routers import REPLICA, ReplicaRouter, pinned_to_primary, serving_request, use_replica
+from Voting.models import Candidate, Election, Position, Vote, VoterProfile, VotingSession
+from .models import (
+    AuditEvent, ClassAttendance, LoginHistory, ClassSchedule, Course, Resource, ResourceCategory, ResourceDownload,
+    ResourceDownloadDaily, ResourceText, StoredBlob, UserProfile,
+)
+from . import extraction, fileserving, ical, images, mangodb, search
+from .buffers import BufferedWriter
+from .bulk import explicit_timestamps, signals_muted
+from .caching import section_key
+from .dashboard import member_dashboard
+from .management.commands import transfer_database
+from .mixins import skipped_writes
+from .pagination import KeysetPaginator
+from .storage import content_digest, media_storage, resource_storage, webp_name
+from .writes import immediate, serialized_writes
+
+
+LOCAL_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'default'},
+    'sessions': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'sessions'},
+}
+
+# Sessions as deployed with Redis
+CACHED_SESSIONS = {
+    'SESSION_ENGINE': 'django.contrib.sessions.backends.cached_db',
+    'SESSION_CACHE_ALIAS': 'sessions',
+}
+
+
+class IndexUsageMixin:
+    def assertUsesIndex(self, queryset, index_name):
+        if connection.vendor == 'postgresql':
+            # Tiny test tables are always cheaper to scan sequentially
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+        plan = queryset.explain()
+        self.assertIn(index_name, plan)
+
+
+class ClassStatusTests(IndexUsageMixin, TestCase):
+    """Class status computed in SQL and the indexes behind the status filters"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.today = timezone.now().date()
+        cls.course = Course.objects.create(code='CSC201', name='Programming', level='200')
+        cls.classes = {
+            'completed': cls.make_class(cls.today, is_completed=True),
+            'today': cls.make_class(cls.today),
+            'upcoming': cls.make_class(cls.today + timedelta(days=3)),
+            'past': cls.make_class(cls.today - timedelta(days=3)),
+        }
+
+    @classmethod
+    def make_class(cls, date, is_completed=False):
+        return ClassSchedule.objects.create(
+            course=cls.course, title='Class', date=date,
+            start_time=time(9), end_time=time(11),
+            meeting_link='https://meet.example.com/x', lecturer='Dr. A',
+            is_completed=is_completed
+        )
+
+    def test_annotation_matches_get_status(self):
+        for obj in ClassSchedule.objects.with_status():
+            self.assertEqual(obj.status, ClassSchedule.objects.get(pk=obj.pk).get_status())
+
+    def test_filter_status_matches_annotation(self):
+        for status, obj in self.classes.items():
+            self.assertEqual(list(ClassSchedule.objects.filter_status(status)), [obj])
+        upcoming = ClassSchedule.objects.filter_status('today', 'upcoming')
+        self.assertEqual(set(upcoming), {self.classes['today'], self.classes['upcoming']})
+
+    def test_status_filter_uses_date_index(self):
+        for statuses in (['today'], ['upcoming'], ['past'], ['today', 'upcoming']):
+            with self.subTest(statuses=statuses):
+                self.assertUsesIndex(
+                    ClassSchedule.objects.filter_status(*statuses),
+                    'classschedule_date_status_idx'
+                )
+
+    def test_course_schedule_uses_course_date_index(self):
+        queryset = ClassSchedule.objects.filter(course=self.course, date__gte=self.today)
+        self.assertUsesIndex(queryset, 'classschedule_course_date_idx')
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class TrendingRollupTests(IndexUsageMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('student')
+        self.course = Course.objects.create(code='CSC201', name='Programming', level='200')
+
+    def download(self, resource, days_ago, times=1):
+        noon = timezone.now().replace(hour=12, minute=0, second=0, microsecond=0)
+        with explicit_timestamps(ResourceDownload):
+            ResourceDownload.objects.bulk_create([
+                ResourceDownload(resource=resource, user=self.user, downloaded_at=noon - timedelta(days=days_ago))
+                for _ in range(times)
+            ])
+
+    def roll_up(self, **options):
+        call_command('update_trending_resources', stdout=io.StringIO(), **options)
+
+    def test_rollup_upserts(self):
+        [resource] = Resource.objects.bulk_create([Resource(title='Notes', course=self.course, file='notes.pdf')])
+        self.download(resource, 0, times=3)
+        self.download(resource, 1, times=2)
+        self.download(resource, 5)
+
+        self.roll_up()
+        self.roll_up()  # Rerunning changes nothing
+        daily = lambda: list(ResourceDownloadDaily.objects.order_by('day').values_list('downloads', flat=True))
+        self.assertEqual(daily(), [2, 3])  # Only the last two days without --full
+
+        self.download(resource, 0)
+        self.roll_up(full=True)
+        self.assertEqual(daily(), [1, 2, 4])
+        self.assertEqual(ResourceDownloadDaily.objects.count(), 3)
+
+    def test_decayed_scores(self):
+        old_hit, new_hit, steady, stale = Resource.objects.bulk_create([
+            Resource(title=title, course=self.course, file=f'{title}.pdf') for title in ('old', 'new', 'steady', 'stale')
+        ])
+        self.download(old_hit, 9, times=10)   # 10 / 2**3
+        self.download(new_hit, 0, times=4)    # 4
+        self.download(steady, 1, times=3)     # 3 / 2**(1/3)
+        Resource.objects.filter(pk=stale.pk).update(trending_score=5)  # Nothing in the window any more
+
+        self.roll_up(full=True, half_life=3)
+        scores = dict(Resource.objects.values_list('title', 'trending_score'))
+        self.assertEqual(scores['old'], 1.25)
+        self.assertEqual(scores['new'], 4)
+        self.assertAlmostEqual(scores['steady'], 3 * 0.5 ** (1 / 3), places=4)
+        self.assertEqual(scores['stale'], 0)
+        self.assertEqual(
+            list(Resource.objects.order_by('-trending_score').values_list('title', flat=True)),
+            ['new', 'steady', 'old', 'stale']
+        )
+
+    def test_rollup_uses_time_index(self):
+        resources = Resource.objects.bulk_create([
+            Resource(title=f'Notes {number}', course=self.course, file=f'notes{number}.pdf') for number in range(5)
+        ])
+        ResourceDownload.objects.bulk_create([
+            ResourceDownload(resource=resources[number % 5], user=self.user) for number in range(1000)
+        ])
+        # Months of history, of which the rollup reads the last days
+        ResourceDownload.objects.update(downloaded_at=timezone.now() - timedelta(days=100))
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+        counts = (
+            ResourceDownload.objects
+            .filter(downloaded_at__gte=timezone.now() - timedelta(days=2))
+            .annotate(day=TruncDate('downloaded_at'))
+            .values('resource_id', 'day')
+            .annotate(downloads=Count('id'))
+        )
+        self.assertUsesIndex(counts, 'resourcedownload_time_idx')
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class CalendarFeedTests(TestCase):
+    """Feed tokens, their reset and the conditional .ics responses"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('student')
+        cls.course = Course.objects.create(code='CSC201', name='Programming', level='200')
+        ClassSchedule.objects.create(
+            course=cls.course, title='Graphs', date=timezone.now().date() + timedelta(days=1),
+            start_time=time(9), end_time=time(11), meeting_link='https://meet.example.com/x',
+            meeting_password='s3cret', lecturer='Dr. A'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def feed(self, token, **headers):
+        return self.client.get(reverse('course_calendar', args=[self.course.pk]), {'token': token}, **headers)
+
+    def test_token_round_trip(self):
+        token = ical.feed_token(self.user)
+        self.assertEqual(ical.feed_token(self.user), token)
+        self.assertEqual(ical.user_for_token(token), self.user)
+        self.assertIsNone(ical.user_for_token(token + 'x'))
+        self.assertIsNone(ical.user_for_token(f'{self.user.pk}:'))
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertIsNone(ical.user_for_token(token))
+
+    def test_reset_revokes_issued_links(self):
+        token = ical.feed_token(self.user)
+        self.client.force_login(self.user)
+        self.assertRedirects(self.client.post(reverse('reset_calendar_token')), reverse('elearning_home'))
+        self.client.logout()
+
+        self.assertIsNone(ical.user_for_token(token))
+        self.assertEqual(self.feed(token).status_code, 404)
+        self.assertEqual(self.feed(ical.feed_token(User.objects.get(pk=self.user.pk))).status_code, 200)
+
+    def test_feed(self):
+        response = self.feed(ical.feed_token(self.user))
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        body = response.content.decode()
+        self.assertIn('SUMMARY:CSC201 - Graphs', body)
+        self.assertIn('Join: https://meet.example.com/x', body)
+        self.assertNotIn('s3cret', body)
+
+        self.assertEqual(self.feed('').status_code, 404)
+        self.assertEqual(self.feed('forged:token').status_code, 404)
+
+    def test_not_modified(self):
+        token = ical.feed_token(self.user)
+        response = self.feed(token)
+        self.assertEqual(self.feed(token, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertEqual(self.feed(token, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
+        self.assertEqual(self.feed(token, HTTP_IF_NONE_MATCH='"stale"').status_code, 200)
+
+
+@override_settings(CACHES=LOCAL_CACHES, **CACHED_SESSIONS)
+class SessionEngineBenchmarkTests(TestCase):
+    """django_session queries per authenticated request, database vs cached sessions"""
+
+    REQUESTS = 10
+
+    def setUp(self):
+        self.user = User.objects.create_user('student', password='secret')
+
+    def session_queries(self, method, url, **data):
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(self.REQUESTS):
+                getattr(self.client, method)(url, data)
+        return sum('django_session' in query['sql'] for query in queries.captured_queries)
+
+    def test_cached_sessions_skip_the_session_table(self):
+        with self.settings(SESSION_ENGINE='django.contrib.sessions.backends.db'):
+            self.client.force_login(self.user)
+            db_reads = self.session_queries('get', reverse('profile_view'))
+
+        # SessionMiddleware binds the engine on the client's first request
+        self.client = self.client_class()
+        self.client.force_login(self.user)
+        cached_reads = self.session_queries('get', reverse('profile_view'))
+
+        self.assertEqual(db_reads, self.REQUESTS)
+        self.assertEqual(cached_reads, 0)
+
+    def test_messages_do_not_write_the_session(self):
+        self.client.force_login(self.user)
+        writes = self.session_queries('post', reverse('edit_preferences'), dark_mode='on')
+        self.assertEqual(writes, 0)
+
+    def test_warmed_sessions_are_served_from_cache(self):
+        with self.settings(SESSION_ENGINE='django.contrib.sessions.backends.db'):
+            self.client.force_login(self.user)
+
+        call_command('warm_session_cache', stdout=io.StringIO())
+        self.assertEqual(self.session_queries('get', reverse('profile_view')), 0)
+
+
+@skipUnless(connection.vendor == 'sqlite', "SQLite concurrency settings")
+@override_settings(CACHES=LOCAL_CACHES)
+class SQLiteConcurrencyStressTests(TransactionTestCase):
+    """Concurrent read-then-write transactions on a file database never hit 'database is locked'"""
+
+    THREADS = 16
+    WRITES_PER_THREAD = 25
+    ALIAS = 'stress'
+
+    @classmethod
+    def setUpClass(cls):
+        # The test database lives in memory; WAL and locking need a real file
+        cls.directory = tempfile.mkdtemp()
+        settings_dict = copy.deepcopy(connections['default'].settings_dict)
+        settings_dict['NAME'] = os.path.join(cls.directory, 'stress.sqlite3')
+        connections.settings[cls.ALIAS] = settings_dict
+        cls.databases = {'default', cls.ALIAS}
+        super().setUpClass()
+        call_command('migrate', database=cls.ALIAS, verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[cls.ALIAS].close()
+        del connections[cls.ALIAS]
+        del connections.settings[cls.ALIAS]
+        shutil.rmtree(cls.directory)
+
+    def setUp(self):
+        self.course = Course.objects.using(self.ALIAS).create(code='CSC201', name='Programming', level='200')
+
+    def hammer(self, write_block):
+        errors = []
+
+        def worker():
+            try:
+                for _ in range(self.WRITES_PER_THREAD):
+                    with write_block(using=self.ALIAS):
+                        courses = Course.objects.using(self.ALIAS)
+                        courses.get(pk=self.course.pk)  # Read first: the lock upgrade case
+                        courses.filter(pk=self.course.pk).update(
+                            active_resource_count=F('active_resource_count') + 1
+                        )
+            except OperationalError as e:
+                errors.append(e)
+            finally:
+                connections[self.ALIAS].close()
+
+        threads = [threading.Thread(target=worker) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.course.refresh_from_db(using=self.ALIAS)
+        self.assertEqual(self.course.active_resource_count, self.THREADS * self.WRITES_PER_THREAD)
+
+    def test_connection_uses_wal(self):
+        with connections[self.ALIAS].cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+
+    def test_competing_connections(self):
+        """Separate connections stand in for separate worker processes"""
+        self.hammer(immediate)
+
+    def test_reads_do_not_wait_for_a_writer(self):
+        writing, done = threading.Event(), threading.Event()
+
+        def writer():
+            try:
+                with immediate(using=self.ALIAS):
+                    writing.set()
+                    done.wait(10)
+            finally:
+                connections[self.ALIAS].close()
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        try:
+            writing.wait(10)
+            with transaction.atomic(using=self.ALIAS):
+                self.assertTrue(Course.objects.using(self.ALIAS).filter(pk=self.course.pk).exists())
+        finally:
+            done.set()
+            thread.join()
+
+    def test_serialized_writes(self):
+        self.hammer(serialized_writes)
+
+
+class QueryBudgetMixin:
+    """assertQueryBudget(): at most `budget` queries and no query shape repeated N+1 style"""
+
+    N_PLUS_ONE_THRESHOLD = 3
+
+    @contextmanager
+    def assertQueryBudget(self, budget, label=''):
+        with QueryRecorder() as recorder:
+            yield recorder
+        repeated = recorder.repeated(self.N_PLUS_ONE_THRESHOLD)
+        self.assertLessEqual(recorder.count, budget, f"{label}: {recorder.count} queries, budget {budget}")
+        self.assertEqual(repeated, [], f"{label}: repeated query shapes (N+1)")
+
+
+URLCONFS = ('App.urls', 'Voting.urls', 'payments.urls')
+
+
+@override_settings(CACHES=LOCAL_CACHES, BACKGROUND_TASKS_EAGER=True, WRITE_BUFFER_EAGER=True, **CACHED_SESSIONS)
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    """
+    Query budgets for every URL (GET, logged in) and every admin changelist.
+    Each list holds three rows, so a query run per row trips the N+1 check.
+    A new URL needs a budget here.
+    """
+
+    BUDGETS = {
+        # App/urls.py
+        '': 1,
+        'signup/': 1,
+        'dashboard/': 5,
+        'logout/': 3,
+        'payment_page/': 0,
+        'profile/': 5,
+        'profile/edit/': 2,
+        'profile/preferences/': 2,
+        'profile/change-password/': 1,
+        'profile/delete-account/': 1,
+        'profile/activity/': 3,
+        'elearning/': 8,
+        'elearning/schedule/': 2,
+        'elearning/class/<int:class_id>/join/': 4,
+        'elearning/resources/': 2,
+        'elearning/resource/<int:resource_id>/': 4,
+        'elearning/resource/<int:resource_id>/download/': 12,
+        'elearning/my-downloads/': 2,
+        'elearning/course/<int:course_id>/': 3,
+        'elearning/calendar/course/<int:course_id>.ics': 3,
+        'elearning/calendar/level/<str:level>.ics': 2,
+        'elearning/calendar/reset/': 2,
+        'elearning/uploads/': 1,
+        'elearning/uploads/<uuid:upload_id>/': 1,
+        'elearning/uploads/<uuid:upload_id>/complete/': 1,
+        # Voting/urls.py
+        'elections/': 4,
+        'elections/<int:election_id>/': 6,
+        'elections/<int:election_id>/results/': 5,
+        'elections/<int:election_id>/vote/': 1,
+        'voter/register/': 2,
+        'candidate/<int:candidate_id>/': 4,
+        'candidate/<int:candidate_id>/profile/': 10,
+        'elections/<int:election_id>/candidates/': 4,
+        'elections/<int:election_id>/compare/': 2,
+        'candidate/<int:candidate_id>/vote/': 1,
+        # payments/urls.py
+        'payment/': 3,
+        'payment/initialize/': 1,
+        'payment/verify/': 1,
+        'payment/history/': 4,
+        'payment/webhook/': 0,
+    }
+    ADMIN_CHANGELIST_BUDGET = 8
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.enterClassContext(override_settings(MEDIA_ROOT=cls.media_root))
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.user = User.objects.create_user('student', password='secret', email='student@example.com')
+        VoterProfile.objects.create(user=cls.user, registration_number='NACOS/000', has_paid_dues=True, is_verified=True)
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'secret')
+
+        cls.election = Election.objects.create(
+            title='SUG', description='Elections', status='active',
+            start_date=now - timedelta(days=1), end_date=now + timedelta(days=1),
+            show_results=True, results_published=True
+        )
+        candidates = []
+        for order, name in enumerate(['president', 'sec_general', 'treasurer']):
+            position = Position.objects.create(election=cls.election, name=name, order=order)
+            candidates += [
+                Candidate.objects.create(position=position, name=f'{name} {i}', registration_number=f'{name}{i}', manifesto='-')
+                for i in range(3)
+            ]
+        cls.candidate = candidates[0]
+
+        cls.course = Course.objects.create(code='CSC201', name='Programming', level='200')
+        category = ResourceCategory.objects.create(name='Notes')
+        for i in range(3):
+            voter = User.objects.create_user(f'voter{i}')
+            VoterProfile.objects.create(user=voter, registration_number=f'NACOS/{i + 1:03}')
+            Vote.objects.create(voter=voter, candidate=candidates[i * 3])
+            VotingSession.objects.create(voter=voter, election=cls.election, is_completed=True)
+
+            cls.schedule = ClassSchedule.objects.create(
+                course=cls.course, title=f'Week {i}', date=now.date() + timedelta(days=i),
+                start_time=time(9), end_time=time(11),
+                meeting_link='https://meet.example.com/x', lecturer='Dr. A'
+            )
+            ClassAttendance.objects.create(class_schedule=cls.schedule, user=voter)
+
+            cls.resource = Resource(title=f'Notes {i}', course=cls.course, category=category, uploaded_by=cls.admin)
+            cls.resource.file.save(f'notes{i}.pdf', ContentFile(f'%PDF-{i}'.encode()), save=False)
+            cls.resource.save()
+            ResourceDownload.objects.create(resource=cls.resource, user=voter)
+
+            payment = Payment.objects.create(user=voter, amount=500, email=f'voter{i}@example.com')
+            payment.mark_as_failed({'status': 'failed'})
+            PaymentHistory.objects.create(payment=payment, status='failed')
+            AuditEvent.objects.create(user=voter, event='login')
+
+    def url_kwargs(self):
+        return {
+            'class_id': self.schedule.pk,
+            'resource_id': self.resource.pk,
+            'course_id': self.course.pk,
+            'level': self.course.level,
+            'upload_id': uuid.uuid4(),
+            'election_id': self.election.pk,
+            'candidate_id': self.candidate.pk,
+        }
+
+    def routes(self):
+        for module in URLCONFS:
+            for pattern in importlib.import_module(module).urlpatterns:
+                yield str(pattern.pattern)
+
+    def test_every_url_has_a_budget(self):
+        self.assertEqual(set(self.routes()), set(self.BUDGETS))
+
+    def test_url_query_budgets(self):
+        kwargs = self.url_kwargs()
+        for route in dict.fromkeys(self.routes()):
+            url = '/' + re.sub(r'<(?:\w+:)?(\w+)>', lambda match: str(kwargs[match[1]]), route)
+            with self.subTest(url=url):
+                self.client.force_login(self.user)
+                with self.assertQueryBudget(self.BUDGETS[route], url):
+                    try:
+                        self.client.get(url)
+                    except TemplateDoesNotExist:
+                        pass  # Some page templates are not in this repository
+
+    def test_admin_changelist_query_budgets(self):
+        self.client.force_login(self.admin)
+        for model in admin.site._registry:
+            url = reverse(f'admin:{model._meta.app_label}_{model._meta.model_name}_changelist')
+            with self.subTest(url=url), self.assertQueryBudget(self.ADMIN_CHANGELIST_BUDGET, url):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_recorder_groups_queries_by_shape(self):
+        with QueryRecorder() as recorder:
+            for candidate in Candidate.objects.all():
+                candidate.position.election  # One query per row for each relation
+        self.assertEqual(recorder.count, 1 + 9 * 2)
+        self.assertEqual([count for _, count in recorder.repeated(3)], [9, 9])
+        self.assertEqual(
+            query_shape('SELECT 1 FROM t WHERE id IN (%s, %s, %s) LIMIT 21'),
+            'SELECT ? FROM t WHERE id IN (...) LIMIT ?'
+        )
+
+    @override_settings(SQL_SERVER_TIMING=True, SQL_QUERY_BUDGET=0)
+    def test_middleware_reports_queries(self):
+        self.client.force_login(self.user)
+        with self.assertLogs('Project.sql', 'WARNING') as logs:
+            response = self.client.get(reverse('profile_view'))
+
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual(line['path'], reverse('profile_view'))
+        self.assertTrue(line['over_budget'])
+        self.assertRegex(response['Server-Timing'], rf'^db;dur=[\d.]+;desc="{line["queries"]} queries", app;dur=[\d.]+$')
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class MemberDashboardTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.user = User.objects.create_user('member')
+        cls.dues = PaymentType.objects.create(name='Dues', description='-', amount=2000)
+        cls.election = Election.objects.create(
+            title='SUG', description='-', status='active',
+            start_date=now - timedelta(days=1), end_date=now + timedelta(days=1)
+        )
+        position = Position.objects.create(election=cls.election, name='president')
+        cls.candidate = Candidate.objects.create(position=position, name='A', registration_number='A1', manifesto='-')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cached_until_the_member_changes_something(self):
+        with self.assertQueryBudget(4, 'cold'):
+            data = member_dashboard(self.user)
+        self.assertEqual(data['dues_outstanding'], 2000)
+        self.assertFalse(data['elections'][0].has_voted)
+        with self.assertNumQueries(0):
+            member_dashboard(self.user)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Vote.objects.create(voter=self.user, candidate=self.candidate)
+            Payment.objects.create(user=self.user, payment_type=self.dues, amount=2000, status='success')
+        data = member_dashboard(self.user)
+        self.assertTrue(data['elections'][0].has_voted)
+        self.assertTrue(data['dues_paid'])
+
+    def test_shared_changes_reach_every_member(self):
+        other = User.objects.create_user('other')
+        member_dashboard(self.user)
+        member_dashboard(other)
+        with self.captureOnCommitCallbacks(execute=True):
+            Election.objects.get(pk=self.election.pk).delete()
+        self.assertEqual(member_dashboard(self.user)['elections'], [])
+        self.assertEqual(member_dashboard(other)['elections'], [])
+
+    def test_page_shows_the_member_data(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('dashboard'))
+        self.assertContains(response, 'id="dashboard-home"')
+        self.assertContains(response, self.election.title)
+        self.assertContains(response, '₦2,000.00 due')
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class PaginationTests(TestCase):
+    """Keyset cursors, tie-breaking on the pk and the infinite-scroll fragments"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('student')
+        cls.course = Course.objects.create(code='CSC201', name='Programming', level='200')
+        cls.uploaded = timezone.now().replace(microsecond=0)
+        Resource.objects.bulk_create([
+            Resource(title=f'Notes {number}', course=cls.course, file=f'notes{number}.pdf') for number in range(7)
+        ])
+        # Every row shares its upload date, so only the pk orders them
+        Resource.objects.update(upload_date=cls.uploaded)
+        cls.expected = list(Resource.objects.order_by('-id').values_list('id', flat=True))
+
+    def paginator(self, per_page=3):
+        return KeysetPaginator(Resource.objects.all(), ('-upload_date', '-id'), per_page)
+
+    def test_cursor_round_trip(self):
+        paginator = self.paginator()
+        resource = Resource.objects.get(pk=self.expected[0])
+        cursor = paginator.encode_cursor(resource)
+        self.assertEqual(paginator.decode_cursor(cursor), [self.uploaded, resource.pk])
+
+    def test_tampered_cursors(self):
+        paginator = self.paginator()
+        encode = lambda value: base64.urlsafe_b64encode(json.dumps(value).encode()).decode()
+        for cursor in ['!!!', 'bm90IGpzb24', encode({'id': 1}), encode([1]), encode(['yesterday', 1])]:
+            with self.subTest(cursor=cursor):
+                self.assertIsNone(paginator.decode_cursor(cursor))
+                # A broken cursor starts over rather than failing
+                self.assertEqual([r.pk for r in paginator.page(cursor)], self.expected[:3])
+
+    def test_ties_break_on_pk(self):
+        paginator, seen, cursor = self.paginator(), [], None
+        while True:
+            page = paginator.page(cursor)
+            seen += [resource.pk for resource in page]
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        self.assertEqual(seen, self.expected)
+
+    def test_has_next_from_the_extra_row(self):
+        page = self.paginator(per_page=7).page()
+        self.assertEqual(len(page), 7)
+        self.assertFalse(page.has_next)
+        self.assertIsNone(page.next_cursor)
+
+        page = self.paginator(per_page=6).page()
+        self.assertTrue(page.has_next)
+        last = self.paginator(per_page=6).page(page.next_cursor)
+        self.assertEqual([r.pk for r in last], self.expected[6:])
+        self.assertFalse(last.has_next)
+
+    def test_fragments(self):
+        today = timezone.now().date()
+        for number in range(3):
+            ClassSchedule.objects.create(
+                course=self.course, title=f'Week {number}', date=today + timedelta(days=number),
+                start_time=time(9), end_time=time(11), meeting_link='https://meet.example.com/x', lecturer='Dr. A'
+            )
+            ResourceDownload.objects.create(resource_id=self.expected[number], user=self.user)
+        self.client.force_login(self.user)
+
+        for name, template, rows in [
+            ('class_schedule', 'class_items.html', 3),
+            ('my_downloads', 'download_items.html', 3),
+            ('resource_library', 'resource_items.html', 7),
+        ]:
+            with self.subTest(view=name):
+                url = reverse(name)
+                response = self.client.get(url, {'fragment': '1', 'per_page': 2})
+                self.assertTemplateUsed(response, f'elearning/partials/{template}')
+                self.assertEqual([template.name for template in response.templates], [
+                    f'elearning/partials/{template}', 'elearning/partials/load_more.html'
+                ])
+                next_url = response.context['page'].next_url
+                self.assertTrue(next_url.startswith(url))
+                self.assertNotIn('fragment', next_url)
+                self.assertIn('per_page=2', next_url)
+
+                # XHR requests get the fragment too; walk to the end of the listing
+                count, url = 0, f'{url}?per_page=2'
+                while url:
+                    page = self.client.get(url, HTTP_X_REQUESTED_WITH='XMLHttpRequest').context['page']
+                    count += len(page)
+                    url = page.next_url
+                self.assertEqual(count, rows)
+
+
+@override_settings(CACHES=LOCAL_CACHES, BACKGROUND_TASKS_EAGER=True)
+class ResourceSearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.enterClassContext(override_settings(MEDIA_ROOT=cls.media_root))
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.course_200 = Course.objects.create(code='CSC201', name='Programming', level='200')
+        cls.course_300 = Course.objects.create(code='CSC301', name='Algorithms', level='300')
+        cls.resources = []
+        # The 300 level resource ranks last for 'sorting'
+        rows = [(cls.course_200, 'Sorting: sorting algorithms')] * 3 + [(cls.course_300, 'Sorting and hashing notes')]
+        for i, (course, title) in enumerate(rows):
+            resource = Resource(title=title, course=course)
+            resource.file.save(f'sorting{i}.pdf', ContentFile(f'%PDF-{i}'.encode()), save=False)
+            resource.save()
+            cls.resources.append(resource)
+
+    def test_filters_apply_before_the_limit(self):
+        self.assertNotEqual(search.search_resource_ids('sorting', limit=1), [self.resources[-1].pk])
+        within = Resource.objects.filter(is_active=True, course__level='300')
+        self.assertEqual(search.search_resource_ids('sorting', within=within, limit=1), [self.resources[-1].pk])
+
+    def test_counter_saves_skip_the_index_and_home_cache(self):
+        resource = self.resources[0]
+        with CaptureQueriesContext(connection) as queries:
+            resource.save(update_fields=['trending_score'])
+        self.assertFalse([query for query in queries if search.SEARCH_TABLE in query['sql']])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            resource.increment_downloads()
+        resource.refresh_from_db()
+        self.assertEqual(resource.download_count, 1)
+
+        cache.set(section_key('recent_resources'), ['cached'])
+        with self.captureOnCommitCallbacks(execute=True):
+            resource.save(update_fields=['trending_score'])
+        self.assertEqual(cache.get(section_key('recent_resources')), ['cached'])
+
+        resource.title = 'Graph notes'
+        with self.captureOnCommitCallbacks(execute=True):
+            resource.save(update_fields=['title'])
+        self.assertEqual(search.search_resource_ids('graph'), [resource.pk])
+        self.assertIsNone(cache.get(section_key('recent_resources')))
+
+    def test_uploads_are_extracted_after_commit(self):
+        resource = Resource(title='Lecture 1', course=self.course_200)
+        resource.file.save('lecture1.txt', ContentFile(b'Dijkstra shortest paths'), save=False)
+        with self.captureOnCommitCallbacks(execute=True):
+            resource.save()
+        self.assertEqual(ResourceText.objects.get(resource=resource).get_text(), 'Dijkstra shortest paths')
+        self.assertEqual(search.search_resource_ids('dijkstra'), [resource.pk])
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class TextExtractionTests(TransactionTestCase):
+    """Uploads go through the real background thread and the spawned extraction pool"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.enterClassContext(override_settings(MEDIA_ROOT=cls.media_root))
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+    def test_upload_is_extracted_in_the_background(self):
+        course = Course.objects.create(code='CSC201', name='Programming', level='200')
+        resource = Resource(title='Lecture 1', course=course)
+        resource.file.save('lecture1.txt', ContentFile(b'Dijkstra shortest paths'), save=False)
+        resource.save()
+
+        deadline = monotonic() + 60
+        while not ResourceText.objects.filter(resource=resource).exists() and monotonic() < deadline:
+            sleep(0.1)
+        self.assertEqual(ResourceText.objects.get(resource=resource).get_text(), 'Dijkstra shortest paths')
+
+    def test_pool_is_spawned_once_per_process(self):
+        pool = extraction.get_pool()
+        self.assertIs(extraction.get_pool(), pool)
+        self.assertEqual(pool._mp_context.get_start_method(), 'spawn')
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class DirtyFieldsTests(TestCase):
+    """DirtyFieldsMixin, on Payment"""
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user('payer', email='payer@example.com')
+        dues = PaymentType.objects.create(name='Dues', description='-', amount=2000)
+        cls.payment = Payment.objects.create(
+            user=user, payment_type=dues, amount=2000, email=user.email, gateway_response={'status': 'ongoing'}
+        )
+
+    def setUp(self):
+        self.payment = Payment.objects.get(pk=self.payment.pk)
+
+    def test_unchanged_save_is_skipped(self):
+        skipped = skipped_writes['payments.Payment']
+        with self.assertNumQueries(0):
+            self.payment.save()
+        self.assertEqual(skipped_writes['payments.Payment'], skipped + 1)
+
+    def test_only_changed_fields_are_written(self):
+        self.payment.status = 'failed'
+        with CaptureQueriesContext(connection) as queries:
+            self.payment.save()
+        update = next(query['sql'] for query in queries.captured_queries if query['sql'].startswith('UPDATE'))
+        self.assertIn('"status"', update)
+        self.assertIn('"updated_at"', update)  # auto_now
+        self.assertNotIn('"email"', update)
+
+        with self.assertNumQueries(0):
+            self.payment.save()  # The snapshot was refreshed
+
+    def test_in_place_json_edits_are_detected(self):
+        # The snapshot is a deep copy, so mutating the loaded dict is a change
+        self.payment.gateway_response['status'] = 'success'
+        self.assertEqual(self.payment.get_dirty_fields(), ['gateway_response'])
+        self.payment.save()
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.gateway_response, {'status': 'success'})
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class FileServingTests(TestCase):
+    """ETags, byte ranges and proxy offload for resource downloads"""
+
+    CONTENT = bytes(range(100))
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.enterClassContext(override_settings(MEDIA_ROOT=cls.media_root))
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('student')
+        course = Course.objects.create(code='CSC201', name='Programming', level='200')
+        cls.resource = Resource(title='Notes', course=course)
+        cls.resource.file.save('notes.zip', ContentFile(cls.CONTENT), save=False)
+        cls.resource.save()
+        cls.url = reverse('download_resource', args=[cls.resource.pk])
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def download(self, **headers):
+        return self.client.get(self.url, **headers)
+
+    def test_parse_range(self):
+        for header, expected in [
+            ('', None),
+            ('bytes=10-19', (10, 19)),
+            ('bytes=90-', (90, 99)),
+            ('bytes=-10', (90, 99)),
+            ('bytes=90-500', (90, 99)),
+            ('bytes=100-', False),
+            ('bytes=20-10', False),
+            ('bytes=-0', False),
+            ('bytes=0-1,5-6', False),
+            ('items=0-1', None),
+        ]:
+            with self.subTest(header=header):
+                self.assertEqual(fileserving.parse_range(header, 100), expected)
+
+    def test_etag_follows_the_content(self):
+        digest = hashlib.sha256(self.CONTENT).hexdigest()
+        self.assertEqual(fileserving.file_etag(self.resource.file), f'"{digest}"')
+
+        # Plain names: a same-size replacement under the same name gets a new tag
+        storage = FileSystemStorage(location=self.media_root)
+        name = storage.save('plain.txt', ContentFile(b'aaaa'))
+        before = fileserving.file_etag(fileserving.StoredFile(storage, name))
+        with open(storage.path(name), 'wb') as file:
+            file.write(b'bbbb')
+        os.utime(storage.path(name), (0, 0))
+        self.assertNotEqual(fileserving.file_etag(fileserving.StoredFile(storage, name)), before)
+
+    def test_partial_content(self):
+        response = self.download(HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/100')
+        self.assertEqual(b''.join(response.streaming_content), self.CONTENT[10:20])
+
+    def test_multi_and_unsatisfiable_ranges(self):
+        for header in ('bytes=0-1,5-6', 'bytes=500-'):
+            with self.subTest(header=header):
+                response = self.download(HTTP_RANGE=header)
+                self.assertEqual(response.status_code, 416)
+                self.assertEqual(response['Content-Range'], 'bytes */100')
+
+    def test_if_range_mismatch_sends_the_whole_file(self):
+        response = self.download(HTTP_RANGE='bytes=10-19', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.CONTENT)
+
+    def test_revalidations_and_resumes_are_not_counted(self):
+        etag = fileserving.file_etag(self.resource.file)
+        self.assertEqual(self.download(HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.download(HTTP_RANGE='bytes=50-').status_code, 206)
+        self.assertFalse(ResourceDownload.objects.exists())
+
+        self.assertEqual(self.download().status_code, 200)
+        self.resource.refresh_from_db()
+        self.assertEqual((ResourceDownload.objects.count(), self.resource.download_count), (1, 1))
+
+    def test_proxy_offload(self):
+        with self.settings(FILE_SERVE_MODE='x-accel'):
+            response = self.download()
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.resource.file.name}')
+        self.assertEqual(response.content, b'')
+
+        with self.settings(FILE_SERVE_MODE='x-sendfile'):
+            response = self.download()
+        self.assertEqual(response['X-Sendfile'], self.resource.file.path)
+        self.assertEqual(response['ETag'], fileserving.file_etag(self.resource.file))
+
+
+def jpeg_bytes(size=(200, 200), quality=95):
+    """A gradient JPEG, large enough for its WebP copy to be smaller"""
+    img = Image.new('RGB', size)
+    img.putdata([(x % 256, y % 256, (x * y) % 256) for y in range(size[1]) for x in range(size[0])])
+    output = io.BytesIO()
+    img.save(output, format='JPEG', quality=quality)
+    return output.getvalue()
+
+
+@override_settings(CACHES=LOCAL_CACHES, BACKGROUND_TASKS_EAGER=True)
+class MediaServingTests(TestCase):
+    """Hashed media names, their caching headers and WebP negotiation"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.enterClassContext(override_settings(MEDIA_ROOT=cls.media_root))
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+    def save(self, name, content):
+        with self.captureOnCommitCallbacks(execute=True):
+            return media_storage.save(name, ContentFile(content))
+
+    def test_hashed_names(self):
+        content = jpeg_bytes()
+        digest = hashlib.sha256(content).hexdigest()[:12]
+        name = self.save('candidates/ada.JPG', content)
+        self.assertEqual(name, f'candidates/ada.{digest}.jpg')
+
+        # The name is taken: Django adds a suffix after the digest
+        again = self.save('candidates/ada.jpg', content)
+        self.assertNotEqual(again, name)
+        self.assertEqual(content_digest(again), digest)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            long_name = media_storage.save('candidates/' + 'a' * 200 + '.jpg', ContentFile(content), max_length=100)
+        self.assertLessEqual(len(long_name), 100)
+        self.assertEqual(content_digest(long_name), digest)
+
+    def test_hashed_names_are_immutable(self):
+        name = self.save('candidates/ada.jpg', jpeg_bytes())
+        plain = FileSystemStorage(location=self.media_root).save('candidates/old.jpg', ContentFile(b'old'))
+
+        response = self.client.get(f'/media/{name}')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(response['ETag'], f'"{content_digest(name)}"')
+        self.assertIn('Accept', response['Vary'])
+        self.assertEqual(self.client.get(f'/media/{name}', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+        response = self.client.get(f'/media/{plain}')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=3600')
+        self.assertNotIn('Vary', response)
+
+        self.assertEqual(self.client.get('/media/candidates/missing.jpg').status_code, 404)
+        self.assertEqual(self.client.get('/media/candidates/../../settings.py').status_code, 404)
+
+    def test_webp_negotiation(self):
+        name = self.save('candidates/ada.jpg', jpeg_bytes())
+        self.assertTrue(media_storage.exists(webp_name(name)))
+
+        response = self.client.get(f'/media/{name}', HTTP_ACCEPT='image/webp,image/*')
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertEqual(response['ETag'], f'"{content_digest(name)}-webp"')
+        self.assertIn('Accept', response['Vary'])
+
+        response = self.client.get(f'/media/{name}', HTTP_ACCEPT='image/*')
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+
+    def test_hash_media_files(self):
+        user = User.objects.create_user('candidate')
+        plain = FileSystemStorage(location=self.media_root).save('profile_pictures/ada.jpg', ContentFile(jpeg_bytes()))
+        UserProfile.objects.filter(user=user).update(profile_picture=plain)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('hash_media_files', stdout=io.StringIO())
+        name = UserProfile.objects.get(user=user).profile_picture.name
+        self.assertIsNotNone(content_digest(name))
+        self.assertTrue(media_storage.exists(webp_name(name)))
+        self.assertFalse(media_storage.exists(plain))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('hash_media_files', stdout=io.StringIO())  # Nothing left to rename
+        self.assertEqual(UserProfile.objects.get(user=user).profile_picture.name, name)
+
+
+def noise_image(size):
+    """Random pixels, which JPEG cannot compress much"""
+    return Image.frombytes('RGB', size, os.urandom(size[0] * size[1] * 3))
+
+
+@override_settings(CACHES=LOCAL_CACHES, BACKGROUND_TASKS_EAGER=True)
+class ProfilePictureTests(TestCase):
+    """Picture compression, avatars and when UserProfile.save queues them"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.enterClassContext(override_settings(MEDIA_ROOT=cls.media_root))
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+    def setUp(self):
+        self.profile = User.objects.create_user('student').user_profile
+
+    def stored_files(self):
+        return {os.path.join(root, name) for root, _, names in os.walk(self.media_root) for name in names}
+
+    def processing_calls(self, queue):
+        return [call.args[1:] for call in queue.call_args_list if call.args[0] is images.process_profile_picture]
+
+    def upload(self, size=(800, 600)):
+        output = io.BytesIO()
+        noise_image(size).save(output, format='PNG')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile.profile_picture.save('me.png', ContentFile(output.getvalue()))
+        return self.profile.profile_picture.name
+
+    def test_compress_jpeg_finds_the_best_quality(self):
+        img = noise_image((300, 300))
+        max_bytes = 60 * 1024
+        fitting = [q for q in range(images.MIN_QUALITY, images.MAX_QUALITY + 1) if len(images.encode_jpeg(img, q)) <= max_bytes]
+        self.assertTrue(fitting)
+
+        with mock.patch.object(images, 'encode_jpeg', wraps=images.encode_jpeg) as encode:
+            data = images.compress_jpeg(img, max_bytes)
+        self.assertLessEqual(encode.call_count, 7)  # log2 of the 76 qualities
+        self.assertEqual(data, images.encode_jpeg(img, max(fitting)))
+
+        # Nothing fits: the smallest encoding is still returned
+        self.assertEqual(images.compress_jpeg(img, 1), images.encode_jpeg(img, images.MIN_QUALITY))
+
+    def test_upload_is_compressed_with_an_avatar(self):
+        original = self.upload()
+        self.profile.refresh_from_db()
+        picture, avatar = self.profile.profile_picture, self.profile.profile_avatar
+
+        self.assertNotEqual(picture.name, original)
+        self.assertFalse(media_storage.exists(original))
+        self.assertTrue(picture.name.endswith('.jpg'))
+        self.assertLessEqual(picture.size, images.PICTURE_MAX_BYTES)
+        with Image.open(picture) as img:
+            self.assertEqual(img.size, (400, 300))
+        with Image.open(avatar) as img:
+            self.assertEqual((img.format, img.size), ('JPEG', images.AVATAR_SIZE))
+        self.assertEqual(self.profile.get_avatar_url(), avatar.url)
+
+    def test_newer_upload_wins(self):
+        with mock.patch('App.tasks.run_in_background'):
+            stale = self.upload()
+        newer = 'profile_pictures/newer.jpg'
+
+        def replaced_meanwhile(img, max_bytes):
+            UserProfile.objects.filter(pk=self.profile.pk).update(profile_picture=newer)
+            return images.encode_jpeg(img, 80)
+
+        before = self.stored_files()
+        with mock.patch.object(images, 'compress_jpeg', side_effect=replaced_meanwhile):
+            images.process_profile_picture(self.profile.pk, stale)
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.profile_picture.name, newer)
+        self.assertFalse(self.profile.profile_avatar)
+        # The results for the stale picture were thrown away; it is left for its own task
+        self.assertEqual(self.stored_files(), before)
+        self.assertTrue(media_storage.exists(stale))
+
+        with mock.patch.object(images, 'compress_jpeg') as compress:
+            images.process_profile_picture(self.profile.pk, stale)
+        compress.assert_not_called()
+
+    def test_only_new_pictures_are_queued(self):
+        with mock.patch('App.tasks.run_in_background') as queue:
+            self.profile.bio = 'Hello'
+            self.profile.save()
+            queue.assert_not_called()
+
+            name = self.upload()
+            self.assertEqual(self.processing_calls(queue), [(self.profile.pk, name)])
+
+            profile = UserProfile.objects.get(pk=self.profile.pk)
+            profile.bio = 'Hello again'
+            profile.save()
+            profile.profile_avatar = 'profile_pictures/avatars/me.jpg'
+            profile.profile_picture = None
+            profile.save()
+            self.assertEqual(self.processing_calls(queue), [(self.profile.pk, name)])
+        self.assertFalse(UserProfile.objects.get(pk=self.profile.pk).profile_avatar)
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class SeedScaleTests(TestCase):
+    """A small seed_scale run and the bulk-load helpers it relies on"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.enterClassContext(override_settings(MEDIA_ROOT=cls.media_root))
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+    def seed(self, **options):
+        call_command(
+            'seed_scale', users=20, elections=2, votes=60, payments=30, resources=10, downloads=50,
+            batch_size=7, stdout=io.StringIO(), **options
+        )
+
+    def test_small_run(self):
+        self.seed()
+        users = User.objects.filter(username__startswith='seed')
+        self.assertEqual(users.count(), 20)
+        self.assertEqual(UserProfile.objects.filter(user__in=users).count(), 20)
+        self.assertEqual(VoterProfile.objects.filter(user__in=users).count(), 20)
+        self.assertEqual(Payment.objects.filter(user__in=users).count(), 30)
+        self.assertGreaterEqual(PaymentHistory.objects.filter(payment__user__in=users).count(), 30)
+        self.assertEqual(Election.objects.filter(title__startswith='[seed] ').count(), 2)
+        self.assertEqual(Vote.objects.count(), VotingSession.objects.count() * len(Position.POSITION_CHOICES))
+        seeded = Resource.objects.filter(course__code__startswith='SEED')
+        self.assertEqual(seeded.count(), 10)
+        self.assertEqual(ResourceDownload.objects.filter(resource__in=seeded).count(), 50)
+        self.assertEqual(sum(seeded.values_list('download_count', flat=True)), 50)
+
+        # Same seed and volumes, same data
+        references = set(Payment.objects.values_list('reference', flat=True))
+        self.seed(clear=True)
+        self.assertEqual(set(Payment.objects.values_list('reference', flat=True)), references)
+
+    def test_timestamps_are_kept(self):
+        self.seed()
+        week_ago = timezone.now() - timedelta(days=7)
+        self.assertTrue(User.objects.filter(username__startswith='seed', date_joined__lt=week_ago).exists())
+        self.assertTrue(Payment.objects.filter(created_at__lt=week_ago).exists())
+        self.assertFalse(Payment.objects.exclude(updated_at=F('created_at')).exists())
+        self.assertTrue(ResourceDownload.objects.filter(downloaded_at__lt=week_ago).exists())
+        self.assertTrue(Resource.objects.filter(upload_date__lt=week_ago).exists())
+        closed = Election.objects.get(title='[seed] Election 1')
+        self.assertFalse(Vote.objects.filter(candidate__position__election=closed, timestamp__gt=closed.end_date).exists())
+
+        # The auto_now flags are back for everybody else
+        self.assertTrue(Payment._meta.get_field('updated_at').auto_now)
+        self.assertTrue(Payment._meta.get_field('created_at').auto_now_add)
+        self.assertTrue(ResourceDownload._meta.get_field('downloaded_at').auto_now_add)
+
+    def test_signals_muted_restores_the_receivers(self):
+        receivers = list(post_save.receivers)
+        with self.assertRaises(RuntimeError), signals_muted():
+            self.assertEqual(post_save.receivers, [])
+            user = User.objects.create_user('muted')
+            raise RuntimeError  # Restored even when the block fails
+        self.assertEqual(post_save.receivers, receivers)
+        self.assertFalse(UserProfile.objects.filter(user=user).exists())
+        self.assertTrue(UserProfile.objects.filter(user=User.objects.create_user('heard')).exists())
+
+        with signals_muted(post_save):
+            self.assertNotEqual(pre_save.receivers, [])
+        self.assertEqual(post_save.receivers, receivers)
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class TransferDatabaseTests(TransactionTestCase):
+    """transfer_database from a migrated SQLite file into the (empty) test database"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        cls.source_url = f"sqlite:///{os.path.join(cls.directory, 'source.sqlite3')}"
+        # Registered here rather than in `databases`, which the runner would try to create
+        transfer_database.add_database(transfer_database.SOURCE, cls.source_url)
+        cls.databases = {'default', transfer_database.SOURCE}
+        super().setUpClass()
+        call_command('migrate', database=transfer_database.SOURCE, verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[transfer_database.SOURCE].close()
+        del connections[transfer_database.SOURCE]
+        del connections.settings[transfer_database.SOURCE]
+        shutil.rmtree(cls.directory, ignore_errors=True)
+
+    def setUp(self):
+        # Both databases are emptied after each test
+        source = transfer_database.SOURCE
+        with signals_muted():
+            users = [User.objects.db_manager(source).create_user(f'member{number}') for number in range(7)]
+            User.objects.using(source).filter(pk__in=[users[1].pk, users[4].pk]).delete()  # Gaps in the ids
+            course = Course.objects.using(source).create(code='CSC201', name='Programming', level='200')
+            self.classes = [
+                ClassSchedule.objects.using(source).create(
+                    course=course, title=f'Week {number}', date=timezone.now().date() + timedelta(days=number),
+                    start_time=time(9), end_time=time(11), meeting_link='https://meet.example.com/x', lecturer='Dr. A'
+                )
+                for number in range(5)
+            ]
+        self.last_user_pk = users[-1].pk
+
+    def transfer(self, **options):
+        output = io.StringIO()
+        call_command(
+            'transfer_database', source=self.source_url, chunk_size=2,
+            state=os.path.join(self.directory, 'state.json'), stdout=output, **options
+        )
+        return output.getvalue()
+
+    def tearDown(self):
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(os.path.join(self.directory, 'state.json'))
+
+    def test_resumes_after_an_interruption(self):
+        save_state = transfer_database.Command.save_state
+        calls = 0
+
+        def interrupted(command):
+            nonlocal calls
+            save_state(command)
+            calls += 1
+            if calls == 20:
+                raise KeyboardInterrupt
+
+        with mock.patch.object(transfer_database.Command, 'save_state', interrupted), self.assertRaises(KeyboardInterrupt):
+            self.transfer()
+        output = self.transfer()
+        self.assertIn('Resuming from', output)
+        self.assertIn('done earlier', output)
+        self.assertIn('Transferred and verified', output)
+        self.assertEqual(User.objects.count(), 5)
+        self.assertEqual(ClassSchedule.objects.count(), 5)
+
+        # New rows get ids past the copied ones
+        self.assertGreater(User.objects.create_user('newcomer').pk, self.last_user_pk)
+        self.assertGreater(
+            ClassSchedule.objects.create(
+                course=Course.objects.get(), title='Extra', date=timezone.now().date(),
+                start_time=time(9), end_time=time(11), meeting_link='https://meet.example.com/x', lecturer='Dr. A'
+            ).pk, self.classes[-1].pk
+        )
+
+    def test_checksum_mismatch_fails_verification(self):
+        self.transfer()
+        self.assertIn('Verified', self.transfer(verify_only=True))
+
+        User.objects.filter(username='member0').update(first_name='Changed')
+        with self.assertRaisesMessage(CommandError, 'Source and target differ'):
+            self.transfer(verify_only=True)
+
+    def test_refuses_a_target_with_data(self):
+        Course.objects.create(code='CSC101', name='Introduction', level='100')
+        with self.assertRaisesMessage(CommandError, 'App.Course'):
+            self.transfer()
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class StoredBlobTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.enterClassContext(override_settings(MEDIA_ROOT=cls.media_root))
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.course = Course.objects.create(code='CSC201', name='Programming', level='200')
+
+    def upload(self, content=b'PK-shared'):
+        resource = Resource(title='Notes', course=self.course)
+        resource.file.save('notes.zip', ContentFile(content), save=False)
+        with self.captureOnCommitCallbacks(execute=True):
+            resource.save()
+        return resource
+
+    def delete(self, resource):
+        with self.captureOnCommitCallbacks(execute=True):
+            resource.delete()
+
+    def expire_holds(self):
+        StoredBlob.objects.update(held_until=timezone.now() - timedelta(seconds=1))
+
+    def test_reference_counting(self):
+        first, second = self.upload(), self.upload()
+        name = first.file.name
+        self.assertEqual(second.file.name, name)
+        self.assertEqual(StoredBlob.objects.get(name=name).ref_count, 2)
+
+        self.delete(first)
+        self.expire_holds()
+        self.assertEqual(StoredBlob.delete_unused(), 0)  # Still referenced
+        self.assertTrue(resource_storage.exists(name))
+
+        self.delete(second)  # Last reference, hold expired: deleted on commit
+        self.assertFalse(resource_storage.exists(name))
+        self.assertFalse(StoredBlob.objects.exists())
+
+    def test_held_blob_outlives_its_last_reference(self):
+        resource = self.upload()
+        self.delete(resource)
+        self.assertTrue(resource_storage.exists(resource.file.name))
+        self.expire_holds()
+        self.assertEqual(StoredBlob.delete_unused(), 1)
+        self.assertFalse(resource_storage.exists(resource.file.name))
+
+    def test_replaced_file_is_released(self):
+        resource = self.upload(b'PK-old')
+        old_name = resource.file.name
+        resource.file.save('notes.zip', ContentFile(b'PK-new'), save=False)
+        with self.captureOnCommitCallbacks(execute=True):
+            resource.save()
+        self.assertEqual(StoredBlob.objects.get(name=old_name).ref_count, 0)
+        self.assertEqual(StoredBlob.objects.get(name=resource.file.name).ref_count, 1)
+
+    def test_upload_during_release_keeps_the_file(self):
+        resource = self.upload()
+        name = resource.file.name
+        self.expire_holds()
+        with self.captureOnCommitCallbacks() as callbacks:
+            resource.delete()  # Last reference gone; deletion waits for commit
+        # Identical content arrives before the deferred delete runs
+        self.assertEqual(resource_storage.save('again.zip', ContentFile(b'PK-shared')), name)
+        for callback in callbacks:
+            callback()
+        self.assertTrue(resource_storage.exists(name))
+
+    def test_blob_of_a_failed_create_is_cleaned_up(self):
+        name = resource_storage.save('orphan.zip', ContentFile(b'PK-orphan'))
+        self.assertEqual(StoredBlob.objects.get(name=name).ref_count, 0)
+        self.assertEqual(StoredBlob.delete_unused(), 0)  # Held for the resource to come
+        self.expire_holds()
+        self.assertEqual(StoredBlob.delete_unused(), 1)
+        self.assertFalse(resource_storage.exists(name))
+
+
+@override_settings(MONGODB_URI=mangodb.MEMORY_URI, WRITE_BUFFER_FLUSH_INTERVAL=3600)
+class ArchiveTests(TestCase):
+    """MongoDB archiving against the in-memory stand-in"""
+
+    def setUp(self):
+        mangodb.memory_database.clear()
+
+    def test_archive_waits_for_commit(self):
+        document = {'event': 'login'}
+        with self.settings(WRITE_BUFFER_EAGER=True), self.captureOnCommitCallbacks() as callbacks:
+            mangodb.archive('audit_events', [document])
+        self.assertEqual(mangodb.memory_database['audit_events'].find(), [])
+
+        with self.settings(WRITE_BUFFER_EAGER=True):
+            for callback in callbacks:
+                callback()
+        self.assertEqual(mangodb.memory_database['audit_events'].count_documents({'event': 'login'}), 1)
+        self.assertEqual(document, {'event': 'login'})
+
+    def test_retried_batch_is_not_duplicated(self):
+        class FlakyCollection(mangodb.InMemoryCollection):
+            fail = True
+
+            def insert_many(self, documents, ordered=True):
+                if self.fail:
+                    # The connection drops after the first document was written
+                    self.fail = False
+                    super().insert_many(documents[:1], ordered)
+                    raise ConnectionError
+                super().insert_many(documents, ordered)
+
+        collection = mangodb.memory_database.collections['flaky'] = FlakyCollection()
+        sink = mangodb._sink('flaky')
+        for number in range(3):
+            sink.add({'number': number})
+        with self.assertLogs('App.buffers', 'ERROR'):
+            self.assertEqual(sink.flush(), 0)
+        self.assertEqual(sink.flush(), 3)
+        self.assertEqual(sorted(document['number'] for document in collection.find()), [0, 1, 2])
+
+    @mock.patch.object(mangodb, 'ServerApi', create=True)
+    @mock.patch.object(mangodb, 'MongoClient', side_effect=lambda *args, **kwargs: object())
+    def test_client_is_recreated_after_fork(self, client_class, server_api):
+        self.addCleanup(setattr, mangodb, '_client', None)
+        client = mangodb.get_client()
+        self.assertIs(mangodb.get_client(), client)
+
+        mangodb._client_pid = os.getpid() + 1  # As if inherited from the parent process
+        self.assertIsNot(mangodb.get_client(), client)
+        self.assertEqual(client_class.call_count, 2)
+        self.assertFalse(client_class.call_args.kwargs['connect'])
+
+
+class ReplicaRoutingTests(TestCase):
+    """Which reads ReplicaRouter sends to the replica, and primary stickiness after writes"""
+
+    @classmethod
+    def setUpClass(cls):
+        # Never connected to: only its settings decide whether a replica exists
+        settings_dict = copy.deepcopy(connections['default'].settings_dict)
+        settings_dict['NAME'] = 'replica.sqlite3'
+        connections.settings[REPLICA] = settings_dict
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        del connections[REPLICA]
+        del connections.settings[REPLICA]
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def route(self, request, write=False):
+        """Run `request` through the middleware; returns the response and where Resource reads went"""
+        used = []
+
+        def view(request):
+            if write:
+                Course.objects.create(code='CSC201', name='Programming', level='200')
+            used.append(self.router.db_for_read(Resource))
+            return HttpResponse()
+        return PrimaryStickinessMiddleware(view)(request), used[0]
+
+    def test_commands_read_from_the_primary(self):
+        self.assertEqual(self.router.db_for_read(Resource), 'default')
+        with use_replica():
+            self.assertEqual(self.router.db_for_read(Resource), REPLICA)
+
+    def test_requests_read_catalogue_models_from_the_replica(self):
+        token = serving_request.set(True)
+        self.addCleanup(serving_request.reset, token)
+        self.assertEqual(self.router.db_for_read(Resource), REPLICA)
+        self.assertEqual(self.router.db_for_read(Payment), 'default')
+
+        pinned = pinned_to_primary.set(True)
+        self.addCleanup(pinned_to_primary.reset, pinned)
+        self.assertEqual(self.router.db_for_read(Resource), 'default')
+
+    def test_writing_request_sticks_to_the_primary(self):
+        factory = RequestFactory()
+        response, used = self.route(factory.get('/'))
+        self.assertEqual(used, REPLICA)
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+        response, used = self.route(factory.post('/'), write=True)
+        self.assertEqual(used, 'default')
+        self.assertIn(STICKY_COOKIE, response.cookies)
+
+        request = factory.get('/')
+        request.COOKIES[STICKY_COOKIE] = '1'
+        self.assertEqual(self.route(request)[1], 'default')
+        self.assertEqual(self.router.db_for_read(Resource), 'default')  # Reset after the request
+
+
+@override_settings(WRITE_BUFFER_FLUSH_INTERVAL=3600)
+class BufferedWriterTests(TestCase):
+    BAD = {3, 7}
+
+    def setUp(self):
+        self.written = []
+        self.error = IntegrityError
+        self.buffer = BufferedWriter('test', self.write, batch_size=100)
+        for number in range(10):
+            self.buffer.add(number)
+
+    def write(self, items):
+        if self.error is OperationalError or self.BAD & set(items):
+            raise self.error
+        self.written.extend(items)
+
+    def test_bad_items_do_not_block_the_batch(self):
+        with self.assertLogs('App.buffers', 'ERROR') as logs:
+            self.assertEqual(self.buffer.flush(), 8)
+        self.assertEqual(sorted(self.written), [0, 1, 2, 4, 5, 6, 8, 9])
+        self.assertEqual((self.buffer.dropped, len(logs.records)), (2, 2))
+        self.assertEqual(self.buffer.pending(), [])
+
+    def test_outage_keeps_every_item(self):
+        self.error = OperationalError
+        with self.assertLogs('App.buffers', 'ERROR') as logs:
+            self.assertEqual(self.buffer.flush(), 0)
+        self.assertEqual(len(logs.records), 1)  # No bisecting
+        self.assertEqual(self.buffer.pending(), list(range(10)))
+
+        self.error = IntegrityError
+        with self.assertLogs('App.buffers', 'ERROR'):
+            self.assertEqual(self.buffer.flush(), 8)
+
+
+@override_settings(CACHES=LOCAL_CACHES, WRITE_BUFFER_EAGER=True)
+class LoginHistoryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('student', password='secret')
+
+    def login(self):
+        client = self.client_class()
+        with self.captureOnCommitCallbacks(execute=True):
+            client.force_login(self.user)
+        return client
+
+    def test_logout_closes_only_its_own_session(self):
+        laptop, phone = self.login(), self.login()
+        with self.captureOnCommitCallbacks(execute=True):
+            laptop.logout()
+
+        history = LoginHistory.objects.filter(user=self.user)
+        self.assertEqual(history.count(), 2)
+        self.assertEqual(history.filter(is_active=True).count(), 1)
+        self.assertIsNotNone(history.get(is_active=False).logout_time)
+        self.assertEqual(
+            history.get(is_active=True).session_hash,
+            hashlib.sha256(phone.session.session_key.encode()).hexdigest()
+        )
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write_worker(self, pid, votes):
+        metrics._write_file(self.directory, f'{pid}-1.json', [['nacos_votes', [], votes]], [])
+
+    def votes(self):
+        with self.settings(METRICS_DIR=self.directory):
+            counters, _ = metrics.collect()
+        return counters[('nacos_votes', ())] - metrics._counters.get(('nacos_votes', ()), 0)
+
+    def test_dead_workers_are_folded_into_the_aggregate(self):
+        self.write_worker(101, 3)
+        self.write_worker(102, 4)
+        self.write_worker(103, 5)
+        self.assertEqual(self.votes(), 12)
+
+        metrics.mark_process_dead(101, self.directory)
+        metrics.mark_process_dead(102, self.directory)
+        self.assertEqual(self.votes(), 12)  # Counters never go backwards
+        self.assertEqual(
+            sorted(name for name in os.listdir(self.directory) if name.endswith('.json')),
+            ['103-1.json', metrics.AGGREGATE_FILE]
+        )
+
+    @override_settings(METRICS_TOKEN='', DEBUG=False)
+    def test_endpoint_is_hidden_without_a_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
+        with self.settings(DEBUG=True):
+            self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+    @override_settings(METRICS_TOKEN='s3cret')
+    def test_endpoint_needs_the_bearer_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 401)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='s3cret').status_code, 401)
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer s3cret')
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+
+    def test_exposition_adds_up_every_process(self):
+        errors, duration = metrics.paystack_errors.name, metrics.paystack_duration.name
+        # Histogram files hold per-bucket counts, then the sum and the count
+        metrics._write_file(self.directory, '101-1.json', [[errors, ['test', 'Timeout'], 2]], [
+            [duration, ['test'], [1, 0, 2, 0, 0, 0, 0, 0, 1.5, 3]],
+        ])
+        metrics._write_file(self.directory, '102-1.json', [[errors, ['test', 'Timeout'], 3], [errors, ['test', 'a"b'], 1]], [
+            [duration, ['test'], [0, 0, 0, 0, 0, 0, 0, 0, 20.0, 1]],
+        ])
+        metrics.mark_process_dead(101, self.directory)  # Folded files count the same
+
+        with self.settings(METRICS_DIR=self.directory, METRICS_TOKEN='s3cret'):
+            response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer s3cret')
+        lines = response.content.decode().splitlines()
+        self.assertIn('# TYPE nacos_paystack_errors_total counter', lines)
+        self.assertIn('nacos_paystack_errors_total{operation="test",reason="Timeout"} 5', lines)
+        self.assertIn('nacos_paystack_errors_total{operation="test",reason="a\\"b"} 1', lines)
+
+        self.assertIn(f'# TYPE {duration} histogram', lines)
+        buckets = [line for line in lines if line.startswith(f'{duration}_bucket{{operation="test"')]
+        self.assertEqual(buckets, [
+            f'{duration}_bucket{{operation="test",le="{bound}"}} {count}'
+            for bound, count in zip(metrics.paystack_duration.buckets + ('+Inf',), [1, 1, 3, 3, 3, 3, 3, 3, 4])
+        ])
+        self.assertIn(f'{duration}_sum{{operation="test"}} 21.5', lines)
+        self.assertIn(f'{duration}_count{{operation="test"}} 4', lines)
@@ -23,5 +23,11 @@ urlpatterns = [
     path('elearning/resource/<int:resource_id>/download/', views.download_resource, name='download_resource'),
     path('elearning/my-downloads/', views.my_downloads, name='my_downloads'),
     path('elearning/course/<int:course_id>/', views.course_resources, name='course_resources'),
+    path('elearning/calendar/course/<int:course_id>.ics', views.course_calendar, name='course_calendar'),
+    path('elearning/calendar/level/<str:level>.ics', views.level_calendar, name='level_calendar'),
+    path('elearning/calendar/reset/', views.reset_calendar_token, name='reset_calendar_token'),
+    path('elearning/uploads/', views.start_chunked_upload, name='start_chunked_upload'),
+    path('elearning/uploads/<uuid:upload_id>/', views.chunked_upload, name='chunked_upload'),
+    path('elearning/uploads/<uuid:upload_id>/complete/', views.complete_chunked_upload, name='complete_chunked_upload'),
 
 ]
@@ -2,6 +2,7 @@ from django.shortcuts import render, redirect
 from django.contrib.auth import authenticate, login, logout
 from django.contrib import messages
 from .forms import SignUpForm, SignInForm
+from .dashboard import member_dashboard
 from django.contrib.auth.decorators import login_required
 
 
@@ -43,8 +44,8 @@ def signup_view(request):
 
 @login_required(login_url='signin')
 def dashboard(request):
-    """Dashboard – accessible only to logged-in users."""
-    return render(request, 'dashboard.html')
+    """Dashboard – dues, elections, today's classes and downloads (App/dashboard.py)."""
+    return render(request, 'dashboard.html', member_dashboard(request.user))
 
 
 def logout_view(request):
@@ -80,20 +81,11 @@ from django.contrib import messages
 from django.contrib.auth import update_session_auth_hash
 from django.contrib.auth.forms import PasswordChangeForm
 from django.core.files.base import ContentFile
+from .audit import get_client_ip
 from .models import UserProfile, UserPreferences, LoginHistory
 import base64
 
 
-def get_client_ip(request):
-    """Get client IP address"""
-    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-    if x_forwarded_for:
-        ip = x_forwarded_for.split(',')[0]
-    else:
-        ip = request.META.get('REMOTE_ADDR')
-    return ip
-
-
 @login_required
 def profile_view(request):
     """Display user profile"""
@@ -274,78 +266,62 @@ def activity_log(request):
     return render(request, 'profile/activity_log.html', context)
 
 
-# Helper function to log user login
-def log_user_login(request, user):
-    """Log user login for security tracking"""
-    ip_address = get_client_ip(request)
-    user_agent = request.META.get('HTTP_USER_AGENT', '')
-    
-    LoginHistory.objects.create(
-        user=user,
-        ip_address=ip_address,
-        user_agent=user_agent,
-        is_active=True
-    )
-
-
 # ============================================
 # E-LEARNING VIEWS - ADD THIS TO App/views.py
 # ============================================
 
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.http import FileResponse, Http404
+from django.http import FileResponse, Http404, HttpResponse
 from django.contrib import messages
-from django.db.models import Q, Count
+from django.db.models import Q, Case, When
 from django.utils import timezone
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views.decorators.http import require_POST
 from .models import Course, ClassSchedule, Resource, ResourceCategory, ResourceDownload, ClassAttendance
+from . import audit, fileserving, ical, search
+from .attendance import record_attendance
+from .caching import cached_section
+from .pagination import KeysetPage, paginate, wants_fragment
+from .writes import serialized_writes
 
 
-def get_client_ip(request):
-    """Get client IP address"""
-    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-    if x_forwarded_for:
-        ip = x_forwarded_for.split(',')[0]
-    else:
-        ip = request.META.get('REMOTE_ADDR')
-    return ip
+# Keyset orderings; each ends in the primary key so the cursor is unambiguous
+RESOURCE_ORDERING = ('-upload_date', '-id')
+SCHEDULE_ORDERING = ('-date', '-start_time', '-id')
+DOWNLOAD_ORDERING = ('-downloaded_at', '-id')
 
 
 @login_required
 def elearning_home(request):
     """E-Learning home page with schedule and resources overview"""
-    # Get upcoming classes (next 7 days)
+    # Each section is cached separately and dropped by model signals (App/caching.py)
     today = timezone.now().date()
-    upcoming_classes = ClassSchedule.objects.filter(
-        date__gte=today,
-        is_completed=False
-    ).select_related('course')[:10]
+    upcoming_classes = cached_section('upcoming_classes', lambda: ClassSchedule.objects.filter_status(
+        'today', 'upcoming', today=today
+    ).select_related('course')[:10])
     
     # Get today's classes
-    today_classes = ClassSchedule.objects.filter(
-        date=today,
-        is_completed=False
-    ).select_related('course')
+    today_classes = cached_section('today_classes', lambda: ClassSchedule.objects.filter_status(
+        'today', today=today
+    ).select_related('course'))
     
     # Get recent resources
-    recent_resources = Resource.objects.filter(
+    recent_resources = cached_section('recent_resources', lambda: Resource.objects.filter(
         is_active=True
-    ).select_related('course', 'category')[:6]
+    ).select_related('course', 'category')[:6])
     
-    # Get popular resources (most downloaded)
-    popular_resources = Resource.objects.filter(
-        is_active=True
-    ).select_related('course', 'category').order_by('-download_count')[:6]
-    
-    # Get resource categories
-    categories = ResourceCategory.objects.annotate(
-        resource_count=Count('resources')
-    )
+    # Get popular resources (trending, precomputed by update_trending_resources)
+    popular_resources = cached_section('popular_resources', lambda: Resource.objects.filter(
+        is_active=True,
+        trending_score__gt=0
+    ).select_related('course', 'category').order_by('-trending_score')[:6])
     
-    # Get courses
-    courses = Course.objects.filter(is_active=True).annotate(
-        resource_count=Count('resources')
-    )
+    # Resource counts are maintained counters, not aggregates
+    categories = cached_section('categories', ResourceCategory.objects.all)
+    courses = cached_section('courses', lambda: Course.objects.filter(is_active=True))
     
     context = {
         'upcoming_classes': upcoming_classes,
@@ -354,6 +330,7 @@ def elearning_home(request):
         'popular_resources': popular_resources,
         'categories': categories,
         'courses': courses,
+        'calendar_feeds': calendar_feed_urls(request, courses),
     }
     return render(request, 'elearning/home.html', context)
 
@@ -376,21 +353,25 @@ def class_schedule(request):
     if course_filter:
         classes = classes.filter(course__id=course_filter)
     
-    # Status filter
-    today = timezone.now().date()
+    # Status filter (today's classes count as upcoming, completed ones as past)
     if status_filter == 'upcoming':
-        classes = classes.filter(date__gte=today, is_completed=False)
+        classes = classes.filter_status('today', 'upcoming')
     elif status_filter == 'past':
-        classes = classes.filter(Q(date__lt=today) | Q(is_completed=True))
+        classes = classes.filter_status('past', 'completed')
     elif status_filter == 'today':
-        classes = classes.filter(date=today, is_completed=False)
+        classes = classes.filter_status('today')
+    
+    page = paginate(request, classes, SCHEDULE_ORDERING)
+    if wants_fragment(request):
+        return render(request, 'elearning/partials/class_items.html', {'page': page})
     
     # Get filter options
     courses = Course.objects.filter(is_active=True)
     levels = Course.objects.values_list('level', flat=True).distinct()
     
     context = {
-        'classes': classes,
+        'classes': page.items,
+        'page': page,
         'courses': courses,
         'levels': levels,
         'selected_level': level_filter,
@@ -405,11 +386,8 @@ def join_class(request, class_id):
     """Join a class and track attendance"""
     class_schedule = get_object_or_404(ClassSchedule, id=class_id)
     
-    # Track attendance
-    ClassAttendance.objects.get_or_create(
-        class_schedule=class_schedule,
-        user=request.user
-    )
+    # Track attendance (buffered; the redirect does not wait for the insert)
+    record_attendance(class_schedule.id, request.user.id)
     
     # Redirect to meeting link
     messages.success(request, f'Joining {class_schedule.title}...')
@@ -428,14 +406,6 @@ def resource_library(request):
     # Base query
     resources = Resource.objects.filter(is_active=True).select_related('course', 'category', 'uploaded_by')
     
-    # Search
-    if search_query:
-        resources = resources.filter(
-            Q(title__icontains=search_query) |
-            Q(description__icontains=search_query) |
-            Q(course__name__icontains=search_query)
-        )
-    
     # Filters
     if level_filter:
         resources = resources.filter(course__level=level_filter)
@@ -446,13 +416,38 @@ def resource_library(request):
     if category_filter:
         resources = resources.filter(category__id=category_filter)
     
+    # Search (ranked full-text match within the filtered resources, icontains where there is no index)
+    if search_query:
+        ranked_ids = search.search_resource_ids(search_query, within=resources)
+        if ranked_ids is None:
+            resources = resources.filter(
+                Q(title__icontains=search_query) |
+                Q(description__icontains=search_query) |
+                Q(course__name__icontains=search_query)
+            )
+        elif not ranked_ids:
+            resources = resources.none()
+        else:
+            resources = resources.filter(id__in=ranked_ids).order_by(
+                Case(*[When(id=pk, then=rank) for rank, pk in enumerate(ranked_ids)])
+            )
+    
+    # Ranked search results are already capped, so they come as a single page
+    if search_query and ranked_ids is not None:
+        page = KeysetPage(list(resources))
+    else:
+        page = paginate(request, resources, RESOURCE_ORDERING)
+    if wants_fragment(request):
+        return render(request, 'elearning/partials/resource_items.html', {'page': page})
+    
     # Get filter options
     courses = Course.objects.filter(is_active=True)
     categories = ResourceCategory.objects.all()
     levels = Course.objects.values_list('level', flat=True).distinct()
     
     context = {
-        'resources': resources,
+        'resources': page.items,
+        'page': page,
         'courses': courses,
         'categories': categories,
         'levels': levels,
@@ -468,22 +463,34 @@ def resource_library(request):
 def download_resource(request, resource_id):
     """Download a resource file"""
     resource = get_object_or_404(Resource, id=resource_id, is_active=True)
+    etag = fileserving.file_etag(resource.file, resource.file_size)
+    
+    # Revalidations and resumed transfers are not counted as new downloads
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return not_modified
+    
+    if not fileserving.is_resumed_transfer(request):
+        with serialized_writes():
+            # Track download
+            ResourceDownload.objects.create(
+                resource=resource,
+                user=request.user,
+                ip_address=get_client_ip(request)
+            )
+            audit.log_event('download', request.user, request, resource_id=resource.id)
+            
+            # Increment counter
+            resource.increment_downloads()
     
-    # Track download
-    ResourceDownload.objects.create(
-        resource=resource,
-        user=request.user,
-        ip_address=get_client_ip(request)
-    )
-    
-    # Increment counter
-    resource.increment_downloads()
-    
-    # Serve file
+    # Serve file (or hand it to the front proxy)
     try:
-        response = FileResponse(resource.file.open('rb'))
-        response['Content-Disposition'] = f'attachment; filename="{resource.file.name.split("/")[-1]}"'
-        return response
+        return fileserving.serve_file(
+            request,
+            resource.file,
+            etag=etag,
+            cache_control='private, no-cache'
+        )
     except FileNotFoundError:
         messages.error(request, 'File not found')
         return redirect('resource_library')
@@ -519,10 +526,15 @@ def my_downloads(request):
     """View user's download history"""
     downloads = ResourceDownload.objects.filter(
         user=request.user
-    ).select_related('resource', 'resource__course').order_by('-downloaded_at')
+    ).select_related('resource', 'resource__course')
+    
+    page = paginate(request, downloads, DOWNLOAD_ORDERING)
+    if wants_fragment(request):
+        return render(request, 'elearning/partials/download_items.html', {'page': page})
     
     context = {
-        'downloads': downloads,
+        'downloads': page.items,
+        'page': page,
     }
     return render(request, 'elearning/my_downloads.html', context)
 
@@ -535,7 +547,11 @@ def course_resources(request, course_id):
     resources = Resource.objects.filter(
         course=course,
         is_active=True
-    ).select_related('category', 'uploaded_by')
+    ).select_related('course', 'category', 'uploaded_by')
+    
+    page = paginate(request, resources, RESOURCE_ORDERING)
+    if wants_fragment(request):
+        return render(request, 'elearning/partials/resource_items.html', {'page': page})
     
     # Get course classes
     upcoming_classes = ClassSchedule.objects.filter(
@@ -546,10 +562,214 @@ def course_resources(request, course_id):
     
     context = {
         'course': course,
-        'resources': resources,
+        'resources': page.items,
+        'page': page,
         'upcoming_classes': upcoming_classes,
     }
     return render(request, 'elearning/course_detail.html', context)
 
 
-# END OF E-LEARNING VIEWS
\ No newline at end of file
+# ============================================
+# CLASS CALENDAR FEEDS (.ics)
+# ============================================
+
+def _calendar_response(request, kind, value, build):
+    """Serve a cached feed to a logged-in student or a valid feed token"""
+    if not request.user.is_authenticated and ical.user_for_token(request.GET.get('token', '')) is None:
+        raise Http404("Unknown calendar feed")
+    
+    feed = ical.get_feed(kind, value, build)
+    not_modified = get_conditional_response(
+        request, etag=feed['etag'], last_modified=feed['last_modified'].timestamp()
+    )
+    if not_modified is not None:
+        return not_modified
+    
+    response = HttpResponse(feed['body'], content_type='text/calendar; charset=utf-8')
+    response['ETag'] = feed['etag']
+    response['Last-Modified'] = http_date(feed['last_modified'].timestamp())
+    response['Cache-Control'] = 'private, no-cache'
+    response['Content-Disposition'] = f'inline; filename="{kind}-{value}.ics"'
+    return response
+
+
+def course_calendar(request, course_id):
+    """iCalendar feed of one course's classes"""
+    course = get_object_or_404(Course, id=course_id, is_active=True)
+    
+    def build():
+        classes = course.classes.filter(date__gte=ical.feed_start_date()).select_related('course')
+        return f"{course.code} Classes", classes.order_by('date', 'start_time')
+    
+    return _calendar_response(request, 'course', course.id, build)
+
+
+def level_calendar(request, level):
+    """iCalendar feed of every class for a level"""
+    if level not in ical.LEVELS:
+        raise Http404("Unknown level")
+    
+    def build():
+        classes = ClassSchedule.objects.filter(
+            course__level=level,
+            course__is_active=True,
+            date__gte=ical.feed_start_date()
+        ).select_related('course')
+        return f"{level} Level Classes", classes.order_by('date', 'start_time')
+    
+    return _calendar_response(request, 'level', level, build)
+
+
+def calendar_feed_urls(request, courses):
+    """Subscription URLs (webcal://) with the student's feed token"""
+    token = ical.feed_token(request.user)
+    
+    def webcal(path):
+        url = request.build_absolute_uri(f'{path}?token={token}')
+        return 'webcal://' + url.split('://', 1)[1]
+    
+    return [
+        (f"{level} Level", webcal(reverse('level_calendar', args=[level])))
+        for level in sorted({course.level for course in courses})
+    ]
+
+
+@login_required
+@require_POST
+def reset_calendar_token(request):
+    """Revoke the student's calendar subscription links and issue new ones"""
+    ical.reset_feed_token(request.user)
+    messages.success(request, 'Your calendar links were reset. Subscribe again with the new links.')
+    return redirect('elearning_home')
+
+
+# END OF E-LEARNING VIEWS
+
+
+# ============================================
+# CHUNKED RESOURCE UPLOADS (ADMIN)
+# ============================================
+
+import os
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.http import JsonResponse
+from django.urls import reverse
+from django.views.decorators.http import require_http_methods, require_POST
+from .models import ChunkedUpload
+from .storage import resource_storage
+
+
+@staff_member_required
+@require_POST
+def start_chunked_upload(request):
+    """Start a resumable resource upload"""
+    filename = os.path.basename(request.POST.get('filename', '')).strip()
+    try:
+        total_size = int(request.POST.get('size', ''))
+    except ValueError:
+        total_size = 0
+    
+    if not filename or total_size <= 0:
+        return JsonResponse({'error': 'filename and size are required'}, status=400)
+    
+    # Same file type rules as the admin form
+    try:
+        for validator in Resource._meta.get_field('file').validators:
+            validator(File(None, name=filename))
+    except ValidationError as e:
+        return JsonResponse({'error': ' '.join(e.messages)}, status=400)
+    
+    upload = ChunkedUpload.objects.create(
+        user=request.user,
+        filename=filename,
+        total_size=total_size
+    )
+    os.makedirs(settings.CHUNKED_UPLOAD_DIR, exist_ok=True)
+    open(upload.get_part_path(), 'wb').close()
+    
+    return JsonResponse({
+        'upload_id': str(upload.id),
+        'offset': 0,
+        'chunk_size': settings.CHUNKED_UPLOAD_CHUNK_SIZE,
+    }, status=201)
+
+
+@staff_member_required
+@require_http_methods(['GET', 'PUT', 'POST'])
+def chunked_upload(request, upload_id):
+    """GET reports where to resume; PUT/POST appends the chunk at Upload-Offset"""
+    upload = get_object_or_404(ChunkedUpload, id=upload_id, user=request.user)
+    
+    if request.method == 'GET':
+        return JsonResponse({'offset': upload.received, 'total_size': upload.total_size})
+    
+    try:
+        offset = int(request.headers.get('Upload-Offset', ''))
+    except ValueError:
+        return JsonResponse({'error': 'Upload-Offset header is required'}, status=400)
+    
+    if offset != upload.received:
+        return JsonResponse({'error': 'Offset mismatch', 'offset': upload.received}, status=409)
+    
+    chunk = request.body
+    if not chunk or len(chunk) > settings.CHUNKED_UPLOAD_CHUNK_SIZE:
+        return JsonResponse({'error': 'Invalid chunk size'}, status=400)
+    if offset + len(chunk) > upload.total_size:
+        return JsonResponse({'error': 'Chunk exceeds declared file size'}, status=400)
+    
+    # Overwrite from the offset so a half-written earlier attempt is replaced
+    with open(upload.get_part_path(), 'r+b') as part:
+        part.seek(offset)
+        part.write(chunk)
+        part.truncate()
+    
+    new_offset = offset + len(chunk)
+    updated = ChunkedUpload.objects.filter(pk=upload.pk, received=offset).update(
+        received=new_offset,
+        updated_at=timezone.now()
+    )
+    if not updated:
+        upload.refresh_from_db()
+        return JsonResponse({'error': 'Offset mismatch', 'offset': upload.received}, status=409)
+    
+    return JsonResponse({'offset': new_offset, 'total_size': upload.total_size})
+
+
+@staff_member_required
+@require_POST
+def complete_chunked_upload(request, upload_id):
+    """Store a fully received upload (deduplicated) and create its Resource"""
+    upload = get_object_or_404(ChunkedUpload, id=upload_id, user=request.user)
+    
+    if not upload.is_complete():
+        return JsonResponse({'error': 'Upload is not complete', 'offset': upload.received}, status=400)
+    
+    title = request.POST.get('title', '').strip()
+    course = Course.objects.filter(id=request.POST.get('course') or None).first()
+    if not title or course is None:
+        return JsonResponse({'error': 'title and a valid course are required'}, status=400)
+    category = ResourceCategory.objects.filter(id=request.POST.get('category') or None).first()
+    
+    with open(upload.get_part_path(), 'rb') as part:
+        name = resource_storage.save(upload.filename, File(part, name=upload.filename))
+    
+    resource = Resource.objects.create(
+        title=title,
+        description=request.POST.get('description', ''),
+        course=course,
+        category=category,
+        file=name,
+        uploaded_by=request.user
+    )
+    
+    os.remove(upload.get_part_path())
+    upload.delete()
+    
+    return JsonResponse({
+        'resource_id': resource.id,
+        'file': name,
+        'admin_url': reverse('admin:App_resource_change', args=[resource.id]),
+    }, status=201)
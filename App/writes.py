@@ -0,0 +1,52 @@
+"""
+Write serialization for SQLite deployments.
+
+SQLite allows one writer at a time. Transactions are DEFERRED, so plain
+atomic blocks only take the write lock at their first write, and reads
+never wait for it. Write blocks use serialized_writes() instead, which
+begins with BEGIN IMMEDIATE: a read-then-write transaction takes the lock
+up front and waits its turn (busy timeout) rather than failing the lock
+upgrade with "database is locked". Inside a process, it additionally queues
+threads (buffer flushes, background tasks, threaded workers) on a lock, so
+they do not burn the busy timeout spinning against each other. On other
+databases it is a plain atomic block.
+"""
+import threading
+from contextlib import contextmanager
+
+from django.db import connections, transaction
+
+
+_write_lock = threading.RLock()
+
+
+@contextmanager
+def immediate(using='default'):
+    """
+    Atomic block that takes SQLite's write lock when it begins. Only the
+    outermost block begins a transaction; nested inside another atomic block
+    it is a savepoint of that transaction.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        with transaction.atomic(using=using):
+            yield
+        return
+    connection.ensure_connection()
+    mode, connection.transaction_mode = connection.transaction_mode, 'IMMEDIATE'
+    try:
+        with transaction.atomic(using=using):
+            yield
+    finally:
+        connection.transaction_mode = mode
+
+
+@contextmanager
+def serialized_writes(using='default'):
+    """Atomic block that holds this process's write lock on SQLite"""
+    if connections[using].vendor != 'sqlite':
+        with transaction.atomic(using=using):
+            yield
+        return
+    with _write_lock, immediate(using):
+        yield
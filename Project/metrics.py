@@ -0,0 +1,295 @@
+"""
+Prometheus metrics without a client library.
+
+Counters and histograms live in a plain dict per process; recording one is a
+lock and an addition, so it is cheap enough for every request. With gunicorn
+each worker has its own dict, so when METRICS_DIR is set every process also
+writes its values to <METRICS_DIR>/<pid>-<start>.json from a background
+thread (every METRICS_FLUSH_INTERVAL seconds and when the worker exits). The
+/metrics view adds up all those files. When a worker dies, the gunicorn
+master folds its file into aggregate.json (mark_process_dead), so counters
+never go backwards and the directory holds one file per live worker plus
+the aggregate; gunicorn.conf.py empties it when the master starts.
+
+Only counters and histograms are offered: they add up across processes.
+Ratios (cache hit ratio, votes per second) are left to PromQL, e.g.
+rate(nacos_votes_total[1m]).
+"""
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: no gunicorn, no dead workers to fold
+    fcntl = None
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_metrics = {}
+_counters = {}    # (name, labels) -> value
+_histograms = {}  # (name, labels) -> [bucket counts..., sum, count]
+_lock = threading.Lock()
+_started = time.time_ns()
+_writer_pid = None
+
+AGGREGATE_FILE = 'aggregate.json'
+LOCK_FILE = '.lock'
+
+
+class Counter:
+    """Monotonic counter, exported as <name>_total"""
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        _metrics[name] = self
+
+    def inc(self, amount=1, **labels):
+        key = (self.name, tuple(str(labels[label]) for label in self.labelnames))
+        with _lock:
+            _counters[key] = _counters.get(key, 0) + amount
+        _ensure_writer()
+
+
+class Histogram:
+    """Distribution of observed values over fixed buckets"""
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        _metrics[name] = self
+
+    def observe(self, value, **labels):
+        key = (self.name, tuple(str(labels[label]) for label in self.labelnames))
+        index = bisect_left(self.buckets, value)
+        with _lock:
+            series = _histograms.get(key)
+            if series is None:
+                series = _histograms[key] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1  # Non-cumulative here; summed up on export
+            series[-2] += value
+            series[-1] += 1
+        _ensure_writer()
+
+
+# Requests (SQLBudgetMiddleware)
+request_duration = Histogram(
+    'nacos_http_request_duration_seconds', "Request latency by URL name", ['view', 'method']
+)
+requests_total = Counter('nacos_http_requests', "Responses by URL name and status class", ['view', 'status'])
+request_queries = Histogram(
+    'nacos_db_queries_per_request', "SQL queries run per request by URL name", ['view'],
+    buckets=(1, 2, 5, 10, 20, 30, 50, 100, 200)
+)
+request_db_duration = Histogram('nacos_db_duration_seconds', "Database time per request by URL name", ['view'])
+
+# Voting
+votes_total = Counter('nacos_votes', "Votes cast")
+ballots_total = Counter('nacos_ballots', "Ballots submitted (one or more votes in one request)")
+
+# Paystack
+paystack_duration = Histogram(
+    'nacos_paystack_request_duration_seconds', "Paystack API latency", ['operation'],
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 10.0)
+)
+paystack_errors = Counter('nacos_paystack_errors', "Failed Paystack calls", ['operation', 'reason'])
+webhook_lag = Histogram(
+    'nacos_paystack_webhook_lag_seconds', "Delay between a charge and its webhook arriving", ['event'],
+    buckets=(1, 5, 15, 30, 60, 300, 900, 3600, 86400)
+)
+
+# Caches
+cache_lookups = Counter('nacos_cache_lookups', "Application cache lookups", ['area', 'result'])
+
+
+def _snapshot():
+    with _lock:
+        return (
+            [[name, list(labels), value] for (name, labels), value in _counters.items()],
+            [[name, list(labels), list(series)] for (name, labels), series in _histograms.items()],
+        )
+
+
+def _write_file(directory, name, counters, histograms):
+    """Write values to directory/name (atomically replaced)"""
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'w') as file:
+        json.dump({'counters': counters, 'histograms': histograms}, file)
+    os.replace(tmp, os.path.join(directory, name))
+
+
+def _read_file(path):
+    """(counters, histograms) stored in a metrics file, or None if unreadable"""
+    try:
+        with open(path) as file:
+            data = json.load(file)
+    except (OSError, ValueError):
+        return None
+    return data['counters'], data['histograms']
+
+
+@contextmanager
+def _directory_lock(directory, exclusive=False):
+    """
+    Readers share the lock; folding a dead worker's file takes it alone, so
+    no scrape sees the file both in the aggregate and on its own
+    """
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, LOCK_FILE), 'a') as file:
+        fcntl.flock(file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        yield
+
+
+def write_snapshot():
+    """Write this process's values to METRICS_DIR"""
+    directory = settings.METRICS_DIR
+    if not directory:
+        return
+    _write_file(directory, f'{os.getpid()}-{_started}.json', *_snapshot())
+
+
+def mark_process_dead(pid, directory):
+    """
+    Fold the files of the exited process `pid` into the aggregate file and
+    delete them. Called by the gunicorn master only (child_exit), so the
+    aggregate has a single writer.
+    """
+    paths = glob.glob(os.path.join(directory, f'{pid}-*.json'))
+    if not paths:
+        return
+    aggregate = os.path.join(directory, AGGREGATE_FILE)
+    with _directory_lock(directory, exclusive=True):
+        snapshots = [snapshot for snapshot in map(_read_file, [aggregate] + paths) if snapshot]
+        counters, histograms = _add_up(snapshots)
+        _write_file(
+            directory, AGGREGATE_FILE,
+            [[name, list(labels), value] for (name, labels), value in counters.items()],
+            [[name, list(labels), series] for (name, labels), series in histograms.items()],
+        )
+        for path in paths:
+            os.remove(path)
+
+
+def _write_loop():
+    while True:
+        time.sleep(settings.METRICS_FLUSH_INTERVAL)
+        try:
+            write_snapshot()
+        except OSError:
+            pass  # Try again next round
+
+
+def _ensure_writer():
+    """Start the snapshot thread in this process (again after a fork)"""
+    global _writer_pid, _started
+    if _writer_pid == os.getpid() or not settings.METRICS_DIR:
+        return
+    with _lock:
+        if _writer_pid == os.getpid():
+            return
+        if _writer_pid is not None:
+            # Forked child: start from zero in a file of its own
+            _counters.clear()
+            _histograms.clear()
+            _started = time.time_ns()
+        _writer_pid = os.getpid()
+    threading.Thread(target=_write_loop, name='metrics-writer', daemon=True).start()
+
+
+def collect():
+    """Values of every process: ({(name, labels): value}, {(name, labels): series})"""
+    snapshots = [_snapshot()]
+    directory = settings.METRICS_DIR
+    if directory:
+        own = os.path.join(directory, f'{os.getpid()}-{_started}.json')
+        with _directory_lock(directory):
+            for path in glob.glob(os.path.join(directory, '*.json')):
+                if path == own:
+                    continue  # Fresher in memory
+                snapshot = _read_file(path)
+                if snapshot:
+                    snapshots.append(snapshot)
+    return _add_up(snapshots)
+
+
+def _add_up(snapshots):
+    """Sum (counters, histograms) snapshots into ({(name, labels): value}, {(name, labels): series})"""
+    counters, histograms = {}, {}
+    for process_counters, process_histograms in snapshots:
+        for name, labels, value in process_counters:
+            key = (name, tuple(labels))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, series in process_histograms:
+            key = (name, tuple(labels))
+            total = histograms.setdefault(key, [0] * len(series))
+            for i, value in enumerate(series):
+                total[i] += value
+    return counters, histograms
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def render():
+    """All metrics in the Prometheus text exposition format"""
+    counters, histograms = collect()
+    lines = []
+    for metric in _metrics.values():
+        family = f'{metric.name}_total' if metric.kind == 'counter' else metric.name
+        lines.append(f'# HELP {family} {metric.documentation}')
+        lines.append(f'# TYPE {family} {metric.kind}')
+        if metric.kind == 'counter':
+            for (name, labels), value in sorted(counters.items()):
+                if name == metric.name:
+                    lines.append(f'{name}_total{_labels(metric.labelnames, labels)} {value}')
+            continue
+        for (name, labels), series in sorted(histograms.items()):
+            if name != metric.name:
+                continue
+            cumulative = 0
+            for bound, count in zip(metric.buckets, series):
+                cumulative += count
+                lines.append(f'{name}_bucket{_labels(metric.labelnames, labels, [("le", bound)])} {cumulative}')
+            lines.append(f'{name}_bucket{_labels(metric.labelnames, labels, [("le", "+Inf")])} {series[-1]}')
+            lines.append(f'{name}_sum{_labels(metric.labelnames, labels)} {series[-2]}')
+            lines.append(f'{name}_count{_labels(metric.labelnames, labels)} {series[-1]}')
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint; needs `Authorization: Bearer <METRICS_TOKEN>`"""
+    token = settings.METRICS_TOKEN
+    if not token and not settings.DEBUG:
+        raise Http404  # Not configured: do not advertise the endpoint
+    if token and not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse('Unauthorized', status=401, content_type='text/plain')
+    return HttpResponse(render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,133 @@
+"""
+Project-wide middleware.
+"""
+import json
+import logging
+import time
+
+from django.conf import settings
+from django.db import connections
+
+from . import metrics
+from .querycount import QueryRecorder
+from .routers import pinned_to_primary, replica_available, serving_request
+
+
+sql_logger = logging.getLogger('Project.sql')
+
+
+STICKY_COOKIE = 'pin_primary'
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+
+class SQLBudgetMiddleware:
+    """
+    Count the queries and database time of every request and record them,
+    with the latency, in the metrics registry under the URL name. Each request logs
+    one JSON line to the 'Project.sql' logger: at WARNING when it goes over
+    SQL_QUERY_BUDGET or runs one query shape SQL_N_PLUS_ONE_THRESHOLD times
+    or more (an N+1 suspect), otherwise at INFO. With SQL_SERVER_TIMING the
+    numbers are also sent in a Server-Timing header for the browser devtools.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        with QueryRecorder() as recorder:
+            response = self.get_response(request)
+        total = time.perf_counter() - start
+
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'  # URL names keep label cardinality bounded
+        metrics.request_duration.observe(total, view=view, method=request.method)
+        metrics.requests_total.inc(view=view, status=f'{response.status_code // 100}xx')
+        metrics.request_queries.observe(recorder.count, view=view)
+        metrics.request_db_duration.observe(recorder.duration, view=view)
+
+        suspects = recorder.repeated(settings.SQL_N_PLUS_ONE_THRESHOLD)
+        over_budget = recorder.count > settings.SQL_QUERY_BUDGET
+        level = logging.WARNING if suspects or over_budget else logging.INFO
+        if sql_logger.isEnabledFor(level):
+            sql_logger.log(level, json.dumps({
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'queries': recorder.count,
+                'db_ms': round(recorder.duration * 1000, 2),
+                'total_ms': round(total * 1000, 2),
+                'over_budget': over_budget,
+                'n_plus_one': [{'count': count, 'sql': shape[:300]} for shape, count in suspects],
+            }))
+
+        if settings.SQL_SERVER_TIMING:
+            response['Server-Timing'] = (
+                f'db;dur={recorder.duration * 1000:.2f};desc="{recorder.count} queries", '
+                f'app;dur={total * 1000:.2f}'
+            )
+        return response
+
+
+class PrimaryStickinessMiddleware:
+    """
+    Read-your-writes with a lagging replica: once a request writes, the rest
+    of it and the client's requests for the next REPLICA_STICKY_SECONDS read
+    from the primary (tracked with a short-lived cookie).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not replica_available():
+            return self.get_response(request)
+
+        wrote = False
+
+        def watch_writes(execute, sql, params, many, context):
+            nonlocal wrote
+            if not wrote and sql.lstrip().upper().startswith(WRITE_STATEMENTS):
+                wrote = True
+                pinned_to_primary.set(True)
+            return execute(sql, params, many, context)
+
+        request_token = serving_request.set(True)
+        token = pinned_to_primary.set(STICKY_COOKIE in request.COOKIES)
+        try:
+            with connections['default'].execute_wrapper(watch_writes):
+                response = self.get_response(request)
+        finally:
+            pinned_to_primary.reset(token)
+            serving_request.reset(request_token)
+
+        if wrote:
+            response.set_cookie(
+                STICKY_COOKIE, '1',
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True,
+                samesite='Lax',
+                secure=request.is_secure()
+            )
+        return response
+
+
+class MediaFilesMiddleware:
+    """
+    Serve public images (MEDIA_PUBLIC_PREFIXES) before sessions, auth and URL
+    resolution run, WhiteNoise-style. With FILE_SERVE_MODE set to a proxy
+    mode the worker only sends headers and the proxy sends the bytes.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefix = settings.MEDIA_URL if settings.MEDIA_URL.startswith('/') else None
+
+    def __call__(self, request):
+        if self.prefix and request.method in ('GET', 'HEAD') and request.path_info.startswith(self.prefix):
+            from App.fileserving import is_public_media, serve_media
+
+            name = request.path_info[len(self.prefix):]
+            if is_public_media(name):
+                return serve_media(request, name)
+        return self.get_response(request)
@@ -0,0 +1,57 @@
+"""
+Per-request SQL accounting.
+
+QueryRecorder wraps every database connection with an execute wrapper that
+counts queries and their time, grouped by shape: the SQL with parameters
+already left out and IN lists collapsed, so the same query run for each row
+of a loop shows up as one shape with a high count (an N+1 suspect).
+Used by SQLBudgetMiddleware and by the query-budget tests.
+"""
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.db import connections
+
+
+IN_LIST_RE = re.compile(r'\bIN \((?:%s, )*%s\)')
+NUMBER_RE = re.compile(r'\b\d+\b')
+
+
+def query_shape(sql):
+    """SQL with literals and IN-list lengths normalised away"""
+    sql = IN_LIST_RE.sub('IN (...)', sql)
+    return NUMBER_RE.sub('?', sql)
+
+
+class QueryRecorder:
+    """Context manager counting the queries run on every connection in this thread"""
+
+    def __init__(self, aliases=None):
+        self.aliases = aliases
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+
+    def _record(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.shapes[query_shape(sql)] += 1
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for alias in self.aliases or connections:
+            self._stack.enter_context(connections[alias].execute_wrapper(self._record))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+    def repeated(self, threshold):
+        """[(shape, count)] for shapes run at least `threshold` times, most frequent first"""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
@@ -0,0 +1,76 @@
+"""
+Read-replica routing.
+
+With a 'replica' database configured (REPLICA_DATABASE_URL), reads of the
+models in REPLICA_READ_MODELS during a request and every read inside a view
+decorated with @reads_from_replica (results, analytics, exports) go to the
+replica. Writes and all other reads stay on the primary, and so does
+everything while the request is pinned to the primary (see
+PrimaryStickinessMiddleware). Management commands and background tasks read
+from the primary unless they ask for the replica with use_replica(): they
+often read right after writing (update_trending_resources,
+extract_resource_text).
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import connections
+
+
+REPLICA = 'replica'
+
+# Set per request by PrimaryStickinessMiddleware / reads_from_replica
+serving_request = ContextVar('serving_request', default=False)
+pinned_to_primary = ContextVar('pinned_to_primary', default=False)
+replica_reads = ContextVar('replica_reads', default=False)
+
+
+def replica_available():
+    """Check for a replica that is a separate database (test runs mirror the primary)"""
+    if REPLICA not in connections.settings:
+        return False
+    replica = connections[REPLICA].settings_dict
+    primary = connections['default'].settings_dict
+    return (replica['NAME'], replica['HOST']) != (primary['NAME'], primary['HOST'])
+
+
+@contextmanager
+def use_replica():
+    """Send every read inside the block to the replica"""
+    token = replica_reads.set(True)
+    try:
+        yield
+    finally:
+        replica_reads.reset(token)
+
+
+def reads_from_replica(view):
+    """View decorator: the view's reads may lag the primary slightly"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        with use_replica():
+            return view(*args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if pinned_to_primary.get() or not replica_available():
+            return 'default'
+        if replica_reads.get():
+            return REPLICA
+        if serving_request.get() and model._meta.label in settings.REPLICA_READ_MODELS:
+            return REPLICA
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both databases hold the same rows
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
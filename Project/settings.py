@@ -37,7 +37,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'Project.middleware.SQLBudgetMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'Project.middleware.MediaFilesMiddleware',
+    'Project.middleware.PrimaryStickinessMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -67,48 +70,67 @@ TEMPLATES = [
 WSGI_APPLICATION = 'Project.wsgi.application'
 
 
-# Database (Render PostgreSQL)
+# Database: DATABASE_URL (Render PostgreSQL) or the local SQLite file when empty.
+# Connections are kept open between requests and health-checked before reuse.
+DB_CONN_MAX_AGE = config('DB_CONN_MAX_AGE', default=600, cast=int)
 
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': dj_database_url.parse(
+        config('DATABASE_URL', default='') or f"sqlite:///{BASE_DIR / 'db.sqlite3'}",
+        conn_max_age=DB_CONN_MAX_AGE,
+        conn_health_checks=True,
+        ssl_require=config('DB_SSL_REQUIRE', default=False, cast=bool),
+    )
+}
+
+# SQLite under concurrent workers: WAL (switched on once by migration
+# App.0017_sqlite_wal) lets readers run alongside the writer, and writers wait
+# up to `timeout` seconds for the lock instead of failing with "database is
+# locked". Transactions stay DEFERRED so reads never wait for the write lock;
+# write blocks use App.writes.serialized_writes, which begins IMMEDIATE so two
+# read-then-write transactions cannot deadlock on the lock upgrade.
+SQLITE_OPTIONS = {
+    'init_command': (
+        'PRAGMA synchronous=NORMAL;'
+        'PRAGMA mmap_size=134217728;'
+        'PRAGMA temp_store=MEMORY;'
+    ),
+    'timeout': config('SQLITE_BUSY_TIMEOUT', default=20, cast=int),
 }
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    DATABASES['default']['OPTIONS'] = SQLITE_OPTIONS
+
+# Optional read replica (Project/routers.py). Locally any second database
+# works, e.g. REPLICA_DATABASE_URL=sqlite:////tmp/replica.sqlite3 kept in sync
+# by copying db.sqlite3.
+REPLICA_DATABASE_URL = config('REPLICA_DATABASE_URL', default='')
+if REPLICA_DATABASE_URL:
+    DATABASES['replica'] = dj_database_url.parse(
+        REPLICA_DATABASE_URL,
+        conn_max_age=DB_CONN_MAX_AGE,
+        conn_health_checks=True,
+        ssl_require=config('DB_SSL_REQUIRE', default=False, cast=bool),
+    )
+    # Tests read the replica through the default connection
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+    DATABASE_ROUTERS = ['Project.routers.ReplicaRouter']
 
+# Models whose reads go to the replica during requests (e-learning catalogue);
+# views decorated with Project.routers.reads_from_replica send all their reads
+# there. Management commands and background tasks stay on the primary.
+REPLICA_READ_MODELS = [
+    'App.Course',
+    'App.ClassSchedule',
+    'App.ResourceCategory',
+    'App.Resource',
+    'App.ResourceText',
+    'App.ResourceDownloadDaily',
+]
 
+# After a write, a client reads from the primary for this many seconds so it
+# sees its own changes despite replication lag
+REPLICA_STICKY_SECONDS = config('REPLICA_STICKY_SECONDS', default=5, cast=int)
 
-# DATABASES = {
-#     'default': {
-#         'ENGINE': 'django.db.backends.postgresql',
-#         'NAME': 'mynewdb',  # Name of your new database
-#         'USER': 'nacos',  # Your PostgreSQL username
-#         'PASSWORD': 'School',  # Your PostgreSQL user password
-#         'HOST': 'localhost',  # Usually 'localhost' or an IP address
-#         'PORT': '5432',  # Default PostgreSQL port
-#     }
-# }
-# if os.getenv('RENDER'):
-#     # Running on Render
-#     DATABASES = {
-#         'default': dj_database_url.config(
-#             default=os.getenv('DATABASE_URL'),
-#             conn_max_age=600,
-#             ssl_require=True
-#         )
-#     }
-# else:
-#     # Running locally
-#     DATABASES = {
-#         'default': {
-#             'ENGINE': 'django.db.backends.postgresql',
-#             'NAME': 'mydb',
-#             'USER': 'postgres',
-#             'PASSWORD': 'Datapwa@1',
-#             'HOST': 'localhost',
-#             'PORT': '5432',
-#         }
-#     }
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -132,6 +154,118 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Candidate and profile images served by MediaFilesMiddleware (App/fileserving.py).
+# Content-hashed names are cached for a year; older unhashed ones for MEDIA_MAX_AGE
+# seconds. A proxy may serve these prefixes straight from MEDIA_ROOT instead.
+MEDIA_PUBLIC_PREFIXES = ('candidates/', 'profile_pictures/')
+MEDIA_MAX_AGE = config('MEDIA_MAX_AGE', default=3600, cast=int)
+
+# How file downloads leave the server (see App/fileserving.py):
+#   'django'     - streamed by the gunicorn worker
+#   'x-accel'    - nginx; needs an internal location mapping the prefix to MEDIA_ROOT:
+#                      location /protected-media/ { internal; alias /path/to/media/; }
+#   'x-sendfile' - Apache mod_xsendfile / lighttpd
+FILE_SERVE_MODE = config('FILE_SERVE_MODE', default='django')
+FILE_ACCEL_REDIRECT_PREFIX = config('FILE_ACCEL_REDIRECT_PREFIX', default='/protected-media/')
+
+# Uploads are SHA-256 hashed while they stream in (content-addressed resources)
+FILE_UPLOAD_HANDLERS = [
+    'App.storage.HashingMemoryFileUploadHandler',
+    'App.storage.HashingTemporaryFileUploadHandler',
+]
+
+# Resumable admin uploads: partial files live outside MEDIA_ROOT until complete
+CHUNKED_UPLOAD_DIR = config('CHUNKED_UPLOAD_DIR', default=os.path.join(BASE_DIR, 'chunked_uploads'))
+CHUNKED_UPLOAD_CHUNK_SIZE = 2 * 1024 * 1024
+
+# Cache shared by every gunicorn worker, so signal invalidation reaches all of
+# them (LocMemCache is per process). Set REDIS_URL to use Redis (needs the
+# `redis` package); otherwise a file-based cache on local disk is used.
+# Run several workers on Redis: the file cache's add() and incr() are not
+# atomic across processes, which the live attendance counter relies on.
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        },
+        'sessions': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'sessions',
+        },
+    }
+else:
+    CACHE_DIR = config('CACHE_DIR', default=os.path.join(BASE_DIR, 'cache'))
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.path.join(CACHE_DIR, 'default'),
+            'OPTIONS': {'MAX_ENTRIES': 5000},
+        },
+    }
+
+# With Redis, sessions are read from their own cache alias (so culling page
+# caches never logs anybody out) and only written through to django_session,
+# so authenticated requests stop queuing behind vote inserts. Switching from
+# the database engine keeps live sessions (cache misses fall back to the
+# table); `manage.py warm_session_cache` preloads them. Without Redis they
+# stay in the database: FileBasedCache lists its whole directory on every
+# write to decide whether to cull, which costs more than the table lookup.
+SESSION_ENGINE = config(
+    'SESSION_ENGINE',
+    default='django.contrib.sessions.backends.cached_db' if REDIS_URL else 'django.contrib.sessions.backends.db'
+)
+SESSION_CACHE_ALIAS = 'sessions' if REDIS_URL else 'default'
+
+# Flash messages travel in a cookie instead of modifying the session
+MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
+
+# In-process write buffers (App/buffers.py): seconds between background
+# flushes, and a switch to write straight through (tests, debugging)
+WRITE_BUFFER_FLUSH_INTERVAL = config('WRITE_BUFFER_FLUSH_INTERVAL', default=2.0, cast=float)
+WRITE_BUFFER_EAGER = config('WRITE_BUFFER_EAGER', default=False, cast=bool)
+
+# Per-process thread pool for off-request work (App/tasks.py)
+BACKGROUND_TASK_WORKERS = config('BACKGROUND_TASK_WORKERS', default=2, cast=int)
+BACKGROUND_TASKS_EAGER = config('BACKGROUND_TASKS_EAGER', default=False, cast=bool)
+
+# Document archive for audit events and gateway payloads (App/mangodb.py);
+# empty disables it, 'memory://' keeps documents in process (tests)
+MONGODB_URI = config('MONGODB_URI', default='')
+MONGODB_DATABASE = config('MONGODB_DATABASE', default='nacos_archive')
+MONGODB_MAX_POOL_SIZE = config('MONGODB_MAX_POOL_SIZE', default=10, cast=int)
+
+# Per-request SQL accounting (Project/middleware.py SQLBudgetMiddleware). Requests
+# over the budget or repeating one query shape THRESHOLD+ times log a WARNING;
+# set SQL_LOG_LEVEL=INFO to log a line for every request.
+SQL_QUERY_BUDGET = config('SQL_QUERY_BUDGET', default=30, cast=int)
+SQL_N_PLUS_ONE_THRESHOLD = config('SQL_N_PLUS_ONE_THRESHOLD', default=5, cast=int)
+SQL_SERVER_TIMING = config('SQL_SERVER_TIMING', default=DEBUG, cast=bool)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'Project.sql': {
+            'handlers': ['console'],
+            'level': config('SQL_LOG_LEVEL', default='WARNING'),
+            'propagate': False,
+        },
+    },
+}
+
+# Prometheus metrics at /metrics (Project/metrics.py). Scrapers send
+# `Authorization: Bearer <METRICS_TOKEN>`; without a token the endpoint only
+# exists with DEBUG. Under gunicorn set METRICS_DIR so all workers are counted.
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+METRICS_DIR = config('METRICS_DIR', default='')
+METRICS_FLUSH_INTERVAL = config('METRICS_FLUSH_INTERVAL', default=5.0, cast=float)
+
 # Redirects after login/logout
 LOGIN_REDIRECT_URL = 'dashboard'
 LOGOUT_REDIRECT_URL = 'login'
@@ -141,6 +275,14 @@ LOGIN_URL = 'login'
 PAYSTACK_PUBLIC_KEY = config('PAYSTACK_PUBLIC_KEY', default='pk_test_888eecafe1090351dc7aff53dfb8b45af27cb691')
 PAYSTACK_SECRET_KEY = config('PAYSTACK_SECRET_KEY', default='sk_test_7aa554fca3703d55303f05a4a33fbe2c01528a15')
 
+# Seconds a pending payment's authorization URL is handed back to repeated
+# initialize requests instead of creating a new transaction
+PAYMENT_INITIALIZATION_TTL = config('PAYMENT_INITIALIZATION_TTL', default=30 * 60, cast=int)
+
+# Seconds after which an unverified pending payment is swept to 'abandoned'
+# by `manage.py abandon_stale_payments`
+PAYMENT_ABANDON_AFTER = config('PAYMENT_ABANDON_AFTER', default=24 * 60 * 60, cast=int)
+
 # Security for production
 if not DEBUG:
     SECURE_SSL_REDIRECT = True
@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from django.db.models import Count
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
 from .models import Election, Position, Candidate, Vote, VoterProfile, VotingSession
 
 
@@ -42,9 +43,11 @@ class ElectionAdmin(admin.ModelAdmin):
         )
     status_badge.short_description = 'Status'
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(vote_total=Count('positions__candidates__votes'))
+    
     def total_votes(self, obj):
-        count = Vote.objects.filter(candidate__position__election=obj).count()
-        return format_html('<strong>{}</strong>', count)
+        return format_html('<strong>{}</strong>', obj.vote_total)
     total_votes.short_description = 'Total Votes'
     
     actions = ['activate_election', 'close_election', 'publish_results']
@@ -75,18 +78,22 @@ class PositionAdmin(admin.ModelAdmin):
     search_fields = ['name', 'election__title']
     inlines = [CandidateInline]
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('election').annotate(
+            active_candidate_count=Count('candidates', filter=Q(candidates__is_active=True), distinct=True),
+            vote_total=Count('candidates__votes', distinct=True)
+        )
+    
     def get_position_name(self, obj):
         return obj.get_name_display()
     get_position_name.short_description = 'Position'
     
     def candidate_count(self, obj):
-        count = obj.candidates.filter(is_active=True).count()
-        return format_html('<strong>{}</strong>', count)
+        return format_html('<strong>{}</strong>', obj.active_candidate_count)
     candidate_count.short_description = 'Candidates'
     
     def vote_count(self, obj):
-        count = obj.get_total_votes()
-        return format_html('<strong>{}</strong>', count)
+        return format_html('<strong>{}</strong>', obj.vote_total)
     vote_count.short_description = 'Votes'
 
 
@@ -117,17 +124,25 @@ class CandidateAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_queryset(self, request):
+        position_votes = Vote.objects.filter(
+            candidate__position=OuterRef('position')
+        ).order_by().values('candidate__position').annotate(total=Count('id')).values('total')
+        return super().get_queryset(request).select_related('position__election').annotate(
+            vote_count=Count('votes'),
+            position_votes=Coalesce(Subquery(position_votes), 0)
+        )
+    
     def get_position(self, obj):
         return f"{obj.position.get_name_display()} - {obj.position.election.title}"
     get_position.short_description = 'Position'
     
     def vote_count(self, obj):
-        count = obj.get_vote_count()
-        percentage = obj.get_vote_percentage()
+        percentage = obj.vote_count / obj.position_votes * 100 if obj.position_votes else 0
         return format_html(
-            '<strong>{}</strong> votes (<span style="color: green;">{:.1f}%</span>)',
-            count,
-            percentage
+            '<strong>{}</strong> votes (<span style="color: green;">{}%</span>)',
+            obj.vote_count,
+            f'{percentage:.1f}'
         )
     vote_count.short_description = 'Votes'
     
@@ -153,8 +168,13 @@ class VoterProfileAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('user').annotate(
+            elections_voted=Count('user__votes__candidate__position__election', distinct=True)
+        )
+    
     def vote_status(self, obj):
-        voted_count = Vote.objects.filter(voter=obj.user).values('candidate__position__election').distinct().count()
+        voted_count = obj.elections_voted
         if voted_count > 0:
             return format_html('<span style="color: green;">✓ Voted in {} election(s)</span>', voted_count)
         return format_html('<span style="color: gray;">Not voted</span>')
@@ -178,6 +198,7 @@ class VoteAdmin(admin.ModelAdmin):
     search_fields = ['voter__username', 'candidate__name']
     readonly_fields = ['voter', 'candidate', 'timestamp', 'ip_address']
     date_hierarchy = 'timestamp'
+    list_select_related = ['voter', 'candidate__position__election']
     
     def get_position(self, obj):
         return obj.candidate.position.get_name_display()
@@ -203,12 +224,17 @@ class VotingSessionAdmin(admin.ModelAdmin):
     readonly_fields = ['voter', 'election', 'started_at', 'completed_at', 'ip_address']
     date_hierarchy = 'started_at'
     
+    def get_queryset(self, request):
+        votes = Vote.objects.filter(
+            voter=OuterRef('voter'),
+            candidate__position__election=OuterRef('election')
+        ).order_by().values('voter').annotate(total=Count('id')).values('total')
+        return super().get_queryset(request).select_related('voter', 'election').annotate(
+            votes_total=Coalesce(Subquery(votes), 0)
+        )
+    
     def votes_cast(self, obj):
-        count = Vote.objects.filter(
-            voter=obj.voter,
-            candidate__position__election=obj.election
-        ).count()
-        return format_html('<strong>{}</strong>', count)
+        return format_html('<strong>{}</strong>', obj.votes_total)
     votes_cast.short_description = 'Votes Cast'
     
     def has_add_permission(self, request):
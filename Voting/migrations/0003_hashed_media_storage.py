@@ -0,0 +1,25 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:37
+
+import App.storage
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Voting', '0002_candidate_achievements_candidate_bio_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='candidate',
+            name='campaign_poster',
+            field=models.ImageField(blank=True, help_text='Campaign poster/banner', null=True, storage=App.storage.get_media_storage, upload_to='candidates/posters/', validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png'])]),
+        ),
+        migrations.AlterField(
+            model_name='candidate',
+            name='profile_image',
+            field=models.ImageField(blank=True, help_text='Profile photo', null=True, storage=App.storage.get_media_storage, upload_to='candidates/profiles/', validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png'])]),
+        ),
+    ]
@@ -1,10 +1,13 @@
 from django.db import models
+from django.db.models import Count, Prefetch
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 import re
+from App.mixins import DirtyFieldsMixin
+from App.storage import get_media_storage
 
-class Election(models.Model):
+class Election(DirtyFieldsMixin, models.Model):
     """Represents an election period"""
     STATUS_CHOICES = [
         ('upcoming', 'Upcoming'),
@@ -46,7 +49,19 @@ class Election(models.Model):
             self.status = 'active'
         else:
             self.status = 'closed'
-        self.save()
+        self.save()  # No-op unless the status actually moved
+    
+    def ballot(self, with_votes=False):
+        """Positions with their active candidates (and vote counts) in two queries"""
+        candidates = Candidate.objects.filter(is_active=True)
+        positions = self.positions.all()
+        if with_votes:
+            candidates = candidates.annotate(vote_count=Count('votes'))
+            # Totals count every vote, including those for deactivated candidates
+            positions = positions.annotate(total_votes=Count('candidates__votes'))
+        return positions.prefetch_related(
+            Prefetch('candidates', queryset=candidates, to_attr='active_candidates')
+        )
 
 
 class Position(models.Model):
@@ -78,11 +93,15 @@ class Position(models.Model):
         return f"{self.get_name_display()} - {self.election.title}"
     
     def get_candidates(self):
-        """Get all candidates for this position"""
+        """Get all candidates for this position (prefetched by Election.ballot())"""
+        if hasattr(self, 'active_candidates'):
+            return self.active_candidates
         return self.candidates.filter(is_active=True)
     
     def get_total_votes(self):
         """Get total votes cast for this position"""
+        if hasattr(self, 'total_votes'):
+            return self.total_votes  # Annotated by Election.ballot(with_votes=True)
         return Vote.objects.filter(candidate__position=self).count()
 
 
@@ -100,6 +119,7 @@ class Candidate(models.Model):
     manifesto = models.TextField(help_text="Candidate's manifesto/objectives")
     bio = models.TextField(blank=True, help_text="Short biography (optional)")
     profile_image = models.ImageField(
+        storage=get_media_storage,
         upload_to='candidates/profiles/',
         blank=True,
         null=True,
@@ -107,6 +127,7 @@ class Candidate(models.Model):
         help_text="Profile photo"
     )
     campaign_poster = models.ImageField(
+        storage=get_media_storage,
         upload_to='candidates/posters/',
         blank=True,
         null=True,
@@ -139,6 +160,8 @@ class Candidate(models.Model):
     
     def get_vote_count(self):
         """Get total votes for this candidate"""
+        if hasattr(self, 'vote_count'):
+            return self.vote_count  # Annotated by Election.ballot(with_votes=True)
         return self.votes.count()
     
     def get_vote_percentage(self):
@@ -244,7 +267,7 @@ class Vote(models.Model):
         super().save(*args, **kwargs)
 
 
-class VotingSession(models.Model):
+class VotingSession(DirtyFieldsMixin, models.Model):
     """Track voting sessions for audit trail"""
     voter = models.ForeignKey(User, on_delete=models.CASCADE, related_name='voting_sessions')
     election = models.ForeignKey(Election, on_delete=models.CASCADE)
@@ -1,3 +1,50 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Candidate, Election, Position, Vote
+
+
+LOCAL_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'voting'},
+}
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class ElectionResultsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.election = Election.objects.create(
+            title='SUG', description='Elections', status='closed',
+            start_date=now - timedelta(days=2), end_date=now - timedelta(days=1), results_published=True
+        )
+        position = Position.objects.create(election=cls.election, name='president')
+        cls.candidates = [
+            Candidate.objects.create(position=position, name=name, registration_number=name, manifesto='-')
+            for name in ('ada', 'bola', 'chidi')
+        ]
+        for number, candidate in enumerate([0, 0, 1, 2, 2]):
+            voter = User.objects.create_user(f'voter{number}')
+            Vote.objects.create(voter=voter, candidate=cls.candidates[candidate])
+        # Withdrawn after the vote: hidden from the results, but its votes still count in the total
+        Candidate.objects.filter(pk=cls.candidates[2].pk).update(is_active=False)
+        cls.user = User.objects.create_user('student')
+
+    def test_totals_include_deactivated_candidates(self):
+        self.client.force_login(self.user)
+        with self.assertNumQueries(6):
+            response = self.client.get(reverse('results', args=[self.election.pk]))
+        [result] = response.context['results_data']
+
+        self.assertEqual(result['total_votes'], 5)
+        self.assertEqual(
+            [(row['candidate'].name, row['votes'], row['percentage']) for row in result['candidates']],
+            [('ada', 2, 40.0), ('bola', 1, 20.0)]
+        )
+        for row in result['candidates']:
+            candidate = Candidate.objects.get(pk=row['candidate'].pk)
+            self.assertEqual(row['percentage'], candidate.get_vote_percentage())
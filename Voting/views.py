@@ -8,21 +8,24 @@ from django.views.decorators.csrf import csrf_exempt
 from django.http import JsonResponse, HttpResponse
 from django.conf import settings
 from django.contrib import messages
-from django.db import transaction
 from django.utils import timezone
 from django.core.exceptions import ValidationError
+from django.db import transaction
 from payments.models import Payment
+from App import audit
+from App.audit import get_client_ip
+from App.writes import serialized_writes
+from Project import metrics
+from Project.routers import reads_from_replica
 from .models import Election, Position, Candidate, Vote, VoterProfile, VotingSession
 
 
-def get_client_ip(request):
-    """Get client IP address"""
-    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-    if x_forwarded_for:
-        ip = x_forwarded_for.split(',')[0]
-    else:
-        ip = request.META.get('REMOTE_ADDR')
-    return ip
+def count_ballot(votes):
+    """Count a submitted ballot in the metrics once it is committed"""
+    def record():
+        metrics.ballots_total.inc()
+        metrics.votes_total.inc(votes)
+    transaction.on_commit(record)
 
 
 @login_required
@@ -64,7 +67,7 @@ def voter_registration(request):
     try:
         voter_profile = request.user.voter_profile
         messages.info(request, 'You are already registered!')
-        return redirect('election_List')
+        return redirect('election_list')
     except VoterProfile.DoesNotExist:
         pass
     
@@ -92,7 +95,7 @@ def voter_registration(request):
                 request,
                 'Registration submitted! An admin will verify your details shortly.'
             )
-            return redirect('election_List')
+            return redirect('election_list')
             
         except ValidationError as e:
             messages.error(request, str(e))
@@ -129,13 +132,13 @@ def election_detail(request, election_id):
             request,
             'Your registration is pending admin verification. Please wait for approval.'
         )
-        return redirect('election_List')
+        return redirect('election_list')
     
     # Check if already voted
     has_voted = voter_profile.has_voted_in_election(election)
     
     # Get positions and candidates
-    positions = election.positions.prefetch_related('candidates').all()
+    positions = election.ballot()
     
     # Get user's votes if they've voted
     user_votes = {}
@@ -195,7 +198,7 @@ def cast_vote(request, election_id):
         return JsonResponse({'error': 'Please select at least one candidate'}, status=400)
     
     try:
-        with transaction.atomic():
+        with serialized_writes():
             # Create voting session
             session = VotingSession.objects.create(
                 voter=request.user,
@@ -222,6 +225,9 @@ def cast_vote(request, election_id):
             
             # Mark session as completed
             session.mark_completed()
+            # Who voted and when, never for whom
+            audit.log_event('vote', request.user, request, election_id=election.id, votes=len(votes_cast))
+            count_ballot(len(votes_cast))
             
             return JsonResponse({
                 'success': True,
@@ -236,6 +242,7 @@ def cast_vote(request, election_id):
 
 
 @login_required
+@reads_from_replica
 def election_results(request, election_id):
     """Display election results"""
     election = get_object_or_404(Election, id=election_id)
@@ -245,10 +252,10 @@ def election_results(request, election_id):
     
     if not can_view:
         messages.warning(request, 'Results are not yet available for this election.')
-        return redirect('election_detail', election_id=election_id)
+        return redirect('election_details', election_id=election_id)
     
     # Get all positions with candidates and vote counts
-    positions = election.positions.prefetch_related('candidates').all()
+    positions = election.ballot(with_votes=True)
     
     results_data = []
     total_voters = VotingSession.objects.filter(
@@ -261,8 +268,8 @@ def election_results(request, election_id):
         total_votes = position.get_total_votes()
         
         for candidate in position.get_candidates():
-            vote_count = candidate.get_vote_count()
-            percentage = candidate.get_vote_percentage()
+            vote_count = candidate.vote_count
+            percentage = round(vote_count / total_votes * 100, 2) if total_votes else 0
             
             candidates_data.append({
                 'candidate': candidate,
@@ -364,7 +371,7 @@ def meet_candidates(request, election_id):
     position_filter = request.GET.get('position', '')
     
     # Get all positions for this election
-    positions = election.positions.prefetch_related('candidates').all()
+    positions = election.ballot()
     
     # Organize candidates by position
     candidates_by_position = []
@@ -372,7 +379,7 @@ def meet_candidates(request, election_id):
         if position_filter and str(position.id) != position_filter:
             continue
             
-        candidates = position.get_candidates().order_by('name')
+        candidates = position.get_candidates()  # Ordered by name (Candidate.Meta)
         if candidates:
             candidates_by_position.append({
                 'position': position,
@@ -463,7 +470,7 @@ def vote_for_candidate(request, candidate_id):
     
     # Cast vote
     try:
-        with transaction.atomic():
+        with serialized_writes():
             # Get or create voting session
             session, created = VotingSession.objects.get_or_create(
                 voter=request.user,
@@ -477,6 +484,8 @@ def vote_for_candidate(request, candidate_id):
                 candidate=candidate,
                 ip_address=get_client_ip(request)
             )
+            audit.log_event('vote', request.user, request, election_id=candidate.position.election_id, votes=1)
+            count_ballot(1)
             
             messages.success(
                 request,
@@ -484,7 +493,7 @@ def vote_for_candidate(request, candidate_id):
             )
             
             # Redirect to election detail to continue voting
-            return redirect('election_detail', election_id=election.id)
+            return redirect('election_details', election_id=election.id)
             
     except Exception as e:
         messages.error(request, f'Vote failed: {str(e)}')
@@ -2,4 +2,29 @@ import os
 
 bind = f"0.0.0.0:{os.environ.get('PORT', '10000')}"
 workers = 2
-timeout = 120
\ No newline at end of file
+timeout = 120
+
+
+def on_starting(server):
+    """Start metrics from zero: drop the files of the previous run's workers"""
+    directory = os.environ.get('METRICS_DIR')
+    if directory and os.path.isdir(directory):
+        for name in os.listdir(directory):
+            if name.endswith(('.json', '.tmp')):
+                os.remove(os.path.join(directory, name))
+
+
+def worker_exit(server, worker):
+    """Write out buffered attendance/audit rows and metrics before the worker goes away"""
+    from App.buffers import flush_all
+    from Project.metrics import write_snapshot
+    flush_all()
+    write_snapshot()
+
+
+def child_exit(server, worker):
+    """Fold the dead worker's metrics into the aggregate file (runs in the master)"""
+    directory = os.environ.get('METRICS_DIR')
+    if directory and os.path.isdir(directory):
+        from Project.metrics import mark_process_dead
+        mark_process_dead(worker.pid, directory)
@@ -31,7 +31,8 @@ class PaymentAdmin(admin.ModelAdmin):
     list_display = ['reference', 'user', 'payment_type', 'amount', 'status_badge', 'created_at']
     list_filter = ['status', 'created_at', 'payment_type']
     search_fields = ['reference', 'user__username', 'user__email', 'email']
-    readonly_fields = ['reference', 'created_at', 'updated_at', 'gateway_response']
+    readonly_fields = ['reference', 'created_at', 'updated_at', 'gateway_response', 'idempotency_key', 'authorization_url', 'access_code']
+    list_select_related = ['user', 'payment_type']
     inlines = [PaymentHistoryInline]
     
     fieldsets = (
@@ -42,7 +43,7 @@ class PaymentAdmin(admin.ModelAdmin):
             'fields': ('payment_type', 'amount', 'reference', 'status')
         }),
         ('Gateway Response', {
-            'fields': ('gateway_response', 'transaction_date'),
+            'fields': ('gateway_response', 'transaction_date', 'idempotency_key', 'authorization_url', 'access_code'),
             'classes': ('collapse',)
         }),
         ('Timestamps', {
@@ -77,6 +78,7 @@ class PaymentHistoryAdmin(admin.ModelAdmin):
     list_filter = ['status', 'created_at']
     search_fields = ['payment__reference', 'note']
     readonly_fields = ['payment', 'status', 'note', 'created_at']
+    list_select_related = ['payment__user']  # Payment.__str__ shows the username
     
     def has_add_permission(self, request):
         return False
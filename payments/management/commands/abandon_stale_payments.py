@@ -0,0 +1,85 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from App.writes import serialized_writes
+from payments.models import Payment, PaymentHistory
+
+
+class Command(BaseCommand):
+    help = "Mark pending payments that were never verified as abandoned"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than', type=int, default=settings.PAYMENT_ABANDON_AFTER,
+            help="Age in seconds after which a pending payment is abandoned"
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=200,
+            help="Payments updated per transaction"
+        )
+        parser.add_argument(
+            '--max-payments', type=int, default=5000,
+            help="Upper bound on payments abandoned in one run"
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Only report how many payments would be abandoned"
+        )
+
+    def handle(self, *args, **options):
+        # Never abandon a payment that initialize_payment may still hand back
+        age = max(options['older_than'], settings.PAYMENT_INITIALIZATION_TTL)
+        cutoff = timezone.now() - timedelta(seconds=age)
+        stale = Payment.objects.filter(status='pending', created_at__lt=cutoff)
+
+        if options['dry_run']:
+            count = min(stale.count(), options['max_payments'])
+            self.stdout.write(f"{count} pending payment(s) would be abandoned")
+            return
+
+        total = 0
+        while total < options['max_payments']:
+            limit = min(options['chunk_size'], options['max_payments'] - total)
+            abandoned = self.abandon_chunk(stale, limit)
+            if abandoned is None:
+                break
+            total += abandoned
+
+        self.stdout.write(self.style.SUCCESS(f"Abandoned {total} stale pending payment(s)"))
+
+    def abandon_chunk(self, stale, limit):
+        """Abandon up to `limit` payments in one short transaction; None when none are left"""
+        with serialized_writes():
+            ids = list(
+                stale.select_for_update(skip_locked=True)
+                .order_by('pk')
+                .values_list('pk', flat=True)[:limit]
+            )
+            if not ids:
+                return None
+
+            # Re-check the status: select_for_update is a no-op on SQLite, so a
+            # webhook or verify may have settled some of them since the SELECT
+            now = timezone.now()
+            changed = Payment.objects.filter(pk__in=ids, status='pending').update(
+                status='abandoned',
+                updated_at=now
+            )
+            if not changed:
+                return 0
+            # Our UPDATE holds the rows (or the SQLite write lock) until commit
+            abandoned_ids = Payment.objects.filter(
+                pk__in=ids, status='abandoned', updated_at=now
+            ).values_list('pk', flat=True)
+            PaymentHistory.objects.bulk_create([
+                PaymentHistory(
+                    payment_id=payment_id,
+                    status='abandoned',
+                    note='Pending payment was never verified'
+                )
+                for payment_id in abandoned_ids
+            ])
+        return changed
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:13
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0002_payment_access_code_payment_authorization_url_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['status', 'created_at'], name='payments_pa_status_343680_idx'),
+        ),
+    ]
@@ -1,7 +1,11 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.conf import settings
 from django.utils import timezone
+from datetime import timedelta
 import uuid
+from App import audit, mangodb
+from App.mixins import DirtyFieldsMixin
 
 class PaymentType(models.Model):
     """Different types of payments (dues, events, etc.)"""
@@ -18,7 +22,7 @@ class PaymentType(models.Model):
         ordering = ['-created_at']
 
 
-class Payment(models.Model):
+class Payment(DirtyFieldsMixin, models.Model):
     """Track all payment transactions"""
     STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -39,6 +43,11 @@ class Payment(models.Model):
     gateway_response = models.JSONField(null=True, blank=True)
     transaction_date = models.DateTimeField(null=True, blank=True)
     
+    # Cached initialization (reused for repeated clicks on pay)
+    idempotency_key = models.CharField(max_length=64, blank=True, help_text="Client-supplied key for repeated initialization attempts")
+    authorization_url = models.URLField(max_length=500, blank=True)
+    access_code = models.CharField(max_length=100, blank=True)
+    
     # Metadata
     email = models.EmailField()
     phone = models.CharField(max_length=20, blank=True)
@@ -53,22 +62,58 @@ class Payment(models.Model):
         indexes = [
             models.Index(fields=['reference']),
             models.Index(fields=['status']),
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['user', 'payment_type', 'status']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'idempotency_key'],
+                condition=~models.Q(idempotency_key=''),
+                name='unique_payment_idempotency_key',
+            ),
         ]
     
+    def is_reusable_for(self, payment_type, email):
+        """Check if this pending payment can be handed back instead of initializing a new one"""
+        ttl = timedelta(seconds=settings.PAYMENT_INITIALIZATION_TTL)
+        return (
+            self.status == 'pending' and
+            bool(self.authorization_url) and
+            self.payment_type_id == payment_type.id and
+            self.amount == payment_type.amount and
+            self.email == email and
+            self.created_at >= timezone.now() - ttl
+        )
+    
     def mark_as_success(self, gateway_data=None):
         """Mark payment as successful"""
         self.status = 'success'
         self.transaction_date = timezone.now()
         if gateway_data:
             self.gateway_response = gateway_data
+            archive_gateway_payload(self, gateway_data)
         self.save()
+        audit.log_event('payment', self.user_id, reference=str(self.reference), status=self.status, amount=str(self.amount))
     
     def mark_as_failed(self, gateway_data=None):
         """Mark payment as failed"""
         self.status = 'failed'
         if gateway_data:
             self.gateway_response = gateway_data
+            archive_gateway_payload(self, gateway_data)
         self.save()
+        audit.log_event('payment', self.user_id, reference=str(self.reference), status=self.status, amount=str(self.amount))
+
+
+def archive_gateway_payload(payment, payload):
+    """Keep the raw gateway response in the document archive"""
+    mangodb.archive('gateway_payloads', [{
+        'reference': str(payment.reference),
+        'user_id': payment.user_id,
+        'status': payment.status,
+        'payload': payload,
+        'received_at': timezone.now(),
+    }])
 
 
 class PaymentHistory(models.Model):
@@ -1,3 +1,136 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import requests
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from Project import metrics
+from .management.commands.abandon_stale_payments import Command as AbandonStalePayments
+from .models import Payment, PaymentHistory, PaymentType
+from .views import find_reusable_payment, observe_webhook_lag, paystack_request
+
+
+LOCAL_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'payments'},
+}
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class PaymentTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('payer', email='payer@example.com')
+        cls.dues = PaymentType.objects.create(name='Dues', description='-', amount=2000)
+
+    def make_payment(self, status='pending', **fields):
+        return Payment.objects.create(
+            user=self.user, payment_type=self.dues, amount=2000, email=self.user.email, status=status, **fields
+        )
+
+    def test_reuse_by_idempotency_key(self):
+        payment = self.make_payment(idempotency_key='k1', authorization_url='https://paystack.test/1')
+        self.assertEqual(find_reusable_payment(self.user, self.dues, self.user.email, 'k1'), payment)
+        self.assertIsNone(find_reusable_payment(self.user, self.dues, self.user.email, 'k2'))
+
+        # Another email: not reusable, and the key is released for a new payment
+        self.assertIsNone(find_reusable_payment(self.user, self.dues, 'other@example.com', 'k1'))
+        payment.refresh_from_db()
+        self.assertEqual(payment.idempotency_key, '')
+
+    def test_reuse_of_a_recent_initialization(self):
+        self.make_payment()  # Never got an authorization URL
+        self.assertIsNone(find_reusable_payment(self.user, self.dues, self.user.email))
+
+        payment = self.make_payment(authorization_url='https://paystack.test/1')
+        self.assertEqual(find_reusable_payment(self.user, self.dues, self.user.email), payment)
+        with self.settings(PAYMENT_INITIALIZATION_TTL=0):
+            self.assertIsNone(find_reusable_payment(self.user, self.dues, self.user.email))
+
+    def test_idempotency_key_is_unique_only_when_set(self):
+        self.make_payment()
+        self.make_payment()  # Blank keys do not collide
+        self.make_payment(idempotency_key='k1')
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self.make_payment(idempotency_key='k1')
+
+    def initialize(self, key):
+        self.client.force_login(self.user)
+        # As if the competing request had not committed when this one looked
+        with mock.patch('payments.views.find_reusable_payment', return_value=None):
+            return self.client.post(
+                reverse('initialize_payment'), {'payment_type': self.dues.pk, 'idempotency_key': key}
+            )
+
+    def test_concurrent_initialization_with_the_same_key(self):
+        self.make_payment(idempotency_key='k1')  # Still waiting for Paystack
+        response = self.initialize('k1')
+        self.assertEqual(response.status_code, 409)
+
+        Payment.objects.filter(idempotency_key='k1').update(authorization_url='https://paystack.test/1')
+        response = self.initialize('k1')
+        self.assertEqual(response.json()['authorization_url'], 'https://paystack.test/1')
+        self.assertEqual(Payment.objects.count(), 1)
+
+    def test_abandon_rechecks_the_status(self):
+        pending = self.make_payment()
+        settled = self.make_payment(status='success')
+        # As if `settled` had still been pending when the chunk was selected
+        self.assertEqual(AbandonStalePayments().abandon_chunk(Payment.objects.all(), 10), 1)
+
+        pending.refresh_from_db()
+        settled.refresh_from_db()
+        self.assertEqual((pending.status, settled.status), ('abandoned', 'success'))
+        self.assertQuerySetEqual(
+            PaymentHistory.objects.values_list('payment_id', flat=True), [pending.pk]
+        )
+        self.assertIsNone(AbandonStalePayments().abandon_chunk(Payment.objects.none(), 10))
+
+
+@override_settings(METRICS_DIR='')
+class PaystackMetricsTests(TestCase):
+    """Paystack latency, failures and webhook lag (Project/metrics.py)"""
+
+    def counter(self, metric, **labels):
+        return metrics._counters.get((metric.name, tuple(labels.values())), 0)
+
+    def histogram(self, metric, **labels):
+        """(bucket counts, sum, count) observed so far"""
+        series = metrics._histograms.get((metric.name, tuple(labels.values())))
+        return (series[:-2], series[-2], series[-1]) if series else ([0] * len(metric.buckets), 0, 0)
+
+    def test_calls_are_timed(self):
+        _, _, count = self.histogram(metrics.paystack_duration, operation='verify')
+        response = paystack_request('verify', lambda url, **kwargs: (url, kwargs), 'https://paystack.test', timeout=5)
+        self.assertEqual(response, ('https://paystack.test', {'timeout': 5}))
+        self.assertEqual(self.histogram(metrics.paystack_duration, operation='verify')[2], count + 1)
+
+    def test_failures_are_counted_and_raised(self):
+        errors = self.counter(metrics.paystack_errors, operation='initialize', reason='Timeout')
+        _, _, count = self.histogram(metrics.paystack_duration, operation='initialize')
+
+        def send(url, **kwargs):
+            raise requests.exceptions.Timeout
+
+        with self.assertRaises(requests.exceptions.Timeout):
+            paystack_request('initialize', send, 'https://paystack.test')
+        self.assertEqual(self.counter(metrics.paystack_errors, operation='initialize', reason='Timeout'), errors + 1)
+        self.assertEqual(self.histogram(metrics.paystack_duration, operation='initialize')[2], count + 1)
+
+    def test_webhook_lag(self):
+        buckets, _, count = self.histogram(metrics.webhook_lag, event='charge.success')
+        paid_at = (timezone.now() - timedelta(seconds=20)).isoformat()
+        observe_webhook_lag('charge.success', {'paid_at': paid_at})
+
+        after, total, after_count = self.histogram(metrics.webhook_lag, event='charge.success')
+        self.assertEqual(after_count, count + 1)
+        self.assertEqual(after[metrics.webhook_lag.buckets.index(30)], buckets[metrics.webhook_lag.buckets.index(30)] + 1)
+        self.assertGreaterEqual(total, 20)
+
+        # Missing or unparseable timestamps are ignored
+        for payload in [{}, {'paid_at': 'yesterday'}, {'created_at': '2026-13-45T00:00:00Z'}]:
+            observe_webhook_lag('charge.success', payload)
+        self.assertEqual(self.histogram(metrics.webhook_lag, event='charge.success')[2], count + 1)
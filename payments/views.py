@@ -5,10 +5,16 @@ from django.views.decorators.csrf import csrf_exempt
 from django.http import JsonResponse, HttpResponse
 from django.conf import settings
 from django.contrib import messages
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from datetime import timedelta
 import requests
+import time
 import json
 import hmac
 import hashlib
+from Project import metrics
 from .models import Payment, PaymentType, PaymentHistory
 
 # Paystack Configuration
@@ -18,6 +24,28 @@ PAYSTACK_INITIALIZE_URL = "https://api.paystack.co/transaction/initialize"
 PAYSTACK_VERIFY_URL = "https://api.paystack.co/transaction/verify/"
 
 
+def paystack_request(operation, send, url, **kwargs):
+    """Call Paystack through `send` (requests.get/post), timing it and counting failures"""
+    start = time.perf_counter()
+    try:
+        return send(url, **kwargs)
+    except requests.exceptions.RequestException as e:
+        metrics.paystack_errors.inc(operation=operation, reason=type(e).__name__)
+        raise
+    finally:
+        metrics.paystack_duration.observe(time.perf_counter() - start, operation=operation)
+
+
+def observe_webhook_lag(event, payload):
+    """Record how long after the charge Paystack delivered its webhook"""
+    try:
+        happened = parse_datetime(payload.get('paid_at') or payload.get('created_at') or '')
+    except (TypeError, ValueError):
+        return  # Never fail a webhook over its timestamp
+    if happened:
+        metrics.webhook_lag.observe(max((timezone.now() - happened).total_seconds(), 0), event=event)
+
+
 @login_required
 def payment_page(request):
     """Display payment options and form"""
@@ -32,6 +60,42 @@ def payment_page(request):
     return render(request, 'payments/payment_page.html', context)
 
 
+def find_reusable_payment(user, payment_type, email, idempotency_key=''):
+    """Find a recent pending payment that can be returned without calling Paystack"""
+    if idempotency_key:
+        payment = Payment.objects.filter(user=user, idempotency_key=idempotency_key).first()
+        if payment is None:
+            return None
+        if payment.is_reusable_for(payment_type, email):
+            return payment
+        
+        # Stale key (expired, paid or for another payment type) - release it
+        Payment.objects.filter(pk=payment.pk).update(idempotency_key='')
+        return None
+    
+    ttl = timedelta(seconds=settings.PAYMENT_INITIALIZATION_TTL)
+    payment = Payment.objects.filter(
+        user=user,
+        payment_type=payment_type,
+        status='pending',
+        created_at__gte=timezone.now() - ttl
+    ).exclude(authorization_url='').order_by('-created_at').first()
+    
+    if payment and payment.is_reusable_for(payment_type, email):
+        return payment
+    return None
+
+
+def initialized_payment_response(payment):
+    """JSON response carrying a payment's Paystack authorization"""
+    return JsonResponse({
+        'status': 'success',
+        'authorization_url': payment.authorization_url,
+        'access_code': payment.access_code,
+        'reference': str(payment.reference)
+    })
+
+
 @login_required
 def initialize_payment(request):
     """Initialize payment with Paystack"""
@@ -49,15 +113,41 @@ def initialize_payment(request):
                 'message': 'Invalid payment type selected'
             }, status=400)
         
+        # Hand back a recent pending payment instead of initializing again
+        idempotency_key = (
+            request.POST.get('idempotency_key') or
+            request.headers.get('Idempotency-Key', '')
+        ).strip()[:64]
+        
+        existing_payment = find_reusable_payment(request.user, payment_type, email, idempotency_key)
+        if existing_payment:
+            return initialized_payment_response(existing_payment)
+        
         # Create payment record
-        payment = Payment.objects.create(
-            user=request.user,
-            payment_type=payment_type,
-            amount=payment_type.amount,
-            email=email,
-            phone=phone,
-            status='pending'
-        )
+        try:
+            with transaction.atomic():
+                payment = Payment.objects.create(
+                    user=request.user,
+                    payment_type=payment_type,
+                    amount=payment_type.amount,
+                    email=email,
+                    phone=phone,
+                    status='pending',
+                    idempotency_key=idempotency_key
+                )
+        except IntegrityError:
+            # A concurrent request with the same key got there first
+            existing_payment = Payment.objects.filter(
+                user=request.user,
+                idempotency_key=idempotency_key
+            ).first()
+            if existing_payment and existing_payment.is_reusable_for(payment_type, email):
+                return initialized_payment_response(existing_payment)
+            
+            return JsonResponse({
+                'status': 'error',
+                'message': 'This payment is already being initialized. Please wait.'
+            }, status=409)
         
         # Initialize payment with Paystack
         headers = {
@@ -94,7 +184,8 @@ def initialize_payment(request):
         }
         
         try:
-            response = requests.post(
+            response = paystack_request(
+                'initialize', requests.post,
                 PAYSTACK_INITIALIZE_URL,
                 headers=headers,
                 json=data,
@@ -103,6 +194,11 @@ def initialize_payment(request):
             response_data = response.json()
             
             if response_data.get('status'):
+                # Keep the authorization so repeated clicks can reuse it
+                payment.authorization_url = response_data['data']['authorization_url']
+                payment.access_code = response_data['data']['access_code']
+                payment.save(update_fields=['authorization_url', 'access_code', 'updated_at'])
+                
                 # Log initialization
                 PaymentHistory.objects.create(
                     payment=payment,
@@ -111,14 +207,10 @@ def initialize_payment(request):
                 )
                 
                 # Return authorization URL
-                return JsonResponse({
-                    'status': 'success',
-                    'authorization_url': response_data['data']['authorization_url'],
-                    'access_code': response_data['data']['access_code'],
-                    'reference': str(payment.reference)
-                })
+                return initialized_payment_response(payment)
             else:
                 # Payment initialization failed
+                metrics.paystack_errors.inc(operation='initialize', reason='rejected')
                 error_message = response_data.get('message', 'Payment initialization failed')
                 payment.mark_as_failed({'error': error_message})
                 
@@ -187,7 +279,8 @@ def verify_payment(request):
     }
     
     try:
-        response = requests.get(
+        response = paystack_request(
+            'verify', requests.get,
             f"{PAYSTACK_VERIFY_URL}{reference}",
             headers=headers,
             timeout=10
@@ -245,6 +338,7 @@ def verify_payment(request):
                 )
         else:
             # Invalid response from Paystack
+            metrics.paystack_errors.inc(operation='verify', reason='rejected')
             payment.mark_as_failed(response_data)
             
             PaymentHistory.objects.create(
@@ -292,6 +386,8 @@ def paystack_webhook(request):
         try:
             data = json.loads(request.body)
             event = data.get('event')
+            if isinstance(data.get('data'), dict):
+                observe_webhook_lag(event, data['data'])
             
             if event == 'charge.success':
                 # Payment successful